@@ -0,0 +1,454 @@
+# Copyright (c) 2025 Diego Martins
+# Licensed under the MIT License. See LICENSE file in the project root for details.
+
+import json
+import os
+import threading
+import time
+from collections import deque
+from FileManager import FileManager
+from BrowserSetup import browser_pool
+from HttpFetcher import HttpFetcher
+from ImageMirror import ImageMirror, MANIFEST_FILE
+from PageCache import PageCache
+from DiscussionExtractor import DiscussionStore, extract_discussions
+from SearchIndex import SearchIndex, DEFAULT_INDEX_FILE
+from RateLimiter import HostRateLimiter
+from ScraperPool import ScraperPool, ScrapeJob
+from Metrics import metrics, MetricsServer
+
+
+class ExamRun:
+    """
+    Files and progress of one exam inside a run.
+
+    Attributes:
+        requirement_file (str): Path to the exam's user_requirement.json.
+        exam_name (str): Name of the exam.
+        output_folder (str): Folder holding the exam's outputs.
+        file_manager (FileManager): FileManager of the exam.
+        page_cache (PageCache): Page cache of the exam, or None if disabled.
+        search_index (SearchIndex): Full-text index updated with every result, or None if disabled.
+        parser (str): Parser backend used for the exam's pages.
+        done (int): Questions scraped during this run.
+        failed (int): Questions that failed during this run.
+        discovered (bool): Whether URL discovery has finished for the exam.
+        submitted (set): Ledger indexes queued for scraping during this run.
+    """
+    def __init__(self, requirement_file, use_page_cache=None):
+        self.requirement_file = requirement_file
+        with open(requirement_file, "r", encoding="utf-8") as f:
+            user_data = json.load(f)
+        self.user_data = user_data
+        self.exam_name = user_data.get("exam", "default_exam")
+        self.output_folder = f"./{self.exam_name}_output_questions"
+        self.json_output_file = os.path.join(self.output_folder, "questions_answer.json")
+        self.file_manager = FileManager(
+            csv_file=os.path.join(self.output_folder, "discussion_url.csv"),
+            json_file=self.json_output_file,
+            input_json_file=requirement_file
+        )
+        self.file_manager.validate_files()
+
+        self.page_cache = None
+        if use_page_cache is None:
+            use_page_cache = user_data.get("page_cache", True)
+        if use_page_cache:
+            page_cache_max_mb = user_data.get("page_cache_max_mb", 500)
+            self.page_cache = PageCache(
+                os.path.join(self.output_folder, "page_cache"),
+                max_bytes=page_cache_max_mb * 1024 * 1024 if page_cache_max_mb else None,
+                max_age_days=user_data.get("page_cache_max_age_days", 90)
+            )
+
+        self.search_index = None
+        search_index_file = user_data.get("search_index", DEFAULT_INDEX_FILE)
+        if search_index_file:
+            self.search_index = SearchIndex(search_index_file)
+            self.file_manager.add_result_listener(lambda record, position: self.search_index.upsert(self.exam_name, record, position))
+
+        images_folder = os.path.join(self.output_folder, "images")
+        if os.path.exists(os.path.join(images_folder, MANIFEST_FILE)):
+            # A re-scraped or refreshed result brings back the remote URLs of mirrored images.
+            self.file_manager.add_result_filter(ImageMirror(images_folder).rewrite)
+
+        self.parser = user_data.get("parser", "lxml")
+        self.done = 0
+        self.failed = 0
+        self.discovered = False
+        self.submitted = set()
+        self._completions = deque(maxlen=50)
+
+    def record(self, success):
+        if success:
+            self.done += 1
+        else:
+            self.failed += 1
+        self._completions.append(time.monotonic())
+
+    def remaining(self):
+        return len(self.submitted) - self.done - self.failed
+
+    def rate(self):
+        """
+        Returns the recent completion rate of the exam in questions per second.
+        """
+        if len(self._completions) < 2:
+            return 0.0
+        elapsed = self._completions[-1] - self._completions[0]
+        return (len(self._completions) - 1) / elapsed if elapsed > 0 else 0.0
+
+    def extract_discussions(self, force=False):
+        """
+        Extracts the comments and votes of the exam's cached pages into discussion.sqlite3.
+
+        Returns:
+            int: Number of pages extracted.
+        """
+        if self.page_cache is None:
+            print(f"[{self.exam_name}] Discussion extraction needs the page cache; enable page_cache.")
+            return 0
+        store = DiscussionStore(os.path.join(self.output_folder, "discussion.sqlite3"))
+        try:
+            return extract_discussions(self.file_manager, self.page_cache, store, force=force)
+        finally:
+            store.close()
+
+    def close(self):
+        self.file_manager.close()
+        if self.page_cache is not None:
+            self.page_cache.evict()
+        if self.user_data.get("columnar_export", False):
+            from ColumnarExport import export_output_folder
+            export_output_folder(self.output_folder, self.user_data.get("columnar_format", "auto"))
+        if self.search_index is not None:
+            self.search_index.close()
+
+
+def format_eta(seconds):
+    if seconds is None:
+        return "unknown"
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}h{minutes:02d}m{seconds:02d}s"
+
+
+def report_progress(exams, global_rate):
+    """
+    Prints one progress line per exam with its estimated time to completion.
+
+    Args:
+        exams (list): ExamRun instances.
+        global_rate (float): Completions per second across all exams.
+    """
+    active = [exam for exam in exams if exam.remaining() > 0] or exams
+    for exam in exams:
+        remaining = exam.remaining()
+        # Until an exam has its own history, assume it gets an equal share of the pool.
+        rate = exam.rate() or (global_rate / len(active) if global_rate else 0.0)
+        eta = remaining / rate if rate and remaining else (0 if not remaining else None)
+        status = "" if exam.discovered else " (discovery running)"
+        print(
+            f"[{exam.exam_name}] done {exam.done}, failed {exam.failed}, "
+            f"remaining {remaining}, ETA {format_eta(eta)}{status}"
+        )
+
+
+def discover_exam(browser, exam, fetcher=None, rate_limiter=None, refresh=False):
+    """
+    Looks for the exam's discussion URLs and adds the new ones to its ledger.
+
+    Args:
+        browser (WebDriver): Browser used for the search engines and fallbacks.
+        exam (ExamRun): Exam to discover.
+        fetcher (HttpFetcher): HTTP client tried before the browser, or None.
+        rate_limiter (HostRateLimiter): Shared per-host budget.
+        refresh (bool): Re-read the question count with the HTTP fetcher and only look
+            for the questions added since the last run (default: False).
+    """
+    # The scraping modules pull in Selenium, BeautifulSoup and pandas: they are imported
+    # by the stages that use them, so runs with nothing to do start fast.
+    from URLExtractor import get_max_questions, extract_urls, detect_new_questions
+
+    if refresh:
+        max_questions = detect_new_questions(browser, exam.file_manager, fetcher)
+    else:
+        max_questions = get_max_questions(browser, exam.file_manager)
+    extract_urls(browser, exam.file_manager, max_questions, fetcher=fetcher, rate_limiter=rate_limiter)
+
+
+class ScrapePipeline:
+    """
+    Scrapes the discussion pages of one or more exams while their URLs are still being
+    discovered.
+
+    A discovery thread runs URL discovery exam by exam and writes every URL found to the
+    exam's ledger. A feeder thread moves the pending ledger rows into the ScraperPool,
+    alternating between exams, as soon as they are written; the pool's queue holds at
+    most `max_pending` jobs, so discovery running ahead of the scrapers only grows the
+    ledger, never memory. The calling thread is the only writer of results.
+
+    The ledger is the checkpoint: a row is only marked scraped once its result is synced
+    to disk, and the JSON and CSV exports are refreshed every `checkpoint_every` seconds,
+    so an interrupted run resumes where it stopped. The first Ctrl+C stops discovery,
+    drops the queued jobs and waits for the pages in progress; a second one quits at once.
+
+    Attributes:
+        exams (list): ExamRun instances.
+        fetcher (HttpFetcher): HTTP client tried before the browser, or None.
+        rate_limiter (HostRateLimiter): Per-host budget shared by discovery and scrapers.
+        browsers (BrowserPool): Pool the discovery and worker browsers come from.
+        workers (int): Scraper threads (default: 2).
+        max_pending (int): Jobs queued ahead of the workers (default: 4 per worker).
+        progress_every (int): Completed pages between two progress reports (default: 10).
+        checkpoint_every (float): Seconds between two JSON and CSV exports (default: 60).
+        refresh (bool): Discover with detect_new_questions (default: False).
+        discover (bool): Run URL discovery; False only scrapes the rows already pending
+            in the ledgers (default: True).
+    """
+    def __init__(self, exams, fetcher, rate_limiter, browsers, workers=2, max_pending=None, progress_every=10,
+                 checkpoint_every=60.0, refresh=False, discover=True):
+        from QuestionScraper import parse_html, fetch_html
+
+        self.exams = exams
+        self.fetcher = fetcher
+        self.rate_limiter = rate_limiter
+        self.browsers = browsers
+        self.workers = max(1, int(workers))
+        self.max_pending = self.workers * 4 if max_pending is None else max(1, int(max_pending))
+        self.progress_every = max(1, int(progress_every))
+        self.checkpoint_every = checkpoint_every
+        self.refresh = refresh
+        self.discover = discover
+        self.completed = 0
+        self.started = None
+        self._feeder = None
+        self._stopping = threading.Event()
+        self._new_rows = threading.Event()
+        self.pool = ScraperPool(
+            task=lambda browser, job: parse_html(
+                fetch_html(job.url, fetcher, browser, job.context.page_cache, rate_limiter), job.context.parser
+            ),
+            browser_factory=browsers.session,
+            workers=self.workers,
+            rate_limiter=rate_limiter,
+            max_pending=self.max_pending
+        )
+        for exam in exams:
+            exam.file_manager.add_row_listener(lambda *row: self._new_rows.set())
+
+    def _discover(self):
+        browser = self.browsers.session()
+        try:
+            for exam in self.exams:
+                if self._stopping.is_set():
+                    break
+                try:
+                    discover_exam(browser, exam, self.fetcher, self.rate_limiter, self.refresh)
+                except Exception as e:
+                    print(f"[{exam.exam_name}] Discovery failed: {e}")
+                exam.discovered = True
+                self._new_rows.set()
+                print(f"[{exam.exam_name}] Discovery finished.")
+        finally:
+            browser.quit()
+            for exam in self.exams:
+                exam.discovered = True
+            self._new_rows.set()
+
+    def _pending_jobs(self):
+        """
+        Returns the pending rows not queued yet, alternating between exams.
+        """
+        queues = [
+            deque(
+                ScrapeJob(index, row["Pregunta"], row["URL"], exam)
+                for index, row in exam.file_manager.get_pending_rows().iterrows()
+                if index not in exam.submitted
+            )
+            for exam in self.exams
+        ]
+        while any(queues):
+            for pending in queues:
+                if pending:
+                    yield pending.popleft()
+
+    def _feed(self):
+        try:
+            while not self._stopping.is_set():
+                # Read before the ledger, so rows added during this pass are picked up by a last pass.
+                finished = all(exam.discovered for exam in self.exams)
+                self._new_rows.clear()
+                for job in self._pending_jobs():
+                    while not self._stopping.is_set():
+                        if self.pool.submit(job, timeout=0.5):
+                            job.context.submitted.add(job.index)
+                            break
+                    if self._stopping.is_set():
+                        return
+                if finished:
+                    break
+                self._new_rows.wait(1.0)
+        except Exception as e:
+            print(f"Feeding the scrapers failed: {e}")
+        finally:
+            if not self._stopping.is_set():
+                self.pool.close()
+
+    def checkpoint(self):
+        """
+        Exports the results and ledgers of every exam.
+        """
+        for exam in self.exams:
+            exam.file_manager.save_json()
+            exam.file_manager.save_csv()
+
+    def _handle(self, job, data, error):
+        from QuestionScraper import store_question_data, record_question_failure
+
+        exam = job.context
+        if error is not None:
+            record_question_failure(exam.file_manager, job.index, job.question_text, error, prefix=f"[{exam.exam_name}] ")
+            exam.record(False)
+        else:
+            store_question_data(exam.file_manager, job.index, data)
+            exam.record(True)
+        self.completed += 1
+        if self.completed % self.progress_every == 0:
+            report_progress(self.exams, self.completed / (time.monotonic() - self.started))
+
+    def _consume(self):
+        last_checkpoint = time.monotonic()
+        for job, data, error in self.pool.results():
+            self._handle(job, data, error)
+            if self.checkpoint_every and time.monotonic() - last_checkpoint >= self.checkpoint_every:
+                self.checkpoint()
+                last_checkpoint = time.monotonic()
+
+    def stop(self):
+        """
+        Stops discovery and feeding, and drops the jobs not started yet.
+
+        Returns:
+            int: Jobs dropped; they stay pending in the ledger for the next run.
+        """
+        self._stopping.set()
+        if self._feeder is not None:
+            self._feeder.join(timeout=5)
+        dropped = self.pool.cancel()
+        for job in dropped:
+            job.context.submitted.discard(job.index)
+        return len(dropped)
+
+    def run(self):
+        """
+        Runs discovery and scraping until every URL found is processed or the run is interrupted.
+
+        Returns:
+            int: Pages processed, successfully or not.
+        """
+        for exam in self.exams:
+            waiting, dead = exam.file_manager.retry_counts()
+            if waiting or dead:
+                print(f"[{exam.exam_name}] Skipping {waiting} rows waiting for their retry time and {dead} given up "
+                      f"rows (see {exam.file_manager.dead_letter_file}).")
+
+        if not self.discover:
+            for exam in self.exams:
+                exam.discovered = True
+
+        self.started = time.monotonic()
+        self.pool.start()
+        self._feeder = threading.Thread(target=self._feed, name="feeder", daemon=True)
+        self._feeder.start()
+        discovery = None
+        if self.discover:
+            discovery = threading.Thread(target=self._discover, name="discovery", daemon=True)
+            discovery.start()
+
+        try:
+            self._consume()
+        except KeyboardInterrupt:
+            dropped = self.stop()
+            print(f"Stopping: {dropped} queued pages left for the next run, waiting for the pages in progress "
+                  f"(Ctrl+C again to quit now).")
+            self._consume()
+        if discovery is not None:
+            discovery.join(timeout=5)
+        return self.completed
+
+
+def run_batch(batch_file):
+    """
+    Refreshes several exams with one shared worker pool and per-domain rate limits.
+
+    The batch file lists the user_requirement.json of each exam plus the shared settings:
+
+        {
+            "exams": ["input/ai900.json", "input/az900.json"],
+            "workers": 4,
+            "requests_per_minute": 12,
+            "host_budgets": {"www.examtopics.com": 20},
+            "progress_every": 10,
+            "queue_size": 16,
+            "checkpoint_seconds": 60,
+            "metrics_port": 9108
+        }
+
+    A ScrapePipeline scrapes the rows already pending right away and the new URLs as
+    discovery finds them, exam by exam; the main thread writes every result and reports
+    a per-exam ETA.
+    Stage timings are written next to the batch file as <batch name>_metrics.json.
+
+    Args:
+        batch_file (str): Path to the batch JSON file.
+
+    Returns:
+        None
+    """
+    with open(batch_file, "r", encoding="utf-8") as f:
+        batch = json.load(f)
+
+    exams = [ExamRun(requirement_file) for requirement_file in batch["exams"]]
+    rate_limiter = HostRateLimiter(
+        requests_per_minute=float(batch.get("requests_per_minute", 12)),
+        host_budgets=batch.get("host_budgets"),
+        adaptive=bool(batch.get("adaptive_rate", True)),
+        max_speedup=float(batch.get("max_speedup", 3))
+    )
+    fetcher = HttpFetcher() if batch.get("fetch_mode", "http") == "http" else None
+    browsers = browser_pool(batch)
+    if fetcher is None:
+        browsers.start()
+    metrics_server = MetricsServer(int(batch["metrics_port"])).start() if batch.get("metrics_port") else None
+
+    pipeline = ScrapePipeline(
+        exams,
+        fetcher,
+        rate_limiter,
+        browsers,
+        workers=int(batch.get("workers", 2)),
+        max_pending=batch.get("queue_size"),
+        progress_every=int(batch.get("progress_every", 10)),
+        checkpoint_every=float(batch.get("checkpoint_seconds", 60))
+    )
+    started = time.monotonic()
+    try:
+        completed = pipeline.run()
+        for exam in exams:
+            if exam.user_data.get("extract_discussions", False):
+                exam.extract_discussions()
+    finally:
+        browsers.close()
+        for exam in exams:
+            exam.close()
+        metrics.write_summary(os.path.splitext(batch_file)[0] + "_metrics.json")
+        if metrics_server is not None:
+            metrics_server.stop()
+
+    elapsed = time.monotonic() - started
+    print(f"Batch completed: {completed} pages in {format_eta(elapsed)}.")
+    report_progress(exams, completed / elapsed if elapsed else 0.0)
+    for host, budget in sorted(rate_limiter.summary().items()):
+        print(f"Request budget for {host} at the end of the batch: {budget:.1f}/min.")
+    metrics.print_summary()
@@ -0,0 +1,492 @@
+# Copyright (c) 2025 Diego Martins
+# Licensed under the MIT License. See LICENSE file in the project root for details.
+
+import argparse
+import glob
+import gzip
+import hashlib
+import json
+import os
+import platform
+import re
+import shutil
+import socket
+import subprocess
+import tempfile
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import parse_qs
+
+FIXTURES_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks", "fixtures")
+QUESTION_NUMBER_PATTERN = re.compile(r"Question #: \d+")
+TOPIC_NUMBER_PATTERN = re.compile(r"Topic #: \d+")
+VIEW_PATTERN = re.compile(r"^/discussions/([^/]+)/view/(\d+)-exam-([^/]+)-topic-(\d+)-question-(\d+)-discussion/?$")
+
+
+def load_fixtures(folder=FIXTURES_FOLDER):
+    """
+    Loads the recorded discussion pages used by the benchmarks.
+
+    Returns:
+        dict: File name -> HTML.
+    """
+    fixtures = {}
+    for path in sorted(glob.glob(os.path.join(folder, "*.html"))):
+        with open(path, "r", encoding="utf-8") as f:
+            fixtures[os.path.basename(path)] = f.read()
+    if not fixtures:
+        raise FileNotFoundError(f"No HTML fixtures found in {folder}")
+    return fixtures
+
+
+class LocalSite:
+    """
+    Local stand-in for the exam site, served from the recorded fixtures.
+
+    Serves an exam page, paginated discussion listings and one discussion page per
+    question (fixtures are reused in turn with the question number rewritten), plus a
+    search results page at /search?q= standing in for a search engine. Bodies are
+    gzipped on request, carry an ETag, and can be delayed to mimic network latency.
+
+    Attributes:
+        provider (str): Provider segment of the URLs (default: "microsoft").
+        exam_code (str): Exam code segment of the URLs (default: "az-900").
+        questions (int): Number of questions of the fake exam.
+        topics (int): Number of topics the questions are split into, in contiguous blocks (default: 1).
+        latency (float): Seconds added to every response (default: 0).
+        per_page (int): Discussion links per listing page (default: 15).
+        search_misses (set): Questions the fake search engine finds no result for.
+        base_url (str): Root URL of the running server.
+    """
+    def __init__(self, questions=100, latency=0.0, provider="microsoft", exam_code="az-900", per_page=15,
+                 fixtures=None, search_misses=(), topics=1):
+        self.questions = questions
+        self.topics = topics
+        self.latency = latency
+        self.provider = provider
+        self.exam_code = exam_code
+        self.per_page = per_page
+        self.search_misses = set(search_misses)
+        self.fixtures = list((fixtures or load_fixtures()).values())
+        self.requests = 0
+        self._server = None
+        self.base_url = None
+
+    @property
+    def exam_url(self):
+        return f"{self.base_url}/exams/{self.provider}/{self.exam_code}/"
+
+    def discussion_url(self, question, topic=1):
+        return (
+            f"{self.base_url}/discussions/{self.provider}/view/{100000 + question}-exam-{self.exam_code}"
+            f"-topic-{topic}-question-{question}-discussion/"
+        )
+
+    def topic_sizes(self):
+        """
+        Returns the number of questions of each topic.
+        """
+        per_topic = -(-self.questions // self.topics)
+        return {
+            topic: min(per_topic, self.questions - (topic - 1) * per_topic)
+            for topic in range(1, self.topics + 1)
+            if self.questions > (topic - 1) * per_topic
+        }
+
+    def question_keys(self):
+        return [(topic, question) for topic, size in self.topic_sizes().items() for question in range(1, size + 1)]
+
+    def start(self):
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self):
+                super().setup()
+                # Headers and body are written separately; without TCP_NODELAY every
+                # response stalls on Nagle's algorithm against the client's delayed ACK.
+                self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+            def do_GET(self):
+                site.requests += 1
+                if site.latency:
+                    time.sleep(site.latency)
+                status, body = site.route(self.path)
+                self.respond(status, body)
+
+            def respond(self, status, body):
+                data = body.encode("utf-8")
+                etag = '"%s"' % hashlib.md5(data).hexdigest()
+                if status == 200 and self.headers.get("If-None-Match") == etag:
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                headers = {"Content-Type": "text/html; charset=utf-8", "ETag": etag}
+                if "gzip" in self.headers.get("Accept-Encoding", ""):
+                    data = gzip.compress(data, compresslevel=5)
+                    headers["Content-Encoding"] = "gzip"
+                self.send_response(status)
+                for key, value in headers.items():
+                    self.send_header(key, value)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        self.base_url = f"http://127.0.0.1:{self._server.server_port}"
+        threading.Thread(target=self._server.serve_forever, name="local-site", daemon=True).start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def route(self, path):
+        """
+        Returns the status and body served for a path.
+        """
+        path, _, query = path.partition("?")
+        if path == "/search":
+            return 200, self.search_page(parse_qs(query).get("q", [""])[0])
+
+        if path == f"/exams/{self.provider}/{self.exam_code}/":
+            return 200, (
+                f'<html><body><div class="exam-stat-wrapper-item"><span>{self.questions}</span>'
+                f" Questions</div></body></html>"
+            )
+
+        match = VIEW_PATTERN.match(path)
+        if match and match.group(3) == self.exam_code:
+            topic, question = int(match.group(4)), int(match.group(5))
+            if 1 <= question <= self.topic_sizes().get(topic, 0):
+                html = self.fixtures[(question - 1) % len(self.fixtures)]
+                html = QUESTION_NUMBER_PATTERN.sub(f"Question #: {question}", html, count=1)
+                return 200, TOPIC_NUMBER_PATTERN.sub(f"Topic #: {topic}", html, count=1)
+
+        listing = re.match(rf"^/discussions/{re.escape(self.provider)}/(?:(\d+)/)?$", path)
+        if listing:
+            return 200, self.listing_page(int(listing.group(1) or 1))
+
+        return 404, "<html><body>Not found</body></html>"
+
+    def listing_page(self, page):
+        pages = max(1, -(-self.questions // self.per_page))
+        first = (page - 1) * self.per_page
+        links = []
+        for topic, question in self.question_keys()[first:first + self.per_page]:
+            url = self.discussion_url(question, topic).replace(self.base_url, "")
+            links.append(f'<a href="{url}">Exam {self.exam_code} topic {topic} question {question} discussion</a>')
+            # Listings mix in other exams; the crawler must skip them.
+            links.append(f'<a href="/discussions/{self.provider}/view/{question}-exam-other-topic-1-question-{question}-discussion/">x</a>')
+        return (
+            f'<html><body><span class="discussion-list-page-indicator">Page <strong>{page}</strong> of '
+            f'<strong>{pages}</strong></span>{"".join(links)}</body></html>'
+        )
+
+    def search_page(self, query):
+        """
+        Fake results page: the discussion of the question named in the query, among noise.
+        """
+        links = [
+            '<a href="https://example.com/exam-dumps">Exam dumps</a>',
+            f'<a href="/discussions/{self.provider}/view/1-exam-other-topic-1-question-1-discussion/">x</a>',
+        ]
+        match = re.search(r"topic (\d+)\D+question (\d+)", query)
+        if match:
+            topic, question = int(match.group(1)), int(match.group(2))
+            if 1 <= question <= self.topic_sizes().get(topic, 0) and question not in self.search_misses:
+                links.insert(1, f'<a href="{self.discussion_url(question, topic)}">Question {question}</a>')
+        return f'<html><body><div id="results">{"".join(links)}</div></body></html>'
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    ordered = sorted(values)
+    position = min(len(ordered) - 1, max(0, int(round(fraction * (len(ordered) - 1)))))
+    return ordered[position]
+
+
+def bench_parse(fixtures, iterations):
+    """
+    Measures parse throughput of each parser backend over the fixtures.
+    """
+    from QuestionScraper import parse_html, check_parser_parity
+
+    results = {}
+    for parser in ("bs4", "lxml"):
+        timings = []
+        for _ in range(iterations):
+            for html in fixtures.values():
+                started = time.perf_counter()
+                parse_html(html, parser)
+                timings.append(time.perf_counter() - started)
+        results[parser] = {
+            "pages": len(timings),
+            "pages_per_second": len(timings) / sum(timings),
+            "p50_ms": percentile(timings, 0.5) * 1000,
+            "p95_ms": percentile(timings, 0.95) * 1000,
+        }
+    results["parity"] = {name: check_parser_parity(html)[0] for name, html in fixtures.items()}
+    return results
+
+
+def bench_persistence(fixtures, questions):
+    """
+    Measures FileManager cost per question: ledger insert, result append and status update.
+    """
+    from FileManager import FileManager
+    from QuestionScraper import parse_html, store_question_data
+
+    records = [parse_html(html) for html in fixtures.values()]
+    folder = tempfile.mkdtemp(prefix="bench_persistence_")
+    try:
+        input_file = os.path.join(folder, "user_requirement.json")
+        with open(input_file, "w", encoding="utf-8") as f:
+            json.dump({"exam": "BENCH", "exam_main_url": "http://127.0.0.1/exams/microsoft/az-900/"}, f)
+        output = os.path.join(folder, "BENCH_output_questions")
+        file_manager = FileManager(
+            csv_file=os.path.join(output, "discussion_url.csv"),
+            json_file=os.path.join(output, "questions_answer.json"),
+            input_json_file=input_file
+        )
+        file_manager.validate_files()
+
+        started = time.perf_counter()
+        for question in range(1, questions + 1):
+            file_manager.append_csv_row([f"Question #: {question}", f"http://127.0.0.1/{question}", False])
+        discovered = time.perf_counter()
+        for question in range(1, questions + 1):
+            record = dict(records[(question - 1) % len(records)], question_number=f"Question #: {question}")
+            store_question_data(file_manager, question, record)
+        stored = time.perf_counter()
+        file_manager.close()
+        closed = time.perf_counter()
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+
+    return {
+        "questions": questions,
+        "ledger_insert_ms_per_question": (discovered - started) * 1000 / questions,
+        "store_ms_per_question": (stored - discovered) * 1000 / questions,
+        "final_export_ms": (closed - stored) * 1000,
+    }
+
+
+def bench_discovery(questions, latency):
+    """
+    Measures listing-crawl discovery latency per question against the local site.
+    """
+    from DiscussionCrawler import crawl_discussion_urls
+    from HttpFetcher import HttpFetcher
+
+    with LocalSite(questions=questions, latency=latency) as site:
+        started = time.perf_counter()
+        found = crawl_discussion_urls(
+            site.exam_url, fetcher=HttpFetcher(), wanted={(1, question) for question in range(1, questions + 1)}
+        )
+        elapsed = time.perf_counter() - started
+        requests = site.requests
+
+    return {
+        "questions": questions,
+        "found": len(found),
+        "requests": requests,
+        "seconds": elapsed,
+        "ms_per_question": elapsed * 1000 / max(1, len(found)),
+    }
+
+
+def bench_search(questions, latency):
+    """
+    Measures search-engine discovery per question against the local results page, with
+    a second provider that never finds anything to exercise the provider ranking.
+    """
+    from HttpFetcher import HttpFetcher
+    from SearchProviders import SearchEngine, SearchProvider
+
+    misses = set(range(1, questions + 1, 10))
+    with LocalSite(questions=questions, latency=latency, search_misses=misses) as site:
+        engine = SearchEngine([
+            SearchProvider("Empty", f"{site.base_url}/empty", use_http=True),
+            SearchProvider("Local", site.base_url, use_http=True),
+        ])
+        fetcher = HttpFetcher()
+        started = time.perf_counter()
+        found = 0
+        for question in range(1, questions + 1):
+            url, _ = engine.search(
+                f'ExamTopics exam az-900 topic 1 "question {question}" discussion',
+                target_domain="-exam-az-900-", fetcher=fetcher
+            )
+            found += url is not None
+        elapsed = time.perf_counter() - started
+        requests = site.requests
+
+    return {
+        "questions": questions,
+        "found": found,
+        "requests": requests,
+        "seconds": elapsed,
+        "ms_per_question": elapsed * 1000 / questions,
+        "providers": engine.summary(),
+    }
+
+
+def _no_browser():
+    raise RuntimeError("Benchmarks run without a browser.")
+
+
+def bench_end_to_end(questions, worker_counts, latency, parser):
+    """
+    Measures questions per minute of a ScrapePipeline at several worker counts.
+    """
+    from BatchRunner import ExamRun, ScrapePipeline
+    from BrowserSetup import BrowserPool
+    from HttpFetcher import HttpFetcher
+    from RateLimiter import HostRateLimiter
+
+    results = {}
+    cwd = os.getcwd()
+    with LocalSite(questions=questions, latency=latency) as site:
+        for workers in worker_counts:
+            folder = tempfile.mkdtemp(prefix="bench_e2e_")
+            try:
+                # ExamRun keeps its outputs under ./<exam>_output_questions.
+                os.chdir(folder)
+                input_file = os.path.join(folder, "user_requirement.json")
+                with open(input_file, "w", encoding="utf-8") as f:
+                    json.dump({
+                        "exam": "BENCH", "exam_main_url": site.exam_url, "parser": parser,
+                        "page_cache": False, "search_index": None
+                    }, f)
+                exam = ExamRun(input_file)
+                with exam.file_manager.batch():
+                    for question in range(1, questions + 1):
+                        exam.file_manager.append_csv_row(
+                            [f"Question #: {question}", site.discussion_url(question), False]
+                        )
+
+                started = time.perf_counter()
+                ScrapePipeline(
+                    [exam],
+                    HttpFetcher(),
+                    HostRateLimiter(requests_per_minute=0),
+                    BrowserPool(_no_browser, spare=0),
+                    workers=workers,
+                    progress_every=questions + 1,
+                    checkpoint_every=None,
+                    discover=False
+                ).run()
+                exam.close()
+                elapsed = time.perf_counter() - started
+                scraped = len(exam.file_manager.json_data)
+            finally:
+                os.chdir(cwd)
+                shutil.rmtree(folder, ignore_errors=True)
+
+            results[str(workers)] = {
+                "questions": scraped,
+                "seconds": elapsed,
+                "questions_per_minute": scraped * 60 / elapsed if elapsed else None,
+            }
+    return results
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=os.path.dirname(os.path.abspath(__file__)),
+            stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except Exception:
+        return None
+
+
+def run_benchmarks(output_file, quick=False, worker_counts=(1, 2, 4, 8), latency=0.05, parser="lxml"):
+    """
+    Runs every benchmark and writes the results to a JSON file.
+
+    Args:
+        output_file (str): Path of the JSON results file.
+        quick (bool): Use smaller sizes for a fast smoke run (default: False).
+        worker_counts (iterable): Worker counts for the end-to-end benchmark.
+        latency (float): Seconds of simulated network latency per request (default: 0.05).
+        parser (str): Parser backend for the persistence and end-to-end runs (default: "lxml").
+
+    Returns:
+        dict: The results written to the file.
+    """
+    fixtures = load_fixtures()
+    questions = 40 if quick else 200
+
+    results = {
+        "revision": git_revision(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "settings": {
+            "quick": quick,
+            "questions": questions,
+            "latency": latency,
+            "parser": parser,
+            "fixtures": sorted(fixtures),
+        },
+    }
+
+    print("Benchmarking parsers...")
+    results["parse"] = bench_parse(fixtures, 3 if quick else 20)
+    print("Benchmarking persistence...")
+    results["persistence"] = bench_persistence(fixtures, questions)
+    print("Benchmarking discovery...")
+    results["discovery"] = bench_discovery(questions, latency)
+    print("Benchmarking search...")
+    results["search"] = bench_search(questions, latency)
+    print("Benchmarking end to end...")
+    results["end_to_end"] = bench_end_to_end(questions, worker_counts, latency, parser)
+
+    directory = os.path.dirname(output_file)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(output_file, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=4)
+    print(f"Benchmark results saved in {output_file}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the scraping pipeline against recorded pages.")
+    parser.add_argument("--output", default="bench_output.json", help="Path of the JSON results file.")
+    parser.add_argument("--quick", action="store_true", help="Smaller sizes for a fast smoke run.")
+    parser.add_argument("--workers", default="1,2,4,8", help="Comma-separated worker counts (default: 1,2,4,8).")
+    parser.add_argument("--latency", type=float, default=0.05, help="Simulated latency per request in seconds.")
+    parser.add_argument("--parser", default="lxml", choices=["lxml", "bs4"], help="Parser backend.")
+    args = parser.parse_args()
+
+    run_benchmarks(
+        args.output,
+        quick=args.quick,
+        worker_counts=[int(count) for count in args.workers.split(",")],
+        latency=args.latency,
+        parser=args.parser
+    )
+
+
+if __name__ == "__main__":
+    main()
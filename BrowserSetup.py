@@ -1,25 +1,339 @@
 # Copyright (c) 2025 Diego Martins
 # Licensed under the MIT License. See LICENSE file in the project root for details.
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
+import os
+import queue
+import sys
+import threading
+from functools import partial
+from Metrics import metrics
 
+# Requests Chrome never needs to make for the scraper: fonts, media, ads and trackers.
+# Images are disabled through a content setting instead, since their URLs have no common
+# pattern; their src attributes are still in the DOM for the parser and ImageMirror.
+BLOCKED_URL_PATTERNS = [
+    "*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot",
+    "*.mp4", "*.webm", "*.mp3",
+    "*doubleclick.net*", "*googlesyndication.com*", "*googletagservices.com*",
+    "*googletagmanager.com*", "*google-analytics.com*", "*adservice.google.*",
+    "*amazon-adsystem.com*", "*adnxs.com*", "*facebook.net*", "*hotjar.com*",
+]
 
-def setup_browser():
+
+def default_driver_path():
+    """
+    Returns the chromedriver shipped in driver/, or None to let Selenium locate one.
+    """
+    name = "chromedriver.exe" if sys.platform == "win32" else "chromedriver"
+    path = os.path.join("driver", name)
+    return path if os.path.exists(path) else None
+
+
+def default_headless():
+    # Headless unless a desktop session is available to show the window on.
+    return sys.platform.startswith("linux") and not os.environ.get("DISPLAY")
+
+
+def setup_browser(headless=None, page_load_strategy="eager", block_resources=True, driver_path=None):
     """
     Configures and initializes a Selenium WebDriver instance.
 
+    Args:
+        headless (bool): Run Chrome without a window (default: on Linux without a display).
+        page_load_strategy (str): "eager" returns from get() once the DOM is ready, "normal"
+            waits for every subresource (default: "eager").
+        block_resources (bool): Skip images, fonts, media and ad requests (default: True).
+        driver_path (str): Path to chromedriver (default: driver/chromedriver[.exe] if present,
+            otherwise the one Selenium finds).
+
     Returns:
         WebDriver: Configured Chrome WebDriver instance.
     """
+    # Selenium takes a few hundred milliseconds to import: only pay for it when Chrome starts.
+    from selenium import webdriver
+    from selenium.webdriver.chrome.service import Service
+
+    if headless is None:
+        headless = default_headless()
+
     options = webdriver.ChromeOptions()
+    options.page_load_strategy = page_load_strategy
     options.add_argument("--disable-gpu")
     options.add_argument("--no-sandbox")
     options.add_argument("--disable-dev-shm-usage")
-    options.add_argument("start-maximized")
+    if headless:
+        options.add_argument("--headless=new")
+        options.add_argument("--window-size=1920,1080")
+    else:
+        options.add_argument("start-maximized")
     options.add_argument("--disable-popup-blocking")
     options.add_argument("--disable-notifications")
     options.add_argument("--disable-infobars")
     options.add_argument("--disable-extensions")
-    webdriver_path = r"driver/chromedriver.exe"
-    browser = webdriver.Chrome(service=Service(webdriver_path), options=options)
-    return browser
\ No newline at end of file
+    if block_resources:
+        options.add_experimental_option("prefs", {"profile.managed_default_content_settings.images": 2})
+
+    webdriver_path = driver_path or default_driver_path()
+    service = Service(webdriver_path) if webdriver_path else Service()
+    browser = webdriver.Chrome(service=service, options=options)
+
+    if block_resources:
+        browser.execute_cdp_cmd("Network.enable", {})
+        browser.execute_cdp_cmd("Network.setBlockedURLs", {"urls": BLOCKED_URL_PATTERNS})
+    return browser
+
+
+def process_tree_rss(pid):
+    """
+    Returns the resident memory in bytes of a process and all its descendants, read from
+    /proc, or None where /proc is not available.
+    """
+    if not os.path.isdir("/proc"):
+        return None
+    children = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat", "r") as f:
+                # The command name may contain spaces, so fields are read after its ")".
+                parent = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(parent, []).append(int(entry))
+
+    page_size = os.sysconf("SC_PAGE_SIZE")
+    total = 0
+    pending = [pid]
+    while pending:
+        current = pending.pop()
+        try:
+            with open(f"/proc/{current}/statm", "r") as f:
+                total += int(f.read().split()[1]) * page_size
+        except (OSError, IndexError, ValueError):
+            continue
+        pending.extend(children.get(current, []))
+    return total
+
+
+def browser_rss(browser):
+    """
+    Returns the memory used by a WebDriver session (chromedriver plus every Chrome
+    process), or None if it cannot be measured.
+    """
+    process = getattr(getattr(browser, "service", None), "process", None)
+    if process is None:
+        return None
+    return process_tree_rss(process.pid)
+
+
+class LazyBrowser:
+    """
+    Stand-in for a WebDriver that only starts Chrome the first time it is used.
+
+    Any attribute access (get, page_source, find_element...) is forwarded to the real
+    browser, created on demand through `factory`, so code paths that rarely need a
+    browser do not pay for its startup.
+
+    Attributes:
+        factory (callable): Function returning a new WebDriver instance.
+    """
+    def __init__(self, factory=setup_browser):
+        self.factory = factory
+        self._browser = None
+
+    @property
+    def started(self):
+        return self._browser is not None
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        if self._browser is None:
+            self._browser = self.factory()
+        return getattr(self._browser, name)
+
+    def quit(self):
+        """
+        Quits the underlying browser if it was ever started.
+        """
+        if self._browser is not None:
+            self._browser.quit()
+            self._browser = None
+
+
+class BrowserPool:
+    """
+    Keeps started Chrome sessions ready and replaces sessions that have grown too old.
+
+    Once the pool is started, `spare` sessions are kept starting in the background so a
+    worker taking one does not wait for Chrome to start, and every session taken is
+    replaced by a new spare. A pool that was never started (e.g. in http fetch mode, where
+    the browser is only a fallback) starts each session when it is taken and keeps no
+    spare. Sessions handed out by `session()` are recycled before a navigation once they
+    have loaded `max_pages` pages or their process tree uses more than `max_memory_mb`;
+    the old session is quit in the background.
+
+    Attributes:
+        factory (callable): Function returning a new WebDriver instance.
+        spare (int): Started sessions kept ready (default: 1).
+        max_pages (int): Pages loaded by a session before it is recycled (default: 300).
+        max_memory_mb (int): Memory of a session before it is recycled, or None (default: 1536).
+        memory_check_every (int): Pages between two memory measurements (default: 20).
+    """
+    def __init__(self, factory=setup_browser, spare=1, max_pages=300, max_memory_mb=1536, memory_check_every=20):
+        self.factory = factory
+        self.spare = max(0, int(spare))
+        self.max_pages = max_pages
+        self.max_memory_mb = max_memory_mb
+        self.memory_check_every = max(1, int(memory_check_every))
+        self._idle = queue.Queue()
+        self._starting = 0
+        self._started = False
+        self._closed = False
+        self._lock = threading.Lock()
+
+    def start(self):
+        """
+        Starts the spare sessions in the background, and keeps them replaced from then on.
+        """
+        self._started = True
+        self._refill()
+        return self
+
+    def _refill(self):
+        with self._lock:
+            if self._closed:
+                return
+            needed = self.spare - self._idle.qsize() - self._starting
+            self._starting += max(0, needed)
+        for _ in range(needed):
+            threading.Thread(target=self._launch, name="browser-start", daemon=True).start()
+
+    def _launch(self):
+        try:
+            with metrics.timer("browser_start"):
+                browser = self.factory()
+        except Exception as e:
+            # Handed to the next taker, which raises it.
+            browser = e
+        with self._lock:
+            self._starting -= 1
+            closed = self._closed
+        if closed and not isinstance(browser, Exception):
+            browser.quit()
+        else:
+            self._idle.put(browser)
+
+    def take(self):
+        """
+        Returns a started session, waiting for a spare one if it is already starting.
+        """
+        with self._lock:
+            start_now = self._idle.empty() and self._starting == 0
+        if start_now:
+            with metrics.timer("browser_start"):
+                browser = self.factory()
+        else:
+            browser = self._idle.get()
+        if self._started:
+            self._refill()
+        if isinstance(browser, Exception):
+            raise browser
+        metrics.increment("browser_sessions")
+        return browser
+
+    def retire(self, browser):
+        """
+        Quits a session in the background.
+        """
+        def quit_browser():
+            try:
+                browser.quit()
+            except Exception:
+                pass
+        threading.Thread(target=quit_browser, name="browser-quit", daemon=True).start()
+
+    def needs_recycle(self, browser, pages):
+        if self.max_pages and pages >= self.max_pages:
+            return True
+        if self.max_memory_mb and pages and pages % self.memory_check_every == 0:
+            rss = browser_rss(browser)
+            return rss is not None and rss > self.max_memory_mb * 1024 * 1024
+        return False
+
+    def session(self):
+        """
+        Returns a browser that takes its Chrome session from the pool on first use.
+        """
+        return PooledBrowser(self)
+
+    def close(self):
+        """
+        Quits the spare sessions; sessions still starting quit as soon as they are up.
+        """
+        with self._lock:
+            self._closed = True
+        while True:
+            try:
+                browser = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            if not isinstance(browser, Exception):
+                try:
+                    browser.quit()
+                except Exception:
+                    pass
+
+
+class PooledBrowser(LazyBrowser):
+    """
+    WebDriver stand-in backed by a BrowserPool.
+
+    Like LazyBrowser, the session is only taken on first use. Every get() counts as a page
+    load, and the session is swapped for a fresh one from the pool when the pool says it
+    is due for recycling.
+
+    Attributes:
+        pool (BrowserPool): Pool the sessions come from.
+        pages (int): Pages loaded by the current session.
+    """
+    def __init__(self, pool):
+        super().__init__(pool.take)
+        self.pool = pool
+        self.pages = 0
+
+    def get(self, url):
+        if self._browser is not None and self.pool.needs_recycle(self._browser, self.pages):
+            self.pool.retire(self._browser)
+            self._browser = None
+            metrics.increment("browser_recycles")
+        if self._browser is None:
+            self._browser = self.factory()
+            self.pages = 0
+        self.pages += 1
+        return self._browser.get(url)
+
+
+def browser_pool(settings):
+    """
+    Builds a BrowserPool from the browser keys of a requirement or batch file.
+
+    Args:
+        settings (dict): Loaded user_requirement.json or batch file.
+
+    Returns:
+        BrowserPool: Pool whose sessions use the configured Chrome options.
+    """
+    factory = partial(
+        setup_browser,
+        headless=settings.get("headless"),
+        page_load_strategy=settings.get("page_load_strategy", "eager"),
+        block_resources=bool(settings.get("block_resources", True)),
+        driver_path=settings.get("chromedriver")
+    )
+    return BrowserPool(
+        factory,
+        spare=int(settings.get("browser_spare", 1)),
+        max_pages=int(settings.get("browser_max_pages", 300)),
+        max_memory_mb=settings.get("browser_max_memory_mb", 1536)
+    )
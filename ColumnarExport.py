@@ -0,0 +1,305 @@
+# Copyright (c) 2025 Diego Martins
+# Licensed under the MIT License. See LICENSE file in the project root for details.
+
+import glob
+import json
+import os
+import shutil
+import numpy as np
+import pandas as pd
+from ResultIndex import result_key
+from ResultStore import load_results
+
+try:
+    import pyarrow  # noqa: F401
+except ImportError:  # pyarrow is optional: tables are then written as memory-mapped columns.
+    pyarrow = None
+
+EXPORT_FOLDER = "columnar"
+SCHEMA_FILE = "schema.json"
+
+# Column types of every table; "str" columns are UTF-8 text, "boolean" columns nullable
+# booleans (an int8 of 1, 0 or -1 for unknown in the "columns" format), the others numpy dtypes.
+TABLES = {
+    "questions": {
+        "topic": "int32",
+        "question": "int32",
+        "question_text": "str",
+        "answer_image_text": "str",
+        "correct_answer": "str",
+        "community_answer": "str",
+        "community_share": "float64",
+    },
+    "choices": {
+        "topic": "int32",
+        "question": "int32",
+        "letter": "str",
+        "text": "str",
+        "correct": "boolean",
+    },
+    "images": {
+        "topic": "int32",
+        "question": "int32",
+        "field": "str",
+        "position": "int32",
+        "src": "str",
+    },
+}
+IMAGE_FIELDS = {"question": "question_image_src", "answer": "answer_image_src"}
+
+
+def normalize_records(records):
+    """
+    Splits result records into the rows of the questions, choices and images tables.
+
+    Records without a question number are skipped. Question and topic numbers are
+    integers, missing texts are empty strings, a missing community share is NaN and a
+    choice whose correctness is unknown has a null `correct`.
+
+    Returns:
+        dict: Table name -> dict of column name -> list of values.
+    """
+    tables = {table: {column: [] for column in columns} for table, columns in TABLES.items()}
+    questions, choices, images = tables["questions"], tables["choices"], tables["images"]
+    for record in records:
+        key = result_key(record)
+        if key is None:
+            continue
+        topic, question = key
+        record_choices = record.get("choices") or []
+        community = record.get("community_answer") or {}
+
+        questions["topic"].append(topic)
+        questions["question"].append(question)
+        questions["question_text"].append(record.get("question_text") or "")
+        questions["answer_image_text"].append(record.get("answer_image_text") or "")
+        questions["correct_answer"].append("".join(choice["letter"] for choice in record_choices if choice.get("correct")))
+        questions["community_answer"].append(community.get("answer") or "")
+        share = (community.get("distribution") or {}).get(community.get("answer"))
+        questions["community_share"].append(np.nan if share is None else share)
+
+        for choice in record_choices:
+            choices["topic"].append(topic)
+            choices["question"].append(question)
+            choices["letter"].append(choice.get("letter") or "")
+            choices["text"].append(choice.get("text") or "")
+            # The parsers give None when the choice's markup does not tell.
+            correct = choice.get("correct")
+            choices["correct"].append(None if correct is None else bool(correct))
+
+        for field, source in IMAGE_FIELDS.items():
+            for position, src in enumerate(record.get(source) or []):
+                images["topic"].append(topic)
+                images["question"].append(question)
+                images["field"].append(field)
+                images["position"].append(position)
+                images["src"].append(src)
+    return tables
+
+
+def write_string_column(path, values):
+    """
+    Writes a text column as <path>.utf8, the concatenated UTF-8 values, and
+    <path>.offsets.npy, the n + 1 byte offsets delimiting them.
+    """
+    encoded = [value.encode("utf-8") for value in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(value) for value in encoded], out=offsets[1:])
+    with open(f"{path}.utf8", "wb") as f:
+        f.write(b"".join(encoded))
+    np.save(f"{path}.offsets.npy", offsets)
+
+
+class StringColumn:
+    """
+    Read-only text column backed by memory-mapped files; values are decoded on access.
+
+    Attributes:
+        offsets (numpy.ndarray): Byte offsets of the values in `data`, one more than values.
+        data (numpy.memmap or bytes): Concatenated UTF-8 values.
+    """
+    def __init__(self, path):
+        self.offsets = np.load(f"{path}.offsets.npy", mmap_mode="r")
+        # numpy cannot memory-map an empty file.
+        self.data = np.memmap(f"{path}.utf8", dtype=np.uint8, mode="r") if self.offsets[-1] else b""
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, position):
+        if position < 0:
+            position += len(self)
+        if not 0 <= position < len(self):
+            raise IndexError(position)
+        return bytes(self.data[self.offsets[position]:self.offsets[position + 1]]).decode("utf-8")
+
+    def __iter__(self):
+        for position in range(len(self)):
+            yield self[position]
+
+    def to_list(self):
+        return list(self)
+
+
+def write_table(folder, table, columns, parquet):
+    if parquet:
+        frame = pd.DataFrame({
+            column: pd.array(values, dtype="string" if TABLES[table][column] == "str" else TABLES[table][column])
+            for column, values in columns.items()
+        })
+        frame.to_parquet(os.path.join(folder, f"{table}.parquet"), index=False)
+        return
+
+    table_folder = os.path.join(folder, table)
+    os.makedirs(table_folder, exist_ok=True)
+    for column, values in columns.items():
+        path = os.path.join(table_folder, column)
+        dtype = TABLES[table][column]
+        if dtype == "str":
+            write_string_column(path, values)
+        elif dtype == "boolean":
+            np.save(f"{path}.npy", np.asarray([-1 if value is None else int(value) for value in values], dtype=np.int8))
+        else:
+            np.save(f"{path}.npy", np.asarray(values, dtype=dtype))
+
+
+def export_records(records, folder, export_format="auto"):
+    """
+    Writes result records as typed, normalized tables.
+
+    Args:
+        records (list): Result records, as in questions_answer.json.
+        folder (str): Folder to (re)write; replaced at once when the export is complete.
+        export_format (str): "parquet" (needs pyarrow), "columns" for one memory-mappable
+            file per column, or "auto" for Parquet when pyarrow is installed (default: "auto").
+
+    Returns:
+        dict: Table name -> number of rows.
+    """
+    if export_format == "auto":
+        export_format = "parquet" if pyarrow is not None else "columns"
+    if export_format not in ("parquet", "columns"):
+        raise ValueError(f"Unknown columnar export format: {export_format}")
+
+    tables = normalize_records(records)
+    temp_folder = f"{folder}.tmp"
+    shutil.rmtree(temp_folder, ignore_errors=True)
+    os.makedirs(temp_folder)
+    for table, columns in tables.items():
+        write_table(temp_folder, table, columns, export_format == "parquet")
+
+    rows = {table: len(columns["topic"]) for table, columns in tables.items()}
+    with open(os.path.join(temp_folder, SCHEMA_FILE), "w", encoding="utf-8") as f:
+        json.dump({"format": export_format, "rows": rows, "tables": TABLES}, f, indent=4)
+    shutil.rmtree(folder, ignore_errors=True)
+    os.replace(temp_folder, folder)
+    return rows
+
+
+def export_output_folder(output_folder, export_format="auto"):
+    """
+    Exports the results of an exam to <output_folder>/columnar/.
+
+    Returns:
+        dict: Table name -> number of rows.
+    """
+    records = load_results(os.path.join(output_folder, "questions_answer.json"))
+    return export_records(records, os.path.join(output_folder, EXPORT_FOLDER), export_format)
+
+
+def export_all(root=".", export_format="auto"):
+    """
+    Exports every <exam>_output_questions folder under a project folder.
+
+    Returns:
+        dict: Output folder -> table name -> number of rows.
+    """
+    results = {}
+    for output_folder in sorted(glob.glob(os.path.join(root, "*_output_questions"))):
+        rows = export_output_folder(output_folder, export_format)
+        results[output_folder] = rows
+        print(f"{output_folder}: " + ", ".join(f"{count} {table}" for table, count in rows.items()) + " exported.")
+    return results
+
+
+def read_schema(folder):
+    with open(os.path.join(folder, SCHEMA_FILE), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def load_column(folder, table, column):
+    """
+    Reads one column of an exported table, without reading the other columns.
+
+    Args:
+        folder (str): Export folder (<output_folder>/columnar).
+        table (str): "questions", "choices" or "images".
+        column (str): Column name.
+
+    Returns:
+        Sequence: A memory-mapped numpy array (int8 of 1, 0 or -1 for a "boolean"
+        column), or a StringColumn for text, in the "columns" format; a numpy array in
+        the Parquet format.
+    """
+    schema = read_schema(folder)
+    dtype = schema["tables"][table][column]
+    if schema["format"] == "parquet":
+        return pd.read_parquet(os.path.join(folder, f"{table}.parquet"), columns=[column])[column].to_numpy()
+    path = os.path.join(folder, table, column)
+    if dtype == "str":
+        return StringColumn(path)
+    return np.load(f"{path}.npy", mmap_mode="r")
+
+
+def nullable_boolean(values):
+    """
+    Converts an int8 column of 1, 0 and -1 (unknown) to a pandas nullable boolean array.
+    """
+    values = np.asarray(values)
+    return pd.array([None if value < 0 else bool(value) for value in values.tolist()], dtype="boolean")
+
+
+def load_table(folder, table, columns=None):
+    """
+    Reads some or all columns of an exported table into a DataFrame.
+
+    Args:
+        folder (str): Export folder (<output_folder>/columnar).
+        table (str): "questions", "choices" or "images".
+        columns (list): Columns to read (default: all).
+
+    Returns:
+        pandas.DataFrame: Table with typed columns.
+    """
+    schema = read_schema(folder)
+    columns = list(columns or schema["tables"][table])
+    if schema["format"] == "parquet":
+        return pd.read_parquet(os.path.join(folder, f"{table}.parquet"), columns=columns)
+    data = {}
+    for column in columns:
+        values = load_column(folder, table, column)
+        if isinstance(values, StringColumn):
+            data[column] = values.to_list()
+        elif schema["tables"][table][column] == "boolean":
+            data[column] = nullable_boolean(values)
+        else:
+            data[column] = np.asarray(values)
+    return pd.DataFrame(data)
+
+
+def load_exams(root=".", table="questions", columns=None):
+    """
+    Reads a table of every exported exam under a project folder, with an "exam" column
+    holding the name of the output folder.
+
+    Returns:
+        pandas.DataFrame: Rows of all exams.
+    """
+    frames = []
+    for folder in sorted(glob.glob(os.path.join(root, "*_output_questions", EXPORT_FOLDER))):
+        frame = load_table(folder, table, columns)
+        frame.insert(0, "exam", os.path.basename(os.path.dirname(folder))[:-len("_output_questions")])
+        frames.append(frame)
+    if not frames:
+        return pd.DataFrame(columns=["exam"] + list(columns or TABLES[table]))
+    return pd.concat(frames, ignore_index=True)
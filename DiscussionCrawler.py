@@ -0,0 +1,187 @@
+# Copyright (c) 2025 Diego Martins
+# Licensed under the MIT License. See LICENSE file in the project root for details.
+
+import re
+import time
+from urllib.parse import urljoin, urlsplit
+from Metrics import metrics
+from RateLimiter import detect_block, parse_retry_after
+
+PAGE_COUNT_PATTERN = re.compile(r"Page\s*(?:<[^>]+>\s*)*\d+\s*(?:<[^>]+>\s*)*of\s*(?:<[^>]+>\s*)*(\d+)", re.IGNORECASE)
+
+
+def parse_exam_url(exam_main_url):
+    """
+    Splits an exam page URL into the site root, provider and exam code.
+
+    Args:
+        exam_main_url (str): URL such as https://www.examtopics.com/exams/microsoft/az-900/.
+
+    Returns:
+        tuple: (site_root, provider, exam_code).
+
+    Raises:
+        ValueError: If the URL does not follow the /exams/<provider>/<code>/ layout.
+    """
+    parts = urlsplit(exam_main_url)
+    segments = [segment for segment in parts.path.split("/") if segment]
+    if len(segments) < 3 or segments[0] != "exams":
+        raise ValueError(f"Unrecognized exam URL format: {exam_main_url}")
+    return f"{parts.scheme}://{parts.netloc}", segments[1], segments[2]
+
+
+def discussion_link_pattern(provider, exam_code):
+    """
+    Builds the regex matching discussion links of one exam.
+
+    Groups: 1 = discussion id, 2 = topic number, 3 = question number.
+    """
+    return re.compile(
+        rf'href="([^"]*/discussions/{re.escape(provider)}/view/\d+-exam-{re.escape(exam_code)}'
+        rf'-topic-(\d+)-question-(\d+)-discussion/?)"',
+        re.IGNORECASE
+    )
+
+
+def extract_discussion_links(html, pattern, base_url):
+    """
+    Finds every discussion link of the exam in a listing page.
+
+    Args:
+        html (str): Raw HTML of a listing page.
+        pattern (Pattern): Regex built by discussion_link_pattern.
+        base_url (str): URL the page was loaded from, used to resolve relative links.
+
+    Returns:
+        list: Tuples of (topic, question, url) in page order.
+    """
+    return [
+        (int(topic), int(question), urljoin(base_url, href))
+        for href, topic, question in pattern.findall(html)
+    ]
+
+
+def parse_page_count(html):
+    """
+    Reads the total number of listing pages from the "Page X of N" indicator.
+
+    Returns:
+        int or None: Number of pages, or None if the indicator is missing.
+    """
+    match = PAGE_COUNT_PATTERN.search(html)
+    return int(match.group(1)) if match else None
+
+
+def listing_page_url(site_root, provider, page):
+    if page == 1:
+        return f"{site_root}/discussions/{provider}/"
+    return f"{site_root}/discussions/{provider}/{page}/"
+
+
+def load_listing_page(url, fetcher=None, browser=None, rate_limiter=None):
+    """
+    Returns the HTML of a listing page, over HTTP when possible and otherwise with the browser.
+
+    Each load is reported to the rate limiter; a blocked page is returned as None.
+    """
+    if fetcher is not None:
+        try:
+            started = time.monotonic()
+            response = fetcher.fetch(url)
+            blocked = detect_block(response.status, response.text)
+            if rate_limiter is not None:
+                rate_limiter.report(
+                    url, time.monotonic() - started, response.status, blocked,
+                    parse_retry_after(response.headers.get("retry-after"))
+                )
+            if response.status in (200, 304) and not blocked and "/discussions/" in response.text:
+                return response.text
+            print(f"Listing page {url} returned status {response.status}.")
+            if blocked and rate_limiter is not None and browser is not None:
+                rate_limiter.wait(url)
+        except Exception as e:
+            print(f"HTTP fetch of listing page {url} failed: {e}")
+    if browser is None:
+        return None
+    started = time.monotonic()
+    browser.get(url)
+    html = browser.page_source
+    blocked = detect_block(text=html)
+    if rate_limiter is not None:
+        rate_limiter.report(url, time.monotonic() - started, blocked=blocked)
+    return None if blocked else html
+
+
+def crawl_discussion_urls(exam_main_url, fetcher=None, browser=None, rate_limiter=None,
+                          wanted=None, topics=(1,), max_pages=None, max_retries=3, on_page=None):
+    """
+    Paginates the provider's discussion listing once and collects the exam's discussion URLs.
+
+    The crawl stops at the last listing page, at `max_pages`, or as soon as every
+    question in `wanted` has been found.
+
+    Args:
+        exam_main_url (str): URL of the main exam page.
+        fetcher (HttpFetcher): HTTP client used for listing pages (default: None).
+        browser (WebDriver): Selenium WebDriver used when HTTP is unavailable (default: None).
+        rate_limiter (HostRateLimiter): Per-host request budget (default: None).
+        wanted (set): (topic, question) pairs still missing; None to crawl every page.
+        topics (iterable): Topics to keep, or None to keep all of them (default: (1,)).
+        max_pages (int): Maximum number of listing pages to visit (default: no limit).
+        max_retries (int): Attempts at a listing page that fails to load, each after the
+            rate limiter's pause (default: 3).
+        on_page (callable): Called with the dict of URLs first found on each listing page,
+            so they can be used before the crawl ends (default: None).
+
+    Returns:
+        dict: (topic, question) -> discussion URL.
+    """
+    site_root, provider, exam_code = parse_exam_url(exam_main_url)
+    pattern = discussion_link_pattern(provider, exam_code)
+    topics = set(topics) if topics is not None else None
+    remaining = set(wanted) if wanted is not None else None
+
+    found = {}
+    page = 1
+    page_count = max_pages
+    retries = 0
+    while page_count is None or page <= page_count:
+        url = listing_page_url(site_root, provider, page)
+        if rate_limiter:
+            rate_limiter.wait(url)
+        with metrics.timer("listing_fetch"):
+            html = load_listing_page(url, fetcher, browser, rate_limiter)
+        if not html:
+            if rate_limiter and retries < max_retries:
+                retries += 1
+                continue
+            print(f"Stopping discussion crawl: could not load {url}")
+            break
+        retries = 0
+
+        if page == 1:
+            total_pages = parse_page_count(html)
+            if total_pages:
+                page_count = min(total_pages, max_pages) if max_pages else total_pages
+                print(f"Crawling {page_count} discussion listing pages for {exam_code}.")
+
+        if "/view/" not in html:
+            break
+
+        page_found = {}
+        for topic, question, discussion_url in extract_discussion_links(html, pattern, url):
+            key = (topic, question)
+            if (topics is None or topic in topics) and key not in found:
+                found[key] = page_found[key] = discussion_url
+                if remaining is not None:
+                    remaining.discard(key)
+        if page_found and on_page is not None:
+            on_page(page_found)
+
+        if remaining is not None and not remaining:
+            print(f"All wanted questions found after {page} listing pages.")
+            break
+        page += 1
+
+    print(f"Discussion crawl found {len(found)} question URLs for {exam_code}.")
+    return found
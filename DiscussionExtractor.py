@@ -0,0 +1,409 @@
+# Copyright (c) 2025 Diego Martins
+# Licensed under the MIT License. See LICENSE file in the project root for details.
+
+import codecs
+import gzip
+import itertools
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import Counter
+from html.parser import HTMLParser
+from Metrics import metrics
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    topic INTEGER NOT NULL,
+    question INTEGER NOT NULL,
+    sha256 TEXT,
+    comments INTEGER NOT NULL,
+    community_answer TEXT,
+    extracted_at REAL NOT NULL,
+    PRIMARY KEY (topic, question)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS comments (
+    topic INTEGER NOT NULL,
+    question INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    comment_id TEXT,
+    username TEXT,
+    posted TEXT,
+    selected_answer TEXT,
+    upvotes INTEGER,
+    content TEXT,
+    PRIMARY KEY (topic, question, position)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS votes (
+    topic INTEGER NOT NULL,
+    question INTEGER NOT NULL,
+    answer TEXT NOT NULL,
+    share REAL NOT NULL,
+    vote_count INTEGER,
+    PRIMARY KEY (topic, question, answer)
+) WITHOUT ROWID;
+"""
+
+COMMENT_FIELDS = ("comment_id", "username", "posted", "selected_answer", "upvotes", "content")
+VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "param", "source", "track", "wbr"}
+# Roles whose text is collected; the innermost one gets the text of nested tags.
+TEXT_ROLES = {"username", "selected", "content", "upvotes", "tally", "bar"}
+DISTRIBUTION_PATTERN = re.compile(r"([A-Z]+)\s*\((\d+(?:\.\d+)?)\s*%\)")
+CHUNK_SIZE = 64 * 1024
+
+
+class DiscussionParser(HTMLParser):
+    """
+    Streaming parser of the discussion part of a question page.
+
+    Fed in chunks, it never builds a tree: each comment is handed to `on_comment` as soon
+    as its container closes, and only the vote counts are kept. The community vote tally
+    is read from the page's JSON tally, or from the distribution bar when there is none.
+
+    Attributes:
+        on_comment (callable): Called with a dict of COMMENT_FIELDS for each comment.
+        votes (dict): Answer -> vote count, from the vote tally.
+        distribution (dict): Answer -> percentage, from the distribution bar.
+        most_voted (str): Answer flagged "Most Voted" on the page, or None.
+        selections (Counter): Answer -> comments that selected it.
+        comments (int): Comments seen.
+    """
+    def __init__(self, on_comment=None):
+        super().__init__(convert_charrefs=True)
+        self.on_comment = on_comment
+        self.votes = {}
+        self.distribution = {}
+        self.most_voted = None
+        self.selections = Counter()
+        self.comments = 0
+        self._stack = []
+        self._text = {}
+        self._comment = None
+        self._choice_letter = None
+
+    def handle_starttag(self, tag, attrs):
+        attributes = dict(attrs)
+        classes = (attributes.get("class") or "").split()
+        role = None
+        if "comment-container" in classes:
+            self._end_comment()
+            self._comment = dict.fromkeys(COMMENT_FIELDS)
+            self._comment["comment_id"] = attributes.get("data-comment-id")
+            role = "comment"
+        elif self._comment is not None:
+            if "comment-username" in classes:
+                role = "username"
+            elif "comment-date" in classes:
+                self._comment["posted"] = attributes.get("title")
+            elif "comment-selected-answers" in classes:
+                role = "selected"
+            elif "comment-content" in classes:
+                role = "content"
+            elif "upvote-count" in classes:
+                role = "upvotes"
+        elif "multi-choice-letter" in classes:
+            self._choice_letter = attributes.get("data-choice-letter")
+        elif "most-voted-answer-badge" in classes and self._choice_letter:
+            self.most_voted = self._choice_letter
+        elif "voted-answers-tally" in classes:
+            role = "tally"
+        elif "vote-distribution-bar" in classes:
+            role = "bar"
+
+        if tag in VOID_TAGS:
+            return
+        self._stack.append((tag, role))
+        if role in TEXT_ROLES:
+            self._text[role] = []
+
+    def handle_endtag(self, tag):
+        if tag in VOID_TAGS:
+            return
+        # Unclosed tags are closed with their parent, as browsers do.
+        for depth in range(len(self._stack) - 1, -1, -1):
+            if self._stack[depth][0] == tag:
+                break
+        else:
+            return
+        while len(self._stack) > depth:
+            _, role = self._stack.pop()
+            if role is not None:
+                self._close_role(role)
+
+    def handle_data(self, data):
+        for _, role in reversed(self._stack):
+            if role in TEXT_ROLES:
+                self._text[role].append(data)
+                return
+
+    def _close_role(self, role):
+        if role == "comment":
+            self._end_comment()
+            return
+        text = " ".join("".join(self._text.pop(role, [])).split())
+        if role == "tally":
+            try:
+                tally = json.loads(text or "[]")
+                self.votes = {item["voted_answers"]: int(item["vote_count"]) for item in tally}
+                for item in tally:
+                    if item.get("is_most_voted"):
+                        self.most_voted = item["voted_answers"]
+            except (ValueError, KeyError, TypeError):
+                pass
+        elif role == "bar":
+            self.distribution = {answer: float(share) for answer, share in DISTRIBUTION_PATTERN.findall(text)}
+        elif self._comment is not None:
+            if role == "selected":
+                self._comment["selected_answer"] = text.split(":", 1)[-1].strip() or None
+            elif role == "upvotes":
+                self._comment["upvotes"] = int(text) if text.isdigit() else None
+            else:
+                self._comment[role] = text
+
+    def _end_comment(self):
+        comment = self._comment
+        if comment is None:
+            return
+        self._comment = None
+        self.comments += 1
+        if comment["selected_answer"]:
+            self.selections[comment["selected_answer"]] += 1
+        if self.on_comment is not None:
+            self.on_comment(comment)
+
+    def close(self):
+        super().close()
+        self._end_comment()
+
+    def community_answer(self):
+        """
+        Aggregates the page's votes into the question's community answer.
+
+        The vote tally is used when the page has one, then the distribution bar, then
+        the answers selected in the comments.
+
+        Returns:
+            dict or None: {"answer", "distribution" (answer -> share of votes), "votes"
+            (total, None when only percentages are known), "source", "comments"}, or None
+            if nobody voted.
+        """
+        for source, counts in (("votes", self.votes), ("distribution", self.distribution),
+                               ("comments", self.selections)):
+            total = sum(counts.values())
+            if total:
+                break
+        else:
+            return None
+        answer = self.most_voted if self.most_voted in counts else max(counts, key=counts.get)
+        return {
+            "answer": answer,
+            "distribution": {key: round(value / total, 3) for key, value in sorted(counts.items())},
+            "votes": int(total) if source != "distribution" else None,
+            "source": source,
+            "comments": self.comments,
+        }
+
+
+def iter_text_chunks(html, chunk_size=CHUNK_SIZE):
+    for start in range(0, len(html), chunk_size):
+        yield html[start:start + chunk_size]
+
+
+def iter_cached_chunks(path, chunk_size=CHUNK_SIZE):
+    """
+    Reads a cached .html.gz page as text chunks, without holding the whole page in memory.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    with gzip.open(path, "rb") as f:
+        while True:
+            block = f.read(chunk_size)
+            if not block:
+                break
+            yield decoder.decode(block)
+    tail = decoder.decode(b"", final=True)
+    if tail:
+        yield tail
+
+
+def parse_discussion(chunks, on_comment=None):
+    """
+    Streams a page through a DiscussionParser.
+
+    Args:
+        chunks (iterable or str): Text chunks of the page, or the whole page.
+        on_comment (callable): Called with each comment as soon as it is parsed (default: None).
+
+    Returns:
+        DiscussionParser: Parser holding the vote counts.
+    """
+    if isinstance(chunks, str):
+        chunks = iter_text_chunks(chunks)
+    parser = DiscussionParser(on_comment)
+    for chunk in chunks:
+        parser.feed(chunk)
+    parser.close()
+    return parser
+
+
+class DiscussionStore:
+    """
+    SQLite store of the comments and community votes of an exam's discussion pages,
+    kept apart from the results so questions_answer.json stays small.
+
+    Rows are keyed by the (topic, question) key of the ledger. The hash of the page each
+    question was extracted from is recorded, so unchanged pages are not extracted again.
+
+    Attributes:
+        path (str): Path of the SQLite file.
+        batch_size (int): Comments written per insert while a page is streamed (default: 200).
+    """
+    def __init__(self, path, batch_size=200):
+        self.path = path
+        self.batch_size = batch_size
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connection().executescript(SCHEMA)
+
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.execute("PRAGMA journal_mode=WAL")
+            self._local.connection = connection
+        return connection
+
+    def page_hash(self, key):
+        """
+        Returns the hash of the page a question was last extracted from, or None.
+        """
+        row = self._connection().execute(
+            "SELECT sha256 FROM pages WHERE topic = ? AND question = ?", tuple(key)
+        ).fetchone()
+        return row[0] if row else None
+
+    def extract(self, key, chunks, sha256=None):
+        """
+        Streams a page into the store, replacing what was stored for the question.
+
+        Comments are written in batches while the page is parsed, in one transaction.
+
+        Args:
+            key (tuple): (topic, question) key of the question.
+            chunks (iterable or str): Text chunks of the page, or the whole page.
+            sha256 (str): Hash of the page, recorded to skip it next time (default: None).
+
+        Returns:
+            dict or None: Community answer of the question (see DiscussionParser.community_answer).
+        """
+        topic, question = key
+        connection = self._connection()
+        positions = itertools.count()
+        pending = []
+
+        def flush():
+            connection.executemany(
+                "INSERT INTO comments VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", pending
+            )
+            pending.clear()
+
+        def on_comment(comment):
+            pending.append((topic, question, next(positions)) + tuple(comment[field] for field in COMMENT_FIELDS))
+            if len(pending) >= self.batch_size:
+                flush()
+
+        with connection:
+            connection.execute("DELETE FROM comments WHERE topic = ? AND question = ?", (topic, question))
+            connection.execute("DELETE FROM votes WHERE topic = ? AND question = ?", (topic, question))
+            parser = parse_discussion(chunks, on_comment)
+            flush()
+
+            answer = parser.community_answer()
+            if answer is not None:
+                counts = {"votes": parser.votes, "comments": parser.selections}.get(answer["source"], {})
+                connection.executemany(
+                    "INSERT INTO votes VALUES (?, ?, ?, ?, ?)",
+                    [(topic, question, choice, share, counts.get(choice)) for choice, share in answer["distribution"].items()]
+                )
+            connection.execute(
+                "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?)",
+                (topic, question, sha256, parser.comments, json.dumps(answer) if answer else None, time.time())
+            )
+        return answer
+
+    def comments(self, key):
+        """
+        Yields the comments of a question in page order, one at a time.
+        """
+        cursor = self._connection().execute(
+            f"SELECT {', '.join(COMMENT_FIELDS)} FROM comments WHERE topic = ? AND question = ? ORDER BY position",
+            tuple(key)
+        )
+        for row in cursor:
+            yield dict(zip(COMMENT_FIELDS, row))
+
+    def community_answer(self, key):
+        row = self._connection().execute(
+            "SELECT community_answer FROM pages WHERE topic = ? AND question = ?", tuple(key)
+        ).fetchone()
+        return json.loads(row[0]) if row and row[0] else None
+
+    def close(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+
+def extract_discussions(file_manager, page_cache, store, force=False):
+    """
+    Extracts the comments and votes of every scraped question from the page cache, and
+    sets the "community_answer" field of its result.
+
+    Pages are streamed from their compressed cache objects, one at a time, so memory use
+    does not depend on the number of comments. Questions whose page has not changed since
+    the last extraction are skipped unless `force` is set.
+
+    Args:
+        file_manager (FileManager): FileManager of the exam.
+        page_cache (PageCache): Cache holding the raw discussion pages.
+        store (DiscussionStore): Store receiving the comments and votes.
+        force (bool): Extract unchanged pages again (default: False).
+
+    Returns:
+        int: Number of pages extracted.
+    """
+    counts = Counter()
+    for index, row in file_manager.csv_data.iterrows():
+        record = file_manager.get_result(index)
+        if record is None:
+            continue
+        found = page_cache.lookup(row["URL"])
+        if found is None:
+            counts["not cached"] += 1
+            continue
+        path, sha256 = found
+        if not force and "community_answer" in record and store.page_hash(index) == sha256:
+            counts["unchanged"] += 1
+            continue
+
+        try:
+            with metrics.timer("discussion_extract"):
+                answer = store.extract(index, iter_cached_chunks(path), sha256)
+        except Exception as e:
+            print(f"Error extracting the discussion of {row['Pregunta']}: {e}")
+            counts["failed"] += 1
+            continue
+        counts["extracted"] += 1
+        file_manager.upsert_result(dict(record, community_answer=answer))
+
+    if counts["extracted"]:
+        file_manager.save_json()
+    print(
+        f"Discussions: {counts['extracted']} extracted, {counts['unchanged']} unchanged, "
+        f"{counts['not cached']} not cached, {counts['failed']} failed."
+    )
+    return counts["extracted"]
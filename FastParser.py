@@ -0,0 +1,129 @@
+# Copyright (c) 2025 Diego Martins
+# Licensed under the MIT License. See LICENSE file in the project root for details.
+
+from lxml import etree
+from RetryPolicy import PageParseError
+
+
+def _has_class(name):
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+# Text nodes BeautifulSoup's get_text() skips: script, style, template and ruby annotations.
+_TEXT = "text()[not(parent::script or parent::style or parent::rt or parent::rp or ancestor::template)]"
+
+# First div anywhere inside the header, as BeautifulSoup's find("div") in extract_question_number.
+HEADER_DIV = etree.XPath(f"(//div[{_has_class('question-discussion-header')}])[1]/descendant::div[1]")
+QUESTION_BODY = etree.XPath("(//div[normalize-space(@class)='question-body mt-3 pt-3 border-top'])[1]")
+QUESTION_TEXT = etree.XPath(f"(.//p[{_has_class('card-text')}])[1]")
+ANSWER_SECTION = etree.XPath(
+    "(.//div[normalize-space(@class)='card-text question-answer bg-light white-text'])[1]"
+)
+CHOICES_CONTAINER = etree.XPath(f"(.//div[{_has_class('question-choices-container')}])[1]")
+CHOICE_LETTER = etree.XPath(f"(.//span[{_has_class('multi-choice-letter')}])[1]")
+IMAGES = etree.XPath(".//img")
+LIST_ITEMS = etree.XPath(".//li")
+TEXT_NODES = etree.XPath(f".//{_TEXT}")
+
+HTML_PARSER = etree.HTMLParser(encoding="utf-8", remove_comments=True)
+
+
+def stripped_strings(element):
+    """
+    Equivalent of BeautifulSoup's stripped_strings for an lxml element.
+    """
+    for text in TEXT_NODES(element):
+        text = text.strip()
+        if text:
+            yield text
+
+
+def get_text(element):
+    """
+    Equivalent of BeautifulSoup's get_text(strip=True) for an lxml element.
+    """
+    return "".join(stripped_strings(element))
+
+
+def scrape_html(html):
+    """
+    Extracts question data from raw HTML with lxml and precompiled XPath selectors.
+
+    Produces the same dict as QuestionScraper.scrape_page without building a
+    BeautifulSoup tree.
+
+    Args:
+        html (str): Raw HTML of a discussion page.
+
+    Returns:
+        dict: Extracted question data including question text, choices, images, and answers.
+
+    Raises:
+        PageParseError: If required elements are not found in the page.
+    """
+    # Imported here: QuestionScraper imports this module to dispatch between parsers.
+    from QuestionScraper import format_image_url, parse_topic_number
+
+    try:
+        root = etree.fromstring(html.encode("utf-8"), HTML_PARSER)
+        if root is None:
+            raise Exception("Empty document.")
+
+        header = HEADER_DIV(root)
+        if not header:
+            raise ValueError("Could not extract question number")
+        header_text = get_text(header[0])
+        question_number = header_text.split("Topic #:")[0].strip()
+        topic = parse_topic_number(header_text)
+
+        question_body = QUESTION_BODY(root)
+        if not question_body:
+            raise Exception("Question body not found.")
+        question_body = question_body[0]
+
+        question_text_element = QUESTION_TEXT(question_body)
+        if not question_text_element:
+            raise Exception("Question text not found.")
+        question_text_element = question_text_element[0]
+        question_text = get_text(question_text_element)
+
+        question_image_src = [format_image_url(img.attrib["src"]) for img in IMAGES(question_text_element)]
+
+        answer_section = ANSWER_SECTION(question_body)
+        if answer_section:
+            answer_image_src = [format_image_url(img.attrib["src"]) for img in IMAGES(answer_section[0])]
+            answer_image_text = " ".join(stripped_strings(answer_section[0]))
+        else:
+            answer_image_src = []
+            answer_image_text = ""
+
+        choices_container = CHOICES_CONTAINER(question_body)
+        choices = []
+        if choices_container:
+            for li in LIST_ITEMS(choices_container[0]):
+                choice_letter = CHOICE_LETTER(li)[0].attrib["data-choice-letter"]
+                choice_text = get_text(li).replace("Most Voted", "").strip()  # Clean text
+                classes = li.get("class")
+                # Mirror scrape_page: no class attribute gives None, an empty one gives [].
+                if classes is None:
+                    is_correct = None
+                else:
+                    classes = classes.split()
+                    is_correct = classes and "correct-hidden" in classes
+                choices.append({
+                    "letter": choice_letter,
+                    "text": choice_text,
+                    "correct": is_correct
+                })
+
+        return {
+            "question_number": question_number,
+            "topic": topic,
+            "question_text": question_text,
+            "choices": choices,
+            "question_image_src": question_image_src,
+            "answer_image_text": answer_image_text,
+            "answer_image_src": answer_image_src
+        }
+    except Exception as e:
+        raise PageParseError(f"Error processing page data: {str(e)}") from e
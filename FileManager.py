@@ -2,8 +2,16 @@
 # Licensed under the MIT License. See LICENSE file in the project root for details.
 
 import os
-import pandas as pd
+import threading
+import time
 import json
+from ResultStore import ResultStore, export_json, results_path
+from ResultIndex import ResultIndex, result_key, merge_records
+from ProgressStore import ProgressStore, parse_question_key
+from RetryPolicy import RetryPolicy
+from Metrics import metrics
+
+CSV_COLUMNS = ["Pregunta", "URL", "Scraping"]
 
 class FileManager:
     """
@@ -11,36 +19,114 @@ class FileManager:
     and managing progress for question scraping.
 
     Attributes:
-        csv_file (str): Path to the CSV file.
+        csv_file (str): Path to the CSV file, exported from the progress ledger.
+        progress_store (ProgressStore): SQLite ledger of discovered URLs and their scraping
+            status, stored next to the CSV file and seeded from it on first use.
         json_file (str): Path to the output JSON file.
+        result_store (ResultStore): Append-only store next to the JSON file where every
+            scraped question is written as soon as it is parsed.
         input_json_file (str): Path to the input JSON file (user requirements).
-        csv_data (DataFrame): Data loaded from the CSV file.
-        json_data (list): Data loaded from the output JSON file.
+        dead_letter_file (str): Path of the CSV listing the questions given up after repeated
+            failures, exported next to the CSV file.
+        retry_policy (RetryPolicy): Backoff and give-up rules for failed questions, read from
+            the "max_attempts" and "retry_backoff_minutes" user requirements.
+        csv_data (DataFrame): Snapshot of the progress ledger, indexed by (topic, question).
+        json_data (list): Data loaded from the output JSON file, read on first use.
+        result_index (ResultIndex): Position of each question's record in json_data, by
+            (topic, question) key.
         input_json_data (dict): Data loaded from the input JSON file.
     """
     def __init__(self, csv_file, json_file, input_json_file):
         self.csv_file = csv_file
         self.json_file = json_file
         self.input_json_file = input_json_file
-        self.csv_data = self._load_csv()
-        self.json_data = self._load_json(self.json_file)
+        self.result_store = ResultStore(results_path(json_file), on_sync=self._on_results_synced)
+        self._unsynced_rows = []
+        self._json_dirty = False
+        self._input_json_lock = threading.Lock()
+        self._row_listeners = []
+        self._result_listeners = []
+        self._result_filters = []
         self.input_json_data = self._load_json(self.input_json_file)
+        self.dead_letter_file = os.path.join(os.path.dirname(csv_file), "dead_letters.csv")
+        self.retry_policy = RetryPolicy.from_settings(self.input_json_data)
+        self.progress_store = self._load_progress()
+        self._json_data = None
+        self._result_index = None
+
+    def _ensure_results(self):
+        # Results are only read when first needed, so runs that only use the ledger stay fast.
+        if self._json_data is not None:
+            return
+        self._json_data = self._load_results()
+        self._result_index = ResultIndex(self._json_data)
+        if self._result_index.duplicates:
+            print(f"{self._result_index.duplicates} duplicate results in {self.json_file}; "
+                  f"run main.py --compact to merge them.")
+
+    @property
+    def json_data(self):
+        self._ensure_results()
+        return self._json_data
+
+    @property
+    def result_index(self):
+        self._ensure_results()
+        return self._result_index
+
+    def _load_progress(self):
+        progress_store = ProgressStore(
+            os.path.join(os.path.dirname(self.csv_file), "progress.sqlite3"),
+            self.input_json_data.get("exam", "default_exam")
+        )
+        if progress_store.count() == 0 and os.path.exists(self.csv_file):
+            imported = progress_store.import_csv(self.csv_file)
+            print(f"Imported {imported} rows from {self.csv_file} into the progress ledger.")
+        return progress_store
+
+    def _to_dataframe(self, rows):
+        import pandas as pd
 
-    def _load_csv(self):
-        if os.path.exists(self.csv_file):
-            return pd.read_csv(self.csv_file)
-        return pd.DataFrame(columns=["Pregunta", "URL", "Scraping"])
+        data = pd.DataFrame(
+            [(pregunta, url, scraping) for _, pregunta, url, scraping in rows],
+            columns=CSV_COLUMNS,
+            index=pd.Index([key for key, _, _, _ in rows], dtype=object, tupleize_cols=False)
+        )
+        data["Scraping"] = data["Scraping"].astype(bool)
+        return data
+
+    @property
+    def csv_data(self):
+        return self._to_dataframe(self.progress_store.rows())
 
     def load_csv_progress(self):
-        data = pd.read_csv(self.csv_file)
-        if not data.empty:
-            last_question = data['Pregunta'].iloc[-1].split("#: ")[1]
-            return int(last_question), data
-        return 0, pd.DataFrame(columns=["Pregunta", "URL", "Scraping"])
+        return self.progress_store.last_question(), self.csv_data
+
+    def question_keys(self):
+        """
+        Returns the (topic, question) pairs that already have a URL, without building a DataFrame.
+        """
+        return self.progress_store.keys()
+
+    def topic_coverage(self):
+        """
+        Summarizes the ledger per topic.
+
+        Returns:
+            dict: topic -> (number of URLs, highest question number, number scraped).
+        """
+        return self.progress_store.coverage()
 
     def save_csv(self):
-        os.makedirs(os.path.dirname(self.csv_file), exist_ok=True)
-        self.csv_data.to_csv(self.csv_file, index=False)
+        with metrics.timer("csv_export"):
+            self.progress_store.export_csv(self.csv_file)
+            self.progress_store.export_dead_letters(self.dead_letter_file)
+
+    def batch(self):
+        """
+        Returns a context manager that commits all progress updates made inside it at once.
+        """
+        return self.progress_store.transaction()
 
     def _load_json(self, filepath):
         if os.path.exists(filepath) and os.path.getsize(filepath) > 0:
@@ -48,35 +134,210 @@ class FileManager:
                 return json.load(f)
         return {} if filepath == self.input_json_file else []
 
+    def _load_results(self):
+        if self.result_store.exists():
+            return self.result_store.load()
+
+        # First run on an existing output folder: seed the store from the JSON export.
+        json_data = self._load_json(self.json_file)
+        if json_data:
+            self.result_store.extend(json_data)
+        return json_data
+
+    def append_result(self, data, index=None):
+        """
+        Adds one scraped question, appending it to the result store.
+
+        A question that already has a result is not added twice: the new result is merged
+        into the existing one (see merge_records), found through the result index. The
+        result filters are applied to the merged record. A record
+        that shares its key with the new result without being the same question (see
+        same_question) is left alone and the new result is added next to it.
+
+        The CSV row is only marked as scraped once the record has been fsynced, so a
+        crash can never leave a row marked done without its data on disk.
+
+        Args:
+            data (dict): Question data returned by scrape_page.
+            index (tuple): (topic, question) key of the ledger row the data belongs to (default: None).
+        """
+        position = self.result_index.find(data)
+        if position is not None:
+            data = merge_records(self.json_data[position], data)
+        for result_filter in self._result_filters:
+            data = result_filter(data)
+        if position is not None:
+            self.json_data[position] = data
+            self.result_store.replace(position, data)
+        else:
+            position = len(self.json_data)
+            self.result_index.add(result_key(data), position)
+            self.json_data.append(data)
+            self.result_store.append(data)
+        self._json_dirty = True
+        if index is not None:
+            self._unsynced_rows.append(index)
+        for listener in self._result_listeners:
+            listener(data, position)
+
+    def upsert_result(self, data, index=None):
+        """
+        Replaces the stored result of a question, or adds it if it is new.
+
+        Same as append_result, kept for the refresh, which re-scrapes known questions.
+        """
+        self.append_result(data, index)
+
+    def add_result_listener(self, listener):
+        """
+        Registers a function called with every result added or merged and its position in
+        json_data, e.g. to keep a search index up to date.
+        """
+        self._result_listeners.append(listener)
+
+    def add_result_filter(self, result_filter):
+        """
+        Registers a function applied to every result before it is stored, returning the
+        record to store, e.g. to point its images to their mirrored copies.
+        """
+        self._result_filters.append(result_filter)
+
+    def get_result(self, key):
+        """
+        Returns the result of a question by (topic, question) key, or None if it has none
+        or the key only matches several records written before topics were recorded.
+        """
+        position = self.result_index.get(key)
+        return None if position is None else self.json_data[position]
+
+    def get_refresh_rows(self):
+        """
+        Returns the scraped rows with the validators stored by the last refresh.
+
+        Returns:
+            DataFrame: Columns Pregunta, URL, ETag, LastModified and Fingerprint,
+            indexed by (topic, question).
+        """
+        import pandas as pd
+
+        rows = self.progress_store.validator_rows()
+        return pd.DataFrame(
+            [row[1:] for row in rows],
+            columns=["Pregunta", "URL", "ETag", "LastModified", "Fingerprint"],
+            index=pd.Index([row[0] for row in rows], dtype=object, tupleize_cols=False),
+            dtype=object
+        )
+
+    def update_validators(self, index, etag, last_modified, fingerprint):
+        """
+        Stores the HTTP validators and content fingerprint of a question's page, checked now.
+
+        Args:
+            index (tuple): (topic, question) key of the ledger row.
+            etag (str): ETag header of the last response, or None.
+            last_modified (str): Last-Modified header of the last response, or None.
+            fingerprint (str): Hash of the question block of the page, or None.
+        """
+        self.progress_store.set_validators(index, etag, last_modified, fingerprint, time.time())
+
+    def replace_results(self, records):
+        """
+        Replaces all results, rewriting the result store and the JSON export.
+
+        Args:
+            records (list): Question data to keep.
+        """
+        self.result_store.sync()
+        self._unsynced_rows = []
+        self.result_store.rewrite(records)
+        self._json_data = list(records)
+        self._result_index = ResultIndex(self._json_data)
+        self.save_json()
+
+    def _on_results_synced(self):
+        if not self._unsynced_rows:
+            return
+        with metrics.timer("ledger_update"):
+            self.progress_store.mark_scraped(self._unsynced_rows)
+        self._unsynced_rows = []
+
     def save_json(self):
-        os.makedirs(os.path.dirname(self.json_file), exist_ok=True)
-        with open(self.json_file, "w", encoding="utf-8") as f:
-            json.dump(self.json_data, f, ensure_ascii=False, indent=4)
+        """
+        Exports all results to the JSON file read by the front end.
+        """
+        self.result_store.sync()
+        with metrics.timer("json_export"):
+            export_json(self.json_data, self.json_file)
+        self._json_dirty = False
+
+    def close(self):
+        """
+        Flushes the result store and exports the JSON and CSV files.
+        """
+        if self._json_dirty or not os.path.exists(self.json_file):
+            self.save_json()
+        self.result_store.close()
+        self.save_csv()
 
     def validate_files(self):
         if not os.path.exists(self.csv_file):
             self.save_csv()
         if not os.path.exists(self.json_file):
-            self.json_data = []
             self.save_json()
         if not os.path.exists(self.input_json_file):
             raise FileNotFoundError(f"Input JSON file not found: {self.input_json_file}")
 
     def get_pending_rows(self):
-        if "Scraping" not in self.csv_data.columns:
-            self.csv_data["Scraping"] = False
-        return self.csv_data[~self.csv_data["Scraping"]].copy()
+        """
+        Returns the rows to scrape now: not scraped, not given up and due for an attempt.
+        """
+        return self._to_dataframe(self.progress_store.rows(pending_only=True, due_at=time.time()))
+
+    def record_failure(self, index, error):
+        """
+        Records a failed attempt at a question and schedules its retry with the retry policy.
+
+        Args:
+            index (tuple): (topic, question) key of the ledger row.
+            error (Exception): Error raised while loading or parsing the page.
+
+        Returns:
+            tuple: (attempts, next_attempt_at, dead) after this failure.
+        """
+        return self.progress_store.record_failure(index, error, self.retry_policy, time.time())
+
+    def retry_counts(self):
+        """
+        Returns the number of questions waiting for a retry and of questions given up.
+        """
+        return self.progress_store.retry_counts(time.time())
+
+    def revive_failed(self):
+        """
+        Makes every question waiting for a retry or given up due again.
+        """
+        return self.progress_store.revive()
+
+    def add_row_listener(self, listener):
+        """
+        Registers a function called as listener(key, pregunta, url) for every URL added to
+        the ledger, e.g. to start scraping it while discovery goes on.
+
+        The listener runs in the thread adding the row, possibly before its transaction is
+        committed.
+        """
+        self._row_listeners.append(listener)
 
     def append_csv_row(self, row):
-        self.csv_data = pd.concat([
-            self.csv_data,
-            pd.DataFrame([row], columns=["Pregunta", "URL", "Scraping"])
-        ]).reset_index(drop=True)
-        self.save_csv()
+        pregunta, url, scraping = row
+        key = parse_question_key(pregunta)
+        self.progress_store.upsert(key, pregunta, url, scraping)
+        if not scraping:
+            for listener in self._row_listeners:
+                listener(key, pregunta, url)
 
     def update_row(self, index, column, value):
-        self.csv_data.loc[index, column] = value
-        self.save_csv()
+        self.progress_store.update(index, column, value)
 
     def get_input_json_data(self):
         """
@@ -95,6 +356,11 @@ class FileManager:
             key (str): Key to update in the input JSON.
             value: New value for the specified key.
         """
-        self.input_json_data[key] = value
-        with open(self.input_json_file, "w", encoding="utf-8") as f:
-            json.dump(self.input_json_data, f, ensure_ascii=False, indent=4)
\ No newline at end of file
+        with self._input_json_lock:
+            if key in self.input_json_data and self.input_json_data[key] == value:
+                return
+            self.input_json_data[key] = value
+            temp_file = f"{self.input_json_file}.tmp"
+            with open(temp_file, "w", encoding="utf-8") as f:
+                json.dump(self.input_json_data, f, ensure_ascii=False, indent=4)
+            os.replace(temp_file, self.input_json_file)
\ No newline at end of file
@@ -0,0 +1,183 @@
+# Copyright (c) 2025 Diego Martins
+# Licensed under the MIT License. See LICENSE file in the project root for details.
+
+import gzip
+import http.client
+import threading
+import zlib
+from collections import OrderedDict, namedtuple
+from urllib.parse import urljoin, urlsplit
+
+FetchResponse = namedtuple("FetchResponse", ["url", "status", "headers", "text", "not_modified", "content"])
+
+DEFAULT_HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 "
+        "(KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36"
+    ),
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "en-US,en;q=0.9",
+    "Accept-Encoding": "gzip, deflate",
+    "Connection": "keep-alive",
+}
+
+
+class HttpFetcher:
+    """
+    Lightweight HTTP client for server-rendered pages.
+
+    Keeps one keep-alive connection per host and per thread, so it can be shared by
+    all scraper workers, decodes gzip/deflate bodies, and revalidates pages it has
+    already seen with If-None-Match / If-Modified-Since.
+
+    Attributes:
+        timeout (float): Socket timeout in seconds (default: 20).
+        max_redirects (int): Maximum number of redirects followed (default: 5).
+        cache_size (int): Number of validated pages kept for conditional requests (default: 512).
+        headers (dict): Headers sent with every request.
+    """
+    def __init__(self, timeout=20, max_redirects=5, cache_size=512, headers=None):
+        self.timeout = timeout
+        self.max_redirects = max_redirects
+        self.cache_size = cache_size
+        self.headers = dict(DEFAULT_HEADERS)
+        self.headers.update(headers or {})
+        self._local = threading.local()
+        self._validators = OrderedDict()
+        self._lock = threading.Lock()
+
+    def fetch(self, url, headers=None, binary=False):
+        """
+        Fetches a URL, following redirects and reusing the cached body on 304.
+
+        Args:
+            url (str): URL to fetch.
+            headers (dict): Extra request headers (default: None).
+            binary (bool): Return the raw body in `content` instead of decoding it into
+                `text`; binary bodies are not kept for revalidation (default: False).
+
+        Returns:
+            FetchResponse: Final URL, status, response headers, decoded text, whether
+            the body came from a 304 revalidation, and the raw body for binary fetches.
+        """
+        for _ in range(self.max_redirects + 1):
+            request_headers = dict(self.headers)
+            if not binary:
+                request_headers.update(self._conditional_headers(url))
+            request_headers.update(headers or {})
+
+            status, response_headers, body = self._request(url, request_headers)
+
+            if status in (301, 302, 303, 307, 308) and response_headers.get("location"):
+                url = urljoin(url, response_headers["location"])
+                continue
+
+            if status == 304:
+                cached = self._cached(url)
+                if cached is not None and not binary:
+                    return FetchResponse(url, status, response_headers, cached[2], True, None)
+
+            body = self._decompress(body, response_headers)
+            if binary:
+                return FetchResponse(url, status, response_headers, None, False, body)
+            text = self._decode(body, response_headers)
+            if status == 200:
+                self._remember(url, response_headers, text)
+            return FetchResponse(url, status, response_headers, text, False, None)
+
+        raise RuntimeError(f"Too many redirects while fetching {url}")
+
+    def close(self):
+        """
+        Closes the connections opened by the calling thread.
+        """
+        for connection in getattr(self._local, "connections", {}).values():
+            connection.close()
+        self._local.connections = {}
+
+    def _request(self, url, headers):
+        parts = urlsplit(url)
+        path = parts.path or "/"
+        if parts.query:
+            path = f"{path}?{parts.query}"
+
+        # A kept-alive connection may have been closed by the server; retry once on a fresh one.
+        for attempt in range(2):
+            connection = self._connection(parts.scheme, parts.netloc)
+            try:
+                connection.request("GET", path, headers=headers)
+                response = connection.getresponse()
+                body = response.read()
+                response_headers = {key.lower(): value for key, value in response.getheaders()}
+                if response_headers.get("connection", "").lower() == "close":
+                    self._drop_connection(parts.scheme, parts.netloc)
+                return response.status, response_headers, body
+            except (http.client.HTTPException, ConnectionError, OSError):
+                self._drop_connection(parts.scheme, parts.netloc)
+                if attempt:
+                    raise
+
+    def _connection(self, scheme, netloc):
+        connections = getattr(self._local, "connections", None)
+        if connections is None:
+            connections = self._local.connections = {}
+        key = (scheme, netloc)
+        if key not in connections:
+            if scheme == "https":
+                connections[key] = http.client.HTTPSConnection(netloc, timeout=self.timeout)
+            else:
+                connections[key] = http.client.HTTPConnection(netloc, timeout=self.timeout)
+        return connections[key]
+
+    def _drop_connection(self, scheme, netloc):
+        connection = getattr(self._local, "connections", {}).pop((scheme, netloc), None)
+        if connection is not None:
+            connection.close()
+
+    def _decompress(self, body, headers):
+        encoding = headers.get("content-encoding", "").lower()
+        if encoding == "gzip":
+            return gzip.decompress(body)
+        if encoding == "deflate":
+            try:
+                return zlib.decompress(body)
+            except zlib.error:
+                return zlib.decompress(body, -zlib.MAX_WBITS)
+        return body
+
+    def _decode(self, body, headers):
+        charset = "utf-8"
+        content_type = headers.get("content-type", "")
+        if "charset=" in content_type:
+            charset = content_type.split("charset=")[1].split(";")[0].strip() or charset
+        return body.decode(charset, errors="replace")
+
+    def _conditional_headers(self, url):
+        cached = self._cached(url)
+        if cached is None:
+            return {}
+        etag, last_modified, _ = cached
+        headers = {}
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+        return headers
+
+    def _cached(self, url):
+        with self._lock:
+            cached = self._validators.get(url)
+            if cached is not None:
+                self._validators.move_to_end(url)
+            return cached
+
+    def _remember(self, url, headers, text):
+        etag = headers.get("etag")
+        last_modified = headers.get("last-modified")
+        if not etag and not last_modified:
+            return
+        with self._lock:
+            self._validators[url] = (etag, last_modified, text)
+            self._validators.move_to_end(url)
+            while len(self._validators) > self.cache_size:
+                self._validators.popitem(last=False)
@@ -0,0 +1,248 @@
+# Copyright (c) 2025 Diego Martins
+# Licensed under the MIT License. See LICENSE file in the project root for details.
+
+import hashlib
+import io
+import json
+import mimetypes
+import os
+import queue
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+from HttpFetcher import HttpFetcher
+from Metrics import metrics
+from RateLimiter import parse_retry_after
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow is optional: images are then stored as downloaded.
+    Image = None
+
+IMAGE_FIELDS = ("question_image_src", "answer_image_src")
+MANIFEST_FILE = "index.json"
+
+
+def is_remote(src):
+    return str(src).startswith(("http://", "https://"))
+
+
+def image_extension(url, content_type=None):
+    """
+    Picks the file extension of a mirrored image from its URL, or its Content-Type.
+    """
+    extension = os.path.splitext(urlsplit(url).path)[1].lower()
+    if extension in (".png", ".jpg", ".jpeg", ".gif", ".webp", ".svg", ".bmp"):
+        return extension
+    if content_type:
+        guessed = mimetypes.guess_extension(content_type.split(";")[0].strip())
+        if guessed:
+            return guessed
+    return ".img"
+
+
+def optimize_image(content, extension, max_width=None, recompress=False):
+    """
+    Shrinks an image with Pillow, returning the original bytes when that does not help.
+
+    Args:
+        content (bytes): Downloaded image.
+        extension (str): File extension of the image.
+        max_width (int): Downscale images wider than this, keeping the aspect ratio (default: None).
+        recompress (bool): Re-encode the image with the format's optimizer (default: False).
+
+    Returns:
+        bytes: Image to store.
+    """
+    if Image is None or extension in (".svg", ".gif", ".img") or not (max_width or recompress):
+        return content
+    try:
+        with Image.open(io.BytesIO(content)) as image:
+            image_format = image.format
+            if max_width and image.width > max_width:
+                image.thumbnail((max_width, max_width * image.height // image.width + 1))
+            elif not recompress:
+                return content
+            output = io.BytesIO()
+            image.save(output, format=image_format, optimize=True)
+    except (OSError, ValueError):
+        return content
+    optimized = output.getvalue()
+    return optimized if len(optimized) < len(content) else content
+
+
+class ImageMirror:
+    """
+    Local store of the question and answer images of one exam.
+
+    Images are saved under their content hash, so an image linked from several questions
+    or under several URLs is stored once. A manifest maps every remote URL to its file,
+    which makes mirroring resumable and lets later runs rewrite URLs without downloading.
+
+    Attributes:
+        images_folder (str): Folder holding the mirrored images and the manifest.
+        link_base (str): Folder the rewritten paths are relative to, the front end's folder.
+        fetcher (HttpFetcher): Pooled HTTP client used for the downloads.
+        concurrency (int): Maximum number of downloads in flight (default: 8).
+        rate_limiter (HostRateLimiter): Optional per-host pacing of the downloads.
+        max_width (int): Thumbnail width applied when Pillow is available (default: None).
+        recompress (bool): Re-encode images when Pillow is available (default: False).
+    """
+    def __init__(self, images_folder, link_base="./front", fetcher=None, concurrency=8,
+                 rate_limiter=None, max_width=None, recompress=False):
+        self.images_folder = images_folder
+        self.link_base = link_base
+        self.fetcher = fetcher or HttpFetcher()
+        self.concurrency = max(1, int(concurrency))
+        self.rate_limiter = rate_limiter
+        self.max_width = max_width
+        self.recompress = recompress
+        os.makedirs(images_folder, exist_ok=True)
+        self.manifest_file = os.path.join(images_folder, MANIFEST_FILE)
+        self.manifest = self._load_manifest()
+        if (max_width or recompress) and Image is None:
+            print("Pillow is not installed; images are stored without recompression.")
+
+    def _load_manifest(self):
+        if os.path.exists(self.manifest_file):
+            with open(self.manifest_file, "r", encoding="utf-8") as f:
+                return json.load(f)
+        return {}
+
+    def _save_manifest(self):
+        temp_file = f"{self.manifest_file}.tmp"
+        with open(temp_file, "w", encoding="utf-8") as f:
+            json.dump(self.manifest, f, ensure_ascii=False, indent=4, sort_keys=True)
+        os.replace(temp_file, self.manifest_file)
+
+    def local_path(self, url):
+        """
+        Returns the path of a mirrored image relative to the front end, or None if missing.
+        """
+        filename = self.manifest.get(url)
+        if filename is None or not os.path.exists(os.path.join(self.images_folder, filename)):
+            return None
+        path = os.path.relpath(os.path.join(self.images_folder, filename), self.link_base)
+        return path.replace(os.sep, "/")
+
+    def _download(self, url):
+        if self.rate_limiter is not None:
+            self.rate_limiter.wait(url)
+        started = time.monotonic()
+        with metrics.timer("image_download"):
+            response = self.fetcher.fetch(url, binary=True)
+        if self.rate_limiter is not None:
+            self.rate_limiter.report(
+                url, time.monotonic() - started, response.status,
+                retry_after=parse_retry_after(response.headers.get("retry-after"))
+            )
+        if response.status != 200:
+            raise Exception(f"HTTP {response.status}")
+
+        extension = image_extension(response.url, response.headers.get("content-type"))
+        content = optimize_image(response.content, extension, self.max_width, self.recompress)
+        filename = hashlib.sha256(content).hexdigest() + extension
+        image_file = os.path.join(self.images_folder, filename)
+        if not os.path.exists(image_file):
+            temp_file = f"{image_file}.tmp.{os.getpid()}.{id(content)}"
+            with open(temp_file, "wb") as f:
+                f.write(content)
+            os.replace(temp_file, image_file)
+        return filename
+
+    def _mirror(self, urls):
+        pending = queue.Queue()
+        for url in urls:
+            pending.put(url)
+        failed = []
+
+        def worker():
+            try:
+                while True:
+                    try:
+                        url = pending.get_nowait()
+                    except queue.Empty:
+                        return
+                    try:
+                        self.manifest[url] = self._download(url)
+                    except Exception as e:
+                        print(f"Error downloading image {url}: {str(e)}")
+                        failed.append(url)
+            finally:
+                # Release the keep-alive connections this download thread opened.
+                self.fetcher.close()
+
+        workers = min(self.concurrency, len(urls))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="image") as executor:
+            for future in [executor.submit(worker) for _ in range(workers)]:
+                future.result()
+        return failed
+
+    def mirror(self, urls):
+        """
+        Downloads the images not mirrored yet.
+
+        Args:
+            urls (iterable): Remote image URLs.
+
+        Returns:
+            tuple: (downloaded, failed) counts.
+        """
+        missing = sorted({url for url in urls if is_remote(url) and self.local_path(url) is None})
+        if not missing:
+            return 0, 0
+        try:
+            failed = self._mirror(missing)
+        finally:
+            self._save_manifest()
+        return len(missing) - len(failed), len(failed)
+
+    def rewrite(self, record):
+        """
+        Returns a copy of a question record with its mirrored images pointing to local files.
+
+        Images that could not be mirrored keep their remote URL.
+        """
+        rewritten = dict(record)
+        for field in IMAGE_FIELDS:
+            sources = record.get(field)
+            if sources:
+                rewritten[field] = [self.local_path(src) or src if is_remote(src) else src for src in sources]
+        return rewritten
+
+
+def mirror_images(file_manager, images_folder, fetcher=None, concurrency=8, rate_limiter=None,
+                  max_width=None, recompress=False):
+    """
+    Mirrors the images of every scraped question and rewrites the results to local paths.
+
+    Args:
+        file_manager (FileManager): FileManager instance with the scraped results.
+        images_folder (str): Folder the images are stored in.
+        fetcher (HttpFetcher): Pooled HTTP client (default: a new one).
+        concurrency (int): Maximum number of downloads in flight (default: 8).
+        rate_limiter (HostRateLimiter): Optional per-host pacing of the downloads.
+        max_width (int): Thumbnail width applied when Pillow is available (default: None).
+        recompress (bool): Re-encode images when Pillow is available (default: False).
+
+    Returns:
+        dict: Counts of downloaded, failed and rewritten records.
+    """
+    mirror = ImageMirror(
+        images_folder,
+        fetcher=fetcher,
+        concurrency=concurrency,
+        rate_limiter=rate_limiter,
+        max_width=max_width,
+        recompress=recompress
+    )
+    urls = [src for record in file_manager.json_data for field in IMAGE_FIELDS for src in record.get(field) or []]
+    downloaded, failed = mirror.mirror(urls)
+
+    records = [mirror.rewrite(record) for record in file_manager.json_data]
+    rewritten = sum(1 for old, new in zip(file_manager.json_data, records) if old != new)
+    if rewritten:
+        file_manager.replace_results(records)
+
+    print(f"Images: {downloaded} downloaded, {failed} failed, {rewritten} questions now use local copies.")
+    return {"downloaded": downloaded, "failed": failed, "rewritten": rewritten}
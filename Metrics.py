@@ -0,0 +1,234 @@
+# Copyright (c) 2025 Diego Martins
+# Licensed under the MIT License. See LICENSE file in the project root for details.
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+PREFIX = "scraper"
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Metrics:
+    """
+    Thread-safe registry of stage timers and counters for one run.
+
+    Stages are timed with `timer("stage")` or `observe("stage", seconds)`; the latest
+    `max_samples` durations of each stage are kept for the percentiles, while counts and
+    totals cover the whole run. Stage and counter names can carry labels, such as the
+    search provider or the parser backend.
+
+    Attributes:
+        started (float): time.monotonic() when the registry was created or reset.
+        max_samples (int): Durations kept per stage for percentiles (default: 10000).
+    """
+    def __init__(self, max_samples=10000):
+        self.max_samples = max_samples
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.started = time.monotonic()
+            self._stages = {}
+            self._counters = {}
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted(labels.items()))
+
+    def observe(self, stage, seconds, **labels):
+        key = self._key(stage, labels)
+        with self._lock:
+            entry = self._stages.get(key)
+            if entry is None:
+                entry = self._stages[key] = {"count": 0, "total": 0.0, "max": 0.0, "samples": []}
+            entry["count"] += 1
+            entry["total"] += seconds
+            entry["max"] = max(entry["max"], seconds)
+            samples = entry["samples"]
+            if len(samples) < self.max_samples:
+                samples.append(seconds)
+            else:
+                samples[entry["count"] % self.max_samples] = seconds
+
+    @contextmanager
+    def timer(self, stage, **labels):
+        """
+        Times the block as one occurrence of the stage, whether it succeeds or raises.
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - started, **labels)
+
+    def increment(self, counter, amount=1, **labels):
+        key = self._key(counter, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def counter(self, counter, **labels):
+        with self._lock:
+            return self._counters.get(self._key(counter, labels), 0)
+
+    def summary(self):
+        """
+        Returns the run summary: per-stage count, total, mean, p50, p95 and max in
+        seconds, the counters, and the number of questions scraped per minute.
+        """
+        with self._lock:
+            elapsed = time.monotonic() - self.started
+            stages = {
+                self._label(name, labels): {
+                    "count": entry["count"],
+                    "total": entry["total"],
+                    "mean": entry["total"] / entry["count"],
+                    "p50": percentile(entry["samples"], 0.50),
+                    "p95": percentile(entry["samples"], 0.95),
+                    "max": entry["max"],
+                }
+                for (name, labels), entry in sorted(self._stages.items())
+            }
+            counters = {self._label(name, labels): value for (name, labels), value in sorted(self._counters.items())}
+            scraped = sum(value for (name, _), value in self._counters.items() if name == "questions_scraped")
+        return {
+            "elapsed_seconds": elapsed,
+            "questions_per_minute": scraped * 60 / elapsed if elapsed else None,
+            "stages": stages,
+            "counters": counters,
+        }
+
+    @staticmethod
+    def _label(name, labels):
+        if not labels:
+            return name
+        return name + "{" + ",".join(f"{key}={value}" for key, value in labels) + "}"
+
+    def prometheus(self):
+        """
+        Renders the registry in the Prometheus text exposition format.
+        """
+        lines = [
+            f"# HELP {PREFIX}_stage_seconds Time spent per pipeline stage.",
+            f"# TYPE {PREFIX}_stage_seconds summary",
+        ]
+        with self._lock:
+            for (name, labels), entry in sorted(self._stages.items()):
+                label_text = ",".join([f'stage="{_escape(name)}"'] + [f'{k}="{_escape(v)}"' for k, v in labels])
+                for quantile in (0.5, 0.95):
+                    value = percentile(entry["samples"], quantile)
+                    lines.append(f'{PREFIX}_stage_seconds{{{label_text},quantile="{quantile}"}} {value}')
+                lines.append(f"{PREFIX}_stage_seconds_sum{{{label_text}}} {entry['total']}")
+                lines.append(f"{PREFIX}_stage_seconds_count{{{label_text}}} {entry['count']}")
+
+            names = sorted({name for name, _ in self._counters})
+            for name in names:
+                lines.append(f"# TYPE {PREFIX}_{name}_total counter")
+                for (counter, labels), value in sorted(self._counters.items()):
+                    if counter != name:
+                        continue
+                    label_text = ",".join(f'{k}="{_escape(v)}"' for k, v in labels)
+                    lines.append(f"{PREFIX}_{name}_total{{{label_text}}} {value}" if label_text
+                                 else f"{PREFIX}_{name}_total {value}")
+            elapsed = time.monotonic() - self.started
+        lines.append(f"# TYPE {PREFIX}_uptime_seconds gauge")
+        lines.append(f"{PREFIX}_uptime_seconds {elapsed}")
+        return "\n".join(lines) + "\n"
+
+    def print_summary(self):
+        """
+        Prints the questions per minute and the time spent per stage, slowest stage first.
+        """
+        summary = self.summary()
+        rate = summary["questions_per_minute"]
+        print(f"Run took {summary['elapsed_seconds']:.1f}s, {rate or 0:.1f} questions per minute.")
+        stages = sorted(summary["stages"].items(), key=lambda item: item[1]["total"], reverse=True)
+        for stage, values in stages:
+            print(
+                f"  {stage}: {values['count']} x, total {values['total']:.2f}s, "
+                f"p50 {values['p50'] * 1000:.1f}ms, p95 {values['p95'] * 1000:.1f}ms"
+            )
+
+    def write_summary(self, output_file):
+        """
+        Writes the run summary as JSON.
+        """
+        directory = os.path.dirname(output_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_file = f"{output_file}.tmp"
+        with open(temp_file, "w", encoding="utf-8") as f:
+            json.dump(self.summary(), f, indent=4)
+        os.replace(temp_file, output_file)
+
+
+# Registry shared by every module of the process.
+metrics = Metrics()
+
+
+class MetricsServer:
+    """
+    Local HTTP endpoint exposing a Metrics registry while a run is in progress.
+
+    GET /metrics returns the Prometheus text format and GET /summary.json the run summary.
+
+    Attributes:
+        registry (Metrics): Registry served (default: the shared one).
+        port (int): Port to listen on; 0 picks a free one.
+        host (str): Interface to bind (default: "127.0.0.1").
+    """
+    def __init__(self, port, registry=None, host="127.0.0.1"):
+        self.registry = registry or metrics
+        self.host = host
+        self.port = port
+        self._server = None
+
+    def start(self):
+        registry = self.registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                path = self.path.split("?")[0]
+                if path == "/metrics":
+                    body, content_type = registry.prometheus(), "text/plain; version=0.0.4; charset=utf-8"
+                elif path == "/summary.json":
+                    body, content_type = json.dumps(registry.summary(), indent=4), "application/json"
+                else:
+                    self.send_error(404)
+                    return
+                data = body.encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_port
+        threading.Thread(target=self._server.serve_forever, name="metrics", daemon=True).start()
+        print(f"Metrics available at http://{self.host}:{self.port}/metrics")
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
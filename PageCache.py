@@ -0,0 +1,166 @@
+# Copyright (c) 2025 Diego Martins
+# Licensed under the MIT License. See LICENSE file in the project root for details.
+
+import gzip
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    url TEXT PRIMARY KEY,
+    sha256 TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    fetched_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS pages_sha256 ON pages (sha256);
+"""
+
+
+class PageCache:
+    """
+    On-disk cache of raw discussion pages, compressed and addressed by content hash.
+
+    Page bodies live in objects/<aa>/<sha256>.html.gz, so identical pages are stored
+    once, and an SQLite index maps each URL to its current body. Keeping the raw HTML
+    means parser fixes can be applied to a whole exam without fetching it again.
+
+    Attributes:
+        cache_dir (str): Directory holding the index and the objects.
+        max_bytes (int): Size limit of the compressed objects, or None for no limit.
+        max_age_days (float): Age after which a page is evicted, or None for no limit.
+    """
+    def __init__(self, cache_dir, max_bytes=500 * 1024 * 1024, max_age_days=90):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.max_age_days = max_age_days
+        self._local = threading.local()
+        os.makedirs(os.path.join(cache_dir, "objects"), exist_ok=True)
+        self._connection().executescript(SCHEMA)
+
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(os.path.join(self.cache_dir, "index.sqlite3"), timeout=30)
+            connection.execute("PRAGMA journal_mode=WAL")
+            self._local.connection = connection
+        return connection
+
+    def object_path(self, sha256):
+        return os.path.join(self.cache_dir, "objects", sha256[:2], f"{sha256}.html.gz")
+
+    def put(self, url, html):
+        """
+        Stores the HTML of a page and points its URL at it.
+
+        Args:
+            url (str): URL the page was loaded from.
+            html (str): Raw HTML.
+
+        Returns:
+            str: SHA-256 of the page body.
+        """
+        body = html.encode("utf-8")
+        sha256 = hashlib.sha256(body).hexdigest()
+        path = self.object_path(sha256)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            temp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(temp_path, "wb") as f:
+                f.write(gzip.compress(body, compresslevel=6))
+            os.replace(temp_path, path)
+
+        now = time.time()
+        connection = self._connection()
+        with connection:
+            connection.execute(
+                """
+                INSERT INTO pages (url, sha256, size, fetched_at, accessed_at) VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (url) DO UPDATE SET
+                    sha256 = excluded.sha256, size = excluded.size,
+                    fetched_at = excluded.fetched_at, accessed_at = excluded.accessed_at
+                """,
+                (url, sha256, os.path.getsize(path), now, now)
+            )
+        return sha256
+
+    def lookup(self, url):
+        """
+        Returns the object path and hash cached for a URL.
+
+        Returns:
+            tuple or None: (path, sha256), or None if the URL is not cached.
+        """
+        row = self._connection().execute("SELECT sha256 FROM pages WHERE url = ?", (url,)).fetchone()
+        if row is None:
+            return None
+        path = self.object_path(row[0])
+        if not os.path.exists(path):
+            return None
+        return path, row[0]
+
+    def get(self, url):
+        """
+        Returns the cached HTML of a URL.
+
+        Returns:
+            str or None: HTML, or None if the URL is not cached.
+        """
+        found = self.lookup(url)
+        if found is None:
+            return None
+        connection = self._connection()
+        with connection:
+            connection.execute("UPDATE pages SET accessed_at = ? WHERE url = ?", (time.time(), url))
+        return read_cached_page(found[0])
+
+    def evict(self):
+        """
+        Drops pages older than max_age_days, then the least recently used pages until the
+        cache fits in max_bytes, and deletes objects no URL points to anymore.
+
+        Returns:
+            int: Number of URLs evicted.
+        """
+        connection = self._connection()
+        evicted = 0
+        with connection:
+            if self.max_age_days:
+                cutoff = time.time() - self.max_age_days * 86400
+                evicted += connection.execute("DELETE FROM pages WHERE fetched_at < ?", (cutoff,)).rowcount
+
+            if self.max_bytes:
+                objects = connection.execute(
+                    "SELECT sha256, size, MAX(accessed_at) FROM pages GROUP BY sha256 ORDER BY MAX(accessed_at)"
+                ).fetchall()
+                total = sum(size for _, size, _ in objects)
+                for sha256, size, _ in objects:
+                    if total <= self.max_bytes:
+                        break
+                    evicted += connection.execute("DELETE FROM pages WHERE sha256 = ?", (sha256,)).rowcount
+                    total -= size
+
+        referenced = {row[0] for row in connection.execute("SELECT DISTINCT sha256 FROM pages")}
+        objects_dir = os.path.join(self.cache_dir, "objects")
+        for prefix in os.listdir(objects_dir):
+            for name in os.listdir(os.path.join(objects_dir, prefix)):
+                if not name.endswith(".tmp") and name.split(".")[0] not in referenced:
+                    os.remove(os.path.join(objects_dir, prefix, name))
+        return evicted
+
+
+def read_cached_page(path):
+    """
+    Reads and decompresses a cached page object.
+
+    Args:
+        path (str): Path of the .html.gz object.
+
+    Returns:
+        str: Raw HTML.
+    """
+    with gzip.open(path, "rb") as f:
+        return f.read().decode("utf-8")
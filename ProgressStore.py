@@ -0,0 +1,547 @@
+# Copyright (c) 2025 Diego Martins
+# Licensed under the MIT License. See LICENSE file in the project root for details.
+
+import csv
+import os
+import re
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from RetryPolicy import describe_error
+
+COLUMNS = {"Pregunta": "pregunta", "URL": "url", "Scraping": "scraping"}
+
+TABLE = """
+CREATE TABLE IF NOT EXISTS {name} (
+    exam TEXT NOT NULL,
+    topic INTEGER NOT NULL DEFAULT 1,
+    question INTEGER NOT NULL,
+    pregunta TEXT NOT NULL,
+    url TEXT,
+    scraping INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (exam, topic, question)
+);
+"""
+INDEXES = "CREATE INDEX IF NOT EXISTS progress_pending ON progress (exam, scraping);"
+SCHEMA = TABLE.format(name="progress") + INDEXES
+
+LABEL_PATTERN = re.compile(r"^\s*(?:Topic\s+(\d+)\s+)?Question\s*#:\s*(\d+)\s*$", re.IGNORECASE)
+
+# Columns added after the first release of the ledger, created on open when missing.
+EXTRA_COLUMNS = {
+    "etag": "TEXT",
+    "last_modified": "TEXT",
+    "fingerprint": "TEXT",
+    "checked_at": "REAL",
+    "attempts": "INTEGER NOT NULL DEFAULT 0",
+    "last_error": "TEXT",
+    "last_attempt_at": "REAL",
+    "next_attempt_at": "REAL",
+    "dead": "INTEGER NOT NULL DEFAULT 0",
+}
+
+
+def parse_question_number(pregunta):
+    """
+    Extracts the question number from a "Question #: N" label.
+
+    Args:
+        pregunta (str): Question label as stored in the CSV.
+
+    Returns:
+        int: Question number.
+    """
+    return int(str(pregunta).split("#:")[-1].strip())
+
+
+def question_label(topic, question):
+    """
+    Builds the CSV label of a question: "Question #: N" for topic 1, as in ledgers written
+    before topics were tracked, and "Topic T Question #: N" for the other topics.
+    """
+    if topic == 1:
+        return f"Question #: {question}"
+    return f"Topic {topic} Question #: {question}"
+
+
+def parse_question_key(pregunta):
+    """
+    Extracts the (topic, question) key from a label built by question_label.
+
+    Returns:
+        tuple: (topic, question) as integers.
+    """
+    match = LABEL_PATTERN.match(str(pregunta))
+    if match is None:
+        return 1, parse_question_number(pregunta)
+    return int(match.group(1) or 1), int(match.group(2))
+
+
+def question_key(key):
+    """
+    Normalizes a row key: a (topic, question) pair, or a bare question number of topic 1.
+    """
+    if isinstance(key, tuple):
+        return int(key[0]), int(key[1])
+    return 1, int(key)
+
+
+def verify_missing_questions(found_keys, max_questions):
+    """
+    Verifies which questions are missing from the ledger.
+
+    While only topic 1 is known, questions 1..max_questions of topic 1 are expected, as
+    before topics were tracked. Once several topics are known, each topic is expected to
+    run from 1 to its highest known question, and questions still unaccounted for in the
+    exam total are expected at the end of the last topic.
+
+    Args:
+        found_keys (set): (topic, question) pairs that already have a URL.
+        max_questions (int): Total number of questions of the exam.
+
+    Returns:
+        list: Sorted (topic, question) pairs of the missing questions.
+    """
+    highest = {}
+    for topic, question in found_keys:
+        highest[topic] = max(highest.get(topic, 0), question)
+    if set(highest) <= {1}:
+        highest = {1: max_questions}
+    else:
+        last_topic = max(highest)
+        highest[last_topic] += max(0, max_questions - sum(highest.values()))
+
+    return sorted(
+        (topic, question)
+        for topic, last in highest.items()
+        for question in range(1, last + 1)
+        if (topic, question) not in found_keys
+    )
+
+
+class ProgressStore:
+    """
+    SQLite ledger of discovered discussion URLs and their scraping status.
+
+    Rows are keyed by (exam, topic, question), so status updates touch a single row
+    instead of rewriting a file. Methods taking a `key` accept a (topic, question) pair
+    or a bare question number, which refers to topic 1. The database runs in WAL mode and every thread gets its own
+    connection, so several scraper workers and readers can use it at the same time.
+
+    Attributes:
+        db_file (str): Path to the SQLite database.
+        exam (str): Exam the rows of this store belong to.
+        read_only (bool): Open an existing ledger without creating or migrating its schema,
+            and refuse every write (default: False).
+    """
+    def __init__(self, db_file, exam, read_only=False):
+        self.db_file = db_file
+        self.exam = exam
+        self.read_only = read_only
+        self._local = threading.local()
+        if read_only:
+            return
+        directory = os.path.dirname(db_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connection().executescript(SCHEMA)
+        self._migrate()
+
+    def _migrate(self):
+        connection = self._connection()
+        existing = {row[1] for row in connection.execute("PRAGMA table_info(progress)")}
+        for name, column_type in EXTRA_COLUMNS.items():
+            if name not in existing:
+                connection.execute(f"ALTER TABLE progress ADD COLUMN {name} {column_type}")
+
+        if "topic" not in existing:
+            # Ledgers created before topics were tracked are keyed by question only. The
+            # primary key cannot be altered in place, so the table is rebuilt with every
+            # existing row assigned to topic 1.
+            columns = ", ".join(["exam", "question", "pregunta", "url", "scraping", *EXTRA_COLUMNS])
+            with self.transaction():
+                connection.execute(TABLE.format(name="progress_topics"))
+                for name, column_type in EXTRA_COLUMNS.items():
+                    connection.execute(f"ALTER TABLE progress_topics ADD COLUMN {name} {column_type}")
+                connection.execute(
+                    f"INSERT INTO progress_topics (topic, {columns}) SELECT 1, {columns} FROM progress"
+                )
+                connection.execute("DROP TABLE progress")
+                connection.execute("ALTER TABLE progress_topics RENAME TO progress")
+                connection.execute(INDEXES)
+
+    def needs_migration(self):
+        """
+        Tells whether the ledger lacks the table or columns of the current schema, which
+        are added when it is opened for writing.
+        """
+        existing = {row[1] for row in self._connection().execute("PRAGMA table_info(progress)")}
+        return "topic" not in existing or any(name not in existing for name in EXTRA_COLUMNS)
+
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            if self.read_only:
+                uri = Path(os.path.abspath(self.db_file)).as_uri() + "?mode=ro"
+                connection = sqlite3.connect(uri, uri=True, timeout=30, isolation_level=None)
+            else:
+                connection = sqlite3.connect(self.db_file, timeout=30, isolation_level=None)
+                connection.execute("PRAGMA journal_mode=WAL")
+                connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+            self._local.depth = 0
+        return connection
+
+    @contextmanager
+    def transaction(self):
+        """
+        Groups every write made inside the block into one transaction.
+
+        Nested blocks join the outermost transaction.
+        """
+        connection = self._connection()
+        if self._local.depth == 0:
+            connection.execute("BEGIN IMMEDIATE")
+        self._local.depth += 1
+        try:
+            yield connection
+        except BaseException:
+            self._local.depth -= 1
+            if self._local.depth == 0:
+                connection.execute("ROLLBACK")
+            raise
+        self._local.depth -= 1
+        if self._local.depth == 0:
+            connection.execute("COMMIT")
+
+    def upsert(self, key, pregunta, url, scraping=False):
+        """
+        Adds a discovered URL, or replaces the URL of an existing question.
+
+        A question keeps its scraping status, cache validators and failure history unless
+        its URL changes.
+
+        Args:
+            key (tuple): (topic, question) pair, or a question number of topic 1.
+            pregunta (str): Question label.
+            url (str): Discussion URL.
+            scraping (bool): Whether the question is already scraped (default: False).
+        """
+        with self.transaction() as connection:
+            connection.execute(
+                """
+                INSERT INTO progress (exam, topic, question, pregunta, url, scraping) VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (exam, topic, question) DO UPDATE SET
+                    pregunta = excluded.pregunta,
+                    scraping = CASE WHEN progress.url = excluded.url THEN progress.scraping
+                                    ELSE excluded.scraping END,
+                    etag = CASE WHEN progress.url = excluded.url THEN progress.etag END,
+                    last_modified = CASE WHEN progress.url = excluded.url THEN progress.last_modified END,
+                    fingerprint = CASE WHEN progress.url = excluded.url THEN progress.fingerprint END,
+                    attempts = CASE WHEN progress.url = excluded.url THEN progress.attempts ELSE 0 END,
+                    last_error = CASE WHEN progress.url = excluded.url THEN progress.last_error END,
+                    next_attempt_at = CASE WHEN progress.url = excluded.url THEN progress.next_attempt_at END,
+                    dead = CASE WHEN progress.url = excluded.url THEN progress.dead ELSE 0 END,
+                    url = excluded.url
+                """,
+                (self.exam, *question_key(key), pregunta, url, int(bool(scraping)))
+            )
+
+    def update(self, key, column, value):
+        """
+        Updates one column of a question row.
+
+        Args:
+            key (tuple): (topic, question) pair, or a question number of topic 1.
+            column (str): CSV column name ("Pregunta", "URL" or "Scraping").
+            value: New value.
+        """
+        if column not in COLUMNS:
+            raise KeyError(f"Unknown progress column: {column}")
+        if column == "Scraping":
+            value = int(bool(value))
+        with self.transaction() as connection:
+            connection.execute(
+                f"UPDATE progress SET {COLUMNS[column]} = ? WHERE exam = ? AND topic = ? AND question = ?",
+                (value, self.exam, *question_key(key))
+            )
+
+    def mark_scraped(self, keys):
+        """
+        Marks several questions as scraped in a single transaction, clearing any pending retry.
+
+        Args:
+            keys (iterable): (topic, question) pairs or question numbers of topic 1.
+        """
+        with self.transaction() as connection:
+            connection.executemany(
+                """
+                UPDATE progress SET scraping = 1, next_attempt_at = NULL, dead = 0
+                WHERE exam = ? AND topic = ? AND question = ?
+                """,
+                [(self.exam, *question_key(key)) for key in keys]
+            )
+
+    def record_failure(self, key, error, policy, now):
+        """
+        Counts a failed scraping attempt and schedules the next one with a RetryPolicy.
+
+        Args:
+            key (tuple): (topic, question) pair, or a question number of topic 1.
+            error (Exception): Error raised by the attempt.
+            policy (RetryPolicy): Policy deciding the next attempt.
+            now (float): Unix time of the attempt.
+
+        Returns:
+            tuple: (attempts, next_attempt_at, dead) after this failure.
+        """
+        topic, question = question_key(key)
+        with self.transaction() as connection:
+            row = connection.execute(
+                "SELECT attempts FROM progress WHERE exam = ? AND topic = ? AND question = ?",
+                (self.exam, topic, question)
+            ).fetchone()
+            attempts = (row[0] if row else 0) + 1
+            next_attempt_at, dead = policy.schedule(attempts, error, now)
+            connection.execute(
+                """
+                UPDATE progress SET attempts = ?, last_error = ?, last_attempt_at = ?, next_attempt_at = ?, dead = ?
+                WHERE exam = ? AND topic = ? AND question = ?
+                """,
+                (attempts, describe_error(error), now, next_attempt_at, int(dead), self.exam, topic, question)
+            )
+        return attempts, next_attempt_at, dead
+
+    def dead_letters(self):
+        """
+        Returns the questions given up after repeated failures, ordered by topic and question.
+
+        Returns:
+            list: Tuples of ((topic, question), pregunta, url, attempts, last_error, last_attempt_at).
+        """
+        return [
+            ((topic, question), *rest)
+            for topic, question, *rest in self._connection().execute(
+                """
+                SELECT topic, question, pregunta, url, attempts, last_error, last_attempt_at FROM progress
+                WHERE exam = ? AND scraping = 0 AND dead = 1 ORDER BY topic, question
+                """,
+                (self.exam,)
+            )
+        ]
+
+    def revive(self):
+        """
+        Puts every dead-letter question and pending retry back in the queue with a fresh
+        attempt count, e.g. after a parser fix.
+
+        Returns:
+            int: Number of questions revived.
+        """
+        with self.transaction() as connection:
+            return connection.execute(
+                """
+                UPDATE progress SET attempts = 0, next_attempt_at = NULL, dead = 0
+                WHERE exam = ? AND scraping = 0 AND (dead = 1 OR next_attempt_at IS NOT NULL)
+                """,
+                (self.exam,)
+            ).rowcount
+
+    def set_validators(self, key, etag, last_modified, fingerprint, checked_at):
+        """
+        Stores the HTTP validators and content fingerprint of a question's page.
+
+        Args:
+            key (tuple): (topic, question) pair, or a question number of topic 1.
+            etag (str): ETag header of the last response, or None.
+            last_modified (str): Last-Modified header of the last response, or None.
+            fingerprint (str): Hash of the question block of the page, or None.
+            checked_at (float): Unix time of the check.
+        """
+        with self.transaction() as connection:
+            connection.execute(
+                """
+                UPDATE progress SET etag = ?, last_modified = ?, fingerprint = ?, checked_at = ?
+                WHERE exam = ? AND topic = ? AND question = ?
+                """,
+                (etag, last_modified, fingerprint, checked_at, self.exam, *question_key(key))
+            )
+
+    def validator_rows(self):
+        """
+        Returns the scraped rows with their stored validators, ordered by topic and question.
+        Rows whose page is gone (given up by a refresh) are left out.
+
+        Returns:
+            list: Tuples of ((topic, question), pregunta, url, etag, last_modified, fingerprint).
+        """
+        return [
+            ((topic, question), *rest)
+            for topic, question, *rest in self._connection().execute(
+                """
+                SELECT topic, question, pregunta, url, etag, last_modified, fingerprint FROM progress
+                WHERE exam = ? AND scraping = 1 AND dead = 0 ORDER BY topic, question
+                """,
+                (self.exam,)
+            )
+        ]
+
+    def rows(self, pending_only=False, due_at=None):
+        """
+        Returns the ledger rows ordered by topic and question.
+
+        Args:
+            pending_only (bool): Only return rows not scraped yet (default: False).
+            due_at (float): With pending_only, also leave out dead-letter rows and rows whose
+                next attempt is after this Unix time (default: None, keep them).
+
+        Returns:
+            list: Tuples of ((topic, question), pregunta, url, scraping).
+        """
+        query = "SELECT topic, question, pregunta, url, scraping FROM progress WHERE exam = ?"
+        parameters = [self.exam]
+        if pending_only:
+            query += " AND scraping = 0"
+            if due_at is not None:
+                query += " AND dead = 0 AND (next_attempt_at IS NULL OR next_attempt_at <= ?)"
+                parameters.append(due_at)
+        query += " ORDER BY topic, question"
+        return [
+            ((topic, question), pregunta, url, bool(scraping))
+            for topic, question, pregunta, url, scraping in self._connection().execute(query, parameters)
+        ]
+
+    def retry_counts(self, now):
+        """
+        Returns the number of pending rows waiting for their next attempt and of dead-letter rows.
+        """
+        waiting, dead = self._connection().execute(
+            """
+            SELECT COALESCE(SUM(dead = 0 AND next_attempt_at > ?), 0), COALESCE(SUM(dead), 0) FROM progress
+            WHERE exam = ? AND scraping = 0
+            """,
+            (now, self.exam)
+        ).fetchone()
+        return waiting, dead
+
+    def keys(self):
+        """
+        Returns the (topic, question) pairs that have a URL in the ledger.
+        """
+        return set(self._connection().execute(
+            "SELECT topic, question FROM progress WHERE exam = ?", (self.exam,)
+        ).fetchall())
+
+    def coverage(self):
+        """
+        Summarizes the ledger per topic.
+
+        Returns:
+            dict: topic -> (number of URLs, highest question number, number scraped).
+        """
+        return {
+            topic: (count, highest, scraped)
+            for topic, count, highest, scraped in self._connection().execute(
+                """
+                SELECT topic, COUNT(*), MAX(question), SUM(scraping) FROM progress
+                WHERE exam = ? GROUP BY topic ORDER BY topic
+                """,
+                (self.exam,)
+            )
+        }
+
+    def count(self, pending_only=False, due_at=None):
+        query = "SELECT COUNT(*) FROM progress WHERE exam = ?"
+        parameters = [self.exam]
+        if pending_only:
+            query += " AND scraping = 0"
+            if due_at is not None:
+                query += " AND dead = 0 AND (next_attempt_at IS NULL OR next_attempt_at <= ?)"
+                parameters.append(due_at)
+        return self._connection().execute(query, parameters).fetchone()[0]
+
+    def last_question(self):
+        """
+        Returns the highest question number with a known URL, or 0 if there is none.
+        """
+        row = self._connection().execute(
+            "SELECT MAX(question) FROM progress WHERE exam = ?", (self.exam,)
+        ).fetchone()
+        return row[0] or 0
+
+    def import_csv(self, csv_file):
+        """
+        One-time import of a legacy discussion_url.csv ledger.
+
+        Args:
+            csv_file (str): Path to the CSV file.
+
+        Returns:
+            int: Number of rows imported.
+        """
+        imported = 0
+        with open(csv_file, "r", encoding="utf-8", newline="") as f, self.transaction():
+            for row in csv.DictReader(f):
+                if not row.get("Pregunta"):
+                    continue
+                self.upsert(
+                    parse_question_key(row["Pregunta"]),
+                    row["Pregunta"],
+                    row.get("URL"),
+                    str(row.get("Scraping", "")).strip().lower() == "true"
+                )
+                imported += 1
+        return imported
+
+    def export_csv(self, csv_file):
+        """
+        Writes the ledger in the discussion_url.csv layout.
+
+        Args:
+            csv_file (str): Path of the CSV file to produce.
+        """
+        directory = os.path.dirname(csv_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_file = f"{csv_file}.tmp"
+        with open(temp_file, "w", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(list(COLUMNS))
+            for _, pregunta, url, scraping in self.rows():
+                writer.writerow([pregunta, url, scraping])
+        os.replace(temp_file, csv_file)
+
+    def export_dead_letters(self, csv_file):
+        """
+        Writes the dead-letter list with the attempts and last error of each question,
+        or removes the file when the list is empty.
+
+        Args:
+            csv_file (str): Path of the CSV file to produce.
+
+        Returns:
+            int: Number of dead-letter questions.
+        """
+        rows = self.dead_letters()
+        if not rows:
+            if os.path.exists(csv_file):
+                os.remove(csv_file)
+            return 0
+        temp_file = f"{csv_file}.tmp"
+        with open(temp_file, "w", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["Pregunta", "URL", "Attempts", "LastError", "LastAttemptAt"])
+            for _, pregunta, url, attempts, last_error, last_attempt_at in rows:
+                writer.writerow([pregunta, url, attempts, last_error, last_attempt_at])
+        os.replace(temp_file, csv_file)
+        return len(rows)
+
+    def close(self):
+        """
+        Closes the connection opened by the calling thread.
+        """
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
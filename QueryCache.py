@@ -0,0 +1,120 @@
+# Copyright (c) 2025 Diego Martins
+# Licensed under the MIT License. See LICENSE file in the project root for details.
+
+import os
+import sqlite3
+import threading
+import time
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS queries (
+    query TEXT PRIMARY KEY,
+    url TEXT,
+    misses INTEGER NOT NULL DEFAULT 0,
+    checked_at REAL NOT NULL,
+    expires_at REAL NOT NULL
+);
+"""
+
+HIT = "hit"
+MISS = "miss"
+
+
+def normalize_query(query, target_domain=""):
+    return f"{target_domain}\n{' '.join(query.lower().split())}"
+
+
+class QueryCache:
+    """
+    SQLite cache of search queries and their answers, shared by runs and exams.
+
+    A query that found a URL is trusted for `hit_ttl`. A query that found nothing is
+    retried after a delay that doubles with every consecutive miss, from `miss_backoff`
+    up to `max_miss_backoff`, so questions that are not indexed yet are still picked up
+    eventually without being searched on every run.
+
+    Attributes:
+        db_file (str): Path to the SQLite database.
+        hit_ttl (float): Seconds a found URL is reused (default: 30 days).
+        miss_backoff (float): Seconds a first miss is remembered (default: 6 hours).
+        max_miss_backoff (float): Upper bound of the miss backoff (default: 14 days).
+    """
+    def __init__(self, db_file, hit_ttl=30 * 86400, miss_backoff=6 * 3600, max_miss_backoff=14 * 86400):
+        self.db_file = db_file
+        self.hit_ttl = hit_ttl
+        self.miss_backoff = miss_backoff
+        self.max_miss_backoff = max_miss_backoff
+        self._local = threading.local()
+        directory = os.path.dirname(db_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connection().executescript(SCHEMA)
+
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.db_file, timeout=30, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def lookup(self, query, target_domain=""):
+        """
+        Returns the cached answer of a query.
+
+        Returns:
+            tuple: ("hit", url) or ("miss", None) for a fresh answer, (None, None) when the
+            query has to be searched.
+        """
+        row = self._connection().execute(
+            "SELECT url, expires_at FROM queries WHERE query = ?", (normalize_query(query, target_domain),)
+        ).fetchone()
+        if row is None or row[1] <= time.time():
+            return None, None
+        url, _ = row
+        return (HIT, url) if url else (MISS, None)
+
+    def store(self, query, url, target_domain=""):
+        """
+        Records the answer of a search: the URL found, or None for a miss.
+        """
+        now = time.time()
+        key = normalize_query(query, target_domain)
+        connection = self._connection()
+        if url:
+            connection.execute(
+                """
+                INSERT INTO queries (query, url, misses, checked_at, expires_at) VALUES (?, ?, 0, ?, ?)
+                ON CONFLICT (query) DO UPDATE SET
+                    url = excluded.url, misses = 0,
+                    checked_at = excluded.checked_at, expires_at = excluded.expires_at
+                """,
+                (key, url, now, now + self.hit_ttl)
+            )
+            return
+
+        row = connection.execute("SELECT misses FROM queries WHERE query = ?", (key,)).fetchone()
+        misses = (row[0] if row else 0) + 1
+        backoff = min(self.miss_backoff * 2 ** (misses - 1), self.max_miss_backoff)
+        connection.execute(
+            """
+            INSERT INTO queries (query, url, misses, checked_at, expires_at) VALUES (?, NULL, ?, ?, ?)
+            ON CONFLICT (query) DO UPDATE SET
+                url = NULL, misses = excluded.misses,
+                checked_at = excluded.checked_at, expires_at = excluded.expires_at
+            """,
+            (key, misses, now, now + backoff)
+        )
+
+    def forget(self, query, target_domain=""):
+        self._connection().execute("DELETE FROM queries WHERE query = ?", (normalize_query(query, target_domain),))
+
+    def close(self):
+        """
+        Closes the connection opened by the calling thread.
+        """
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
@@ -1,17 +1,26 @@
 # Copyright (c) 2025 Diego Martins
 # Licensed under the MIT License. See LICENSE file in the project root for details.
 
-import random
+import hashlib
+import re
 import os
 import json
 import time
 from FileManager import FileManager
+from concurrent.futures import ProcessPoolExecutor
+from RateLimiter import detect_block, parse_retry_after
+from PageCache import read_cached_page
+from RetryPolicy import PageGoneError, PageParseError
+from FastParser import scrape_html
+from Metrics import metrics
 import pandas as pd
 from bs4 import BeautifulSoup
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 
+TOPIC_PATTERN = re.compile(r"Topic\s*#:\s*(\d+)")
+
 
 def load_page(browser, url, wait_time=10):
     """
@@ -29,15 +38,175 @@ def load_page(browser, url, wait_time=10):
         Exception: If the page cannot be loaded or the element is not found.
     """
     try:
-        browser.get(url)
-        WebDriverWait(browser, wait_time).until(
-            EC.presence_of_element_located((By.CLASS_NAME, "question-discussion-header"))
-        )
+        with metrics.timer("browser_get"):
+            browser.get(url)
+        with metrics.timer("wait_question"):
+            WebDriverWait(browser, wait_time).until(
+                EC.presence_of_element_located((By.CLASS_NAME, "question-discussion-header"))
+            )
         return BeautifulSoup(browser.page_source, "html.parser")
     except Exception as e:
         raise Exception(f"Error al cargar la página {url}: {str(e)}")
 
 
+def fetch_html(url, fetcher=None, browser=None, page_cache=None, rate_limiter=None):
+    """
+    Loads a discussion page over plain HTTP and falls back to the browser when needed.
+
+    The question block is server-rendered, so the HTTP response is used as is when it
+    contains the expected markers. Blocked responses, error statuses or pages without
+    the markers are loaded again through Selenium, after waiting for the host's next
+    slot if the response was a block. Every load is reported to the rate limiter.
+
+    Args:
+        url (str): URL of the discussion page.
+        fetcher (HttpFetcher): Shared HTTP client, or None to always use the browser.
+        browser (WebDriver): Selenium WebDriver instance used as fallback.
+        page_cache (PageCache): Cache receiving the raw HTML of the page (default: None).
+        rate_limiter (HostRateLimiter): Limiter told how each load went (default: None).
+
+    Returns:
+        str: Raw HTML of the page.
+
+    Raises:
+        PageGoneError: If the HTTP client gets a 404 or 410 for the page.
+        Exception: If the page cannot be loaded by either path.
+    """
+    return fetch_response(url, fetcher, browser, page_cache, rate_limiter)[0]
+
+
+def fetch_response(url, fetcher=None, browser=None, page_cache=None, rate_limiter=None, headers=None):
+    """
+    Same as fetch_html, also returning the HTTP response the page came from, so callers
+    can read its validators, and sending the caller's conditional headers.
+
+    Args:
+        headers (dict): Extra request headers, such as If-None-Match (default: None).
+
+    Returns:
+        tuple: (html, response). html is None when the server answered 304 to `headers`;
+        response is None when the page was loaded by the browser.
+
+    Raises:
+        PageGoneError: If the HTTP client gets a 404 or 410 for the page.
+        Exception: If the page cannot be loaded by either path.
+    """
+    if fetcher is not None:
+        try:
+            started = time.monotonic()
+            with metrics.timer("http_fetch"):
+                response = fetcher.fetch(url, headers=headers)
+            blocked = detect_block(response.status, response.text)
+            if rate_limiter is not None:
+                rate_limiter.report(
+                    url, time.monotonic() - started, response.status, blocked,
+                    parse_retry_after(response.headers.get("retry-after"))
+                )
+            if response.status in (404, 410):
+                raise PageGoneError(f"HTTP {response.status} for {url}")
+            if headers and response.status == 304:
+                return None, response
+            if response.status in (200, 304) and not blocked and has_question_markers(response.text):
+                if page_cache is not None:
+                    with metrics.timer("page_cache_put"):
+                        page_cache.put(url, response.text)
+                return response.text, response
+            print(f"HTTP fetch of {url} returned status {response.status} without question markers, using browser.")
+            if blocked and rate_limiter is not None and browser is not None:
+                rate_limiter.wait(url)
+        except PageGoneError:
+            raise
+        except Exception as e:
+            print(f"HTTP fetch of {url} failed ({e}), using browser.")
+
+    if browser is None:
+        raise Exception(f"Error al cargar la página {url}: no browser available for fallback")
+    if fetcher is not None:
+        metrics.increment("browser_fallbacks")
+    started = time.monotonic()
+    try:
+        load_page(browser, url)
+    except Exception:
+        # A CAPTCHA page never shows the question header; tell it apart from a slow page.
+        if rate_limiter is not None:
+            try:
+                blocked = detect_block(text=browser.page_source)
+            except Exception:
+                blocked = False
+            # A timeout counts as a slow response.
+            rate_limiter.report(url, time.monotonic() - started, blocked=blocked)
+        raise
+    html = browser.page_source
+    if rate_limiter is not None:
+        rate_limiter.report(url, time.monotonic() - started, blocked=detect_block(text=html))
+    if page_cache is not None:
+        with metrics.timer("page_cache_put"):
+            page_cache.put(url, html)
+    return html, None
+
+
+def fetch_page(url, fetcher=None, browser=None, page_cache=None):
+    """
+    Same as fetch_html, returning the page parsed by BeautifulSoup.
+
+    Returns:
+        BeautifulSoup: Parsed HTML content of the page.
+    """
+    return BeautifulSoup(fetch_html(url, fetcher, browser, page_cache), "html.parser")
+
+
+def parse_html(html, parser="lxml"):
+    """
+    Extracts question data from raw HTML with the selected parser backend.
+
+    Args:
+        html (str): Raw HTML of a discussion page.
+        parser (str): "lxml" for the precompiled XPath parser in FastParser, or "bs4"
+            for scrape_page over a BeautifulSoup tree (default: "lxml").
+
+    Returns:
+        dict: Extracted question data, as returned by scrape_page.
+
+    Raises:
+        ValueError: If the parser name is unknown.
+    """
+    if parser == "lxml":
+        with metrics.timer("parse", parser=parser):
+            return scrape_html(html)
+    if parser == "bs4":
+        with metrics.timer("parse", parser=parser):
+            return scrape_page(BeautifulSoup(html, "html.parser"))
+    raise ValueError(f"Unknown parser: {parser}")
+
+
+def check_parser_parity(html):
+    """
+    Parses a page with both backends and compares the results.
+
+    Args:
+        html (str): Raw HTML of a discussion page.
+
+    Returns:
+        tuple: (equal, bs4_result, lxml_result).
+    """
+    expected = parse_html(html, "bs4")
+    actual = parse_html(html, "lxml")
+    return expected == actual, expected, actual
+
+
+def has_question_markers(html):
+    """
+    Checks whether raw HTML contains the elements scrape_page relies on.
+
+    Args:
+        html (str): Raw HTML of a discussion page.
+
+    Returns:
+        bool: True if the discussion header and question body are present.
+    """
+    return "question-discussion-header" in html and "question-body" in html
+
+
 def scrape_page(soup):
     """
     Extracts question data from a BeautifulSoup object representing a loaded page.
@@ -49,10 +218,11 @@ def scrape_page(soup):
         dict: Extracted question data including question text, choices, images, and answers.
 
     Raises:
-        Exception: If required elements are not found in the page.
+        PageParseError: If required elements are not found in the page.
     """
     try:
         question_number = extract_question_number(soup)
+        topic = extract_topic_number(soup)
         question_body = soup.find("div", class_="question-body mt-3 pt-3 border-top")
         if not question_body:
             raise Exception("Question body not found.")
@@ -93,6 +263,7 @@ def scrape_page(soup):
 
         return {
             "question_number": question_number,
+            "topic": topic,
             "question_text": question_text,
             "choices": choices,
             "question_image_src": question_image_src,
@@ -100,7 +271,7 @@ def scrape_page(soup):
             "answer_image_src": answer_image_src
         }
     except Exception as e:
-        raise Exception(f"Error processing page data: {str(e)}")
+        raise PageParseError(f"Error processing page data: {str(e)}") from e
 
 
 def format_image_url(img_src):
@@ -145,50 +316,257 @@ def extract_question_number(soup):
         raise ValueError(f"Could not extract question number")
 
 
-def scrape_question_info(browser, file_manager):
+def parse_topic_number(header_text):
     """
-    Orchestrates the scraping of question information, updating progress in CSV and JSON files.
+    Extracts the topic number from the text of a question header ("... Topic #: 2").
+
+    Args:
+        header_text (str): Text of the question discussion header.
+
+    Returns:
+        int or None: Topic number, or None if the header does not show one.
+    """
+    match = TOPIC_PATTERN.search(header_text)
+    return int(match.group(1)) if match else None
+
+
+def extract_topic_number(soup):
+    """
+    Extracts the topic number from the question header.
+
+    Args:
+        soup (BeautifulSoup): Parsed HTML content of the page.
+
+    Returns:
+        int or None: Topic number, or None if the header does not show one.
+    """
+    header_div = soup.find("div", class_="question-discussion-header")
+    inner_div = header_div.find("div") if header_div else None
+    if inner_div is None:
+        return None
+    return parse_topic_number(inner_div.get_text(strip=True))
+
+
+def store_question_data(file_manager, index, data):
+    """
+    Persists the data of one scraped question; its CSV row is marked as done once the
+    result store has synced it to disk.
 
     Args:
-        browser (WebDriver): Selenium WebDriver instance.
         file_manager (FileManager): Instance of FileManager for handling CSV and JSON files.
+        index (tuple): (topic, question) key of the question row in the ledger.
+        data (dict): Question data returned by scrape_page.
 
     Returns:
         None
     """
-    user_requirements = file_manager.get_input_json_data()
+    with metrics.timer("store"):
+        file_manager.append_result(data, index)
+        file_manager.update_input_json("scrap_json_finished", "True")
+    metrics.increment("questions_scraped")
+
+
+def record_question_failure(file_manager, index, question_text, error, prefix=""):
+    """
+    Reports a question that failed to scrape and schedules its retry in the ledger.
 
-    pending_rows = file_manager.get_pending_rows()
+    Args:
+        file_manager (FileManager): Instance of FileManager for handling CSV and JSON files.
+        index (tuple): (topic, question) key of the question row in the ledger.
+        question_text (str): Question label, for the log.
+        error (Exception): Error raised while loading or parsing the page.
+        prefix (str): Text put before the log line, such as the exam name (default: "").
 
-    if pending_rows.empty:
-        print("No pending rows to process.")
-        file_manager.update_input_json("scrap_json_finished", "True")
-        return
+    Returns:
+        bool: Whether the question was given up and moved to the dead-letter list.
+    """
+    metrics.increment("questions_failed")
+    attempts, next_attempt_at, dead = file_manager.record_failure(index, error)
+    if dead:
+        metrics.increment("questions_given_up")
+        outcome = f"given up after {attempts} attempts"
+    else:
+        outcome = f"attempt {attempts}, retry after {time.strftime('%Y-%m-%d %H:%M', time.localtime(next_attempt_at))}"
+    print(f"{prefix}Error processing {question_text}: {str(error)} ({outcome})")
+    return dead
 
-    print(f"Pending rows: {len(pending_rows)}")
 
-    for index, row in pending_rows.iterrows():
-        question_text = row["Pregunta"]
-        url = row["URL"]
+def page_fingerprint(html):
+    """
+    Hashes the question block of a discussion page.
 
-        print(f"Processing {question_text} - {url}")
+    Only the part of the page from the discussion header up to the comments is hashed,
+    so changes to the question, answer or vote tally are detected while tokens, ads and
+    new comments elsewhere in the page are ignored.
 
-        try:
-            soup = load_page(browser, url)
-            data = scrape_page(soup)
-            file_manager.json_data.append(data)
+    Args:
+        html (str): Raw HTML of a discussion page.
 
-            file_manager.save_json()
-            file_manager.update_row(index, "Scraping", True)
-            file_manager.save_csv()
+    Returns:
+        str: SHA-256 of the question block.
+    """
+    start = html.find("question-discussion-header")
+    if start == -1:
+        start = 0
+    end = -1
+    for marker in ("discussion-container", "comment-container"):
+        end = html.find(marker, start)
+        if end != -1:
+            break
+    block = html[start:end] if end != -1 else html[start:]
+    return hashlib.sha256(block.encode("utf-8")).hexdigest()
+
+
+def refresh_questions(browser, file_manager, fetcher, rate_limiter=None, page_cache=None, parser="lxml"):
+    """
+    Revalidates every scraped discussion page and re-parses only the ones that changed.
+
+    Each page is requested with the ETag/Last-Modified stored in the ledger, through
+    fetch_response, so blocks, backoff and the browser fallback work as in a scraping run;
+    a 304 or an unchanged question-block fingerprint skips the parse. Changed pages
+    replace their previous result, matched by question_number. Pages that are gone are
+    given up in the ledger and no longer revalidated.
 
-            file_manager.update_input_json("scrap_json_finished", "True")
+    Args:
+        browser (WebDriver): Selenium WebDriver instance, used when a page lacks the question markup.
+        file_manager (FileManager): Instance of FileManager for handling CSV and JSON files.
+        fetcher (HttpFetcher): HTTP client used for the conditional requests.
+        rate_limiter (HostRateLimiter): Per-host request budget (default: None).
+        page_cache (PageCache): Cache receiving the HTML of changed pages (default: None).
+        parser (str): Parser backend passed to parse_html (default: "lxml").
 
-            time.sleep(random.uniform(3, 6))
+    Returns:
+        dict: Counts of "unchanged", "changed" and "failed" pages.
+    """
+    counts = {"unchanged": 0, "changed": 0, "failed": 0}
+    rows = file_manager.get_refresh_rows()
+    print(f"Revalidating {len(rows)} scraped pages.")
+
+    for row in rows.itertuples():
+        index = row.Index
+        url = row.URL
+        headers = {}
+        if row.ETag:
+            headers["If-None-Match"] = row.ETag
+        if row.LastModified:
+            headers["If-Modified-Since"] = row.LastModified
 
+        try:
+            if rate_limiter:
+                rate_limiter.wait(url)
+            html, response = fetch_response(url, fetcher, browser, rate_limiter=rate_limiter, headers=headers)
+            # A page loaded by the browser keeps the validators of the last HTTP response.
+            etag, last_modified = row.ETag, row.LastModified
+            if response is not None:
+                etag = response.headers.get("etag") or etag
+                last_modified = response.headers.get("last-modified") or last_modified
+
+            if html is None:
+                file_manager.update_validators(index, etag, last_modified, row.Fingerprint)
+                counts["unchanged"] += 1
+                continue
+
+            fingerprint = page_fingerprint(html)
+            if fingerprint == row.Fingerprint:
+                file_manager.update_validators(index, etag, last_modified, fingerprint)
+                counts["unchanged"] += 1
+                continue
+
+            if page_cache is not None:
+                page_cache.put(url, html)
+            data = parse_html(html, parser)
+            file_manager.upsert_result(data, index)
+            file_manager.update_validators(index, etag, last_modified, fingerprint)
+            counts["changed"] += 1
+            print(f"Updated {row.Pregunta} - {url}")
+        except PageGoneError as e:
+            # Given up in the ledger, so later refreshes stop requesting it.
+            record_question_failure(file_manager, index, row.Pregunta, e, prefix="Refresh: ")
+            counts["failed"] += 1
         except Exception as e:
-            print(f"Error processing {question_text}: {str(e)}")
-            continue
+            print(f"Error refreshing {row.Pregunta}: {str(e)}")
+            counts["failed"] += 1
+
+    file_manager.save_json()
+    for result, count in counts.items():
+        metrics.increment("refreshed_pages", count, result=result)
+    print(
+        f"Refresh finished: {counts['changed']} changed, {counts['unchanged']} unchanged, "
+        f"{counts['failed']} failed."
+    )
+    return counts
+
+
+def parse_cached_page(path, parser="lxml"):
+    """
+    Parses a cached page object. Runs in worker processes during a cache re-parse.
+
+    Args:
+        path (str): Path of the cached .html.gz object.
+        parser (str): Parser backend passed to parse_html (default: "lxml").
+
+    Returns:
+        dict: Extracted question data, as returned by scrape_page.
+    """
+    return parse_html(read_cached_page(path), parser)
+
+
+def reparse_from_cache(file_manager, page_cache, processes=None, parser="lxml"):
+    """
+    Rebuilds the results of an exam from cached pages, without a browser or network access.
+
+    Pages are parsed in parallel on all CPU cores. Each re-parsed page replaces the result
+    of its ledger row; the results and ledger status of the rows whose page is not cached,
+    or no longer parses, are kept as they are.
+
+    Args:
+        file_manager (FileManager): Instance of FileManager for handling CSV and JSON files.
+        page_cache (PageCache): Cache holding the raw discussion pages.
+        processes (int): Number of parser processes (default: number of CPUs).
+        parser (str): Parser backend passed to parse_html (default: "lxml").
+
+    Returns:
+        int: Number of questions rebuilt.
+    """
+    ledger = file_manager.csv_data
+    cached_rows = []
+    uncached = []
+    for index, row in ledger.iterrows():
+        found = page_cache.lookup(row["URL"])
+        if found:
+            cached_rows.append((index, row["Pregunta"], found[0]))
+        else:
+            uncached.append(index)
+
+    print(f"Re-parsing {len(cached_rows)} cached pages ({len(uncached)} not cached).")
+    records = []
+    parsed_rows = []
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        futures = [executor.submit(parse_cached_page, path, parser) for _, _, path in cached_rows]
+        for (index, question_text, _), future in zip(cached_rows, futures):
+            try:
+                records.append(future.result())
+                parsed_rows.append(index)
+            except Exception as e:
+                print(f"Error re-parsing {question_text}: {str(e)}")
+                uncached.append(index)
+
+    results = list(file_manager.json_data)
+    for index, record in zip(parsed_rows, records):
+        position = file_manager.result_index.get(index)
+        if position is None:
+            position = file_manager.result_index.find(record)
+        if position is None:
+            results.append(record)
+        else:
+            results[position] = record
+
+    file_manager.replace_results(results)
+    with file_manager.batch():
+        for index in parsed_rows:
+            file_manager.update_row(index, "Scraping", True)
+    print(f"Rebuilt {len(records)} questions from the page cache; {len(uncached)} rows kept as they were.")
+    return len(records)
 
 
 def validate_and_create_files(file_manager):
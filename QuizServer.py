@@ -0,0 +1,347 @@
+# Copyright (c) 2025 Diego Martins
+# Licensed under the MIT License. See LICENSE file in the project root for details.
+
+import argparse
+import glob
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from collections import OrderedDict
+from functools import partial
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+from SearchIndex import SearchIndex, DEFAULT_INDEX_FILE, DEFAULT_LIMIT
+
+CATEGORIES = ("evaluable", "image_only", "other")
+BUNDLE_FOLDER = "quiz"
+MANIFEST_FILE = "manifest.json"
+DEFAULT_SHARD_SIZE = 200
+DEFAULT_QUIZ_SIZE = 50
+DEFAULT_IMAGE_ONLY = 10
+DEFAULT_REINDEX_SECONDS = 60
+
+
+def question_category(record):
+    """
+    Classifies a question the way the quiz presents it.
+
+    Returns:
+        str: "evaluable" when it has choices, "image_only" when it only has question
+        images, "other" otherwise.
+    """
+    if record.get("choices"):
+        return "evaluable"
+    if record.get("question_image_src"):
+        return "image_only"
+    return "other"
+
+
+def output_folder(root, exam):
+    return os.path.join(root, f"{exam}_output_questions")
+
+
+def source_signature(json_file):
+    stat = os.stat(json_file)
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def build_bundle(json_file, bundle_dir, shard_size=DEFAULT_SHARD_SIZE):
+    """
+    Splits questions_answer.json into compact shards plus a manifest of question ids
+    per category, so a quiz only reads the shards holding the questions it draws.
+
+    Shards are named after the build so a reader never mixes shards of two builds; the
+    manifest is replaced last and the shards of previous builds are removed afterwards.
+
+    Args:
+        json_file (str): Path to questions_answer.json.
+        bundle_dir (str): Folder the bundle is written to.
+        shard_size (int): Questions per shard (default: 200).
+
+    Returns:
+        dict: The manifest written.
+    """
+    signature = source_signature(json_file)
+    with open(json_file, "r", encoding="utf-8") as f:
+        records = json.load(f)
+
+    os.makedirs(bundle_dir, exist_ok=True)
+    build = hashlib.sha1(json.dumps(signature + [shard_size]).encode("utf-8")).hexdigest()[:12]
+    shards = []
+    for start in range(0, len(records), shard_size):
+        shard_file = f"{build}-{len(shards):04d}.json"
+        with open(os.path.join(bundle_dir, shard_file), "w", encoding="utf-8") as f:
+            json.dump(records[start:start + shard_size], f, ensure_ascii=False, separators=(",", ":"))
+        shards.append(shard_file)
+
+    categories = {category: [] for category in CATEGORIES}
+    for question_id, record in enumerate(records):
+        categories[question_category(record)].append(question_id)
+
+    manifest = {
+        "source": os.path.basename(json_file),
+        "signature": signature,
+        "build": build,
+        "shard_size": shard_size,
+        "shards": shards,
+        "categories": categories,
+    }
+    manifest_file = os.path.join(bundle_dir, MANIFEST_FILE)
+    temp_file = f"{manifest_file}.tmp"
+    with open(temp_file, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, separators=(",", ":"))
+    os.replace(temp_file, manifest_file)
+
+    for shard_file in glob.glob(os.path.join(bundle_dir, "*-*.json")):
+        if not os.path.basename(shard_file).startswith(f"{build}-"):
+            os.remove(shard_file)
+    return manifest
+
+
+def load_manifest(bundle_dir):
+    manifest_file = os.path.join(bundle_dir, MANIFEST_FILE)
+    if not os.path.exists(manifest_file):
+        return None
+    with open(manifest_file, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def select_quiz_ids(categories, size, image_only=DEFAULT_IMAGE_ONLY, rng=random):
+    """
+    Draws a quiz: up to `image_only` image-only questions, filled with evaluable
+    questions and then with the remaining ones.
+
+    Args:
+        categories (dict): Question ids per category.
+        size (int): Number of questions in the quiz.
+        image_only (int): Maximum number of image-only questions (default: 10).
+        rng (random.Random): Source of randomness (default: the random module).
+
+    Returns:
+        list: Question ids, image-only first, then evaluable, then other.
+    """
+    selected = []
+    for category, limit in (("image_only", min(image_only, size)), ("evaluable", size), ("other", size)):
+        ids = categories.get(category, [])
+        count = min(limit, size - len(selected), len(ids))
+        selected.extend(rng.sample(ids, count))
+    return selected
+
+
+class QuizBundle:
+    """
+    Read side of a bundle built by build_bundle.
+
+    Attributes:
+        bundle_dir (str): Folder of the bundle.
+        manifest (dict): Manifest of the bundle.
+        shard_cache (int): Number of parsed shards kept in memory (default: 16).
+    """
+    def __init__(self, bundle_dir, manifest, shard_cache=16):
+        self.bundle_dir = bundle_dir
+        self.manifest = manifest
+        self.shard_cache = shard_cache
+        self._shards = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _shard(self, number):
+        with self._lock:
+            if number in self._shards:
+                self._shards.move_to_end(number)
+                return self._shards[number]
+        with open(os.path.join(self.bundle_dir, self.manifest["shards"][number]), "r", encoding="utf-8") as f:
+            shard = json.load(f)
+        with self._lock:
+            self._shards[number] = shard
+            while len(self._shards) > self.shard_cache:
+                self._shards.popitem(last=False)
+        return shard
+
+    def questions(self, question_ids):
+        shard_size = self.manifest["shard_size"]
+        return [self._shard(question_id // shard_size)[question_id % shard_size] for question_id in question_ids]
+
+    def quiz(self, size, image_only=DEFAULT_IMAGE_ONLY, rng=random):
+        return self.questions(select_quiz_ids(self.manifest["categories"], size, image_only, rng))
+
+
+class QuizServer(ThreadingHTTPServer):
+    """
+    Serves the front end and a quiz API from the project folder.
+
+    GET /api/quiz?exam=<name>&n=<size>&image_only=<max> returns a random quiz drawn from
+    the exam's bundle, which is (re)built whenever questions_answer.json is newer than it.
+    Without `exam`, the exam of input/user_requirement.json is used.
+    GET /api/search?q=<words>&exam=<name>&n=<limit> returns the best full-text matches,
+    of every exam unless `exam` is given. Scraping runs add their questions to the search
+    index as they go; the server also re-indexes the exams whose results changed in other
+    ways (compaction, re-parse), at most every `reindex_seconds`. Every other path is
+    served as a static file, so the quiz is at /front/home.html.
+
+    Attributes:
+        root (str): Project folder.
+        shard_size (int): Questions per shard of the bundles built by the server.
+        reindex_seconds (float): Shortest time between two checks of the search index
+            against the results.
+    """
+    daemon_threads = True
+
+    def __init__(self, address, root=".", shard_size=DEFAULT_SHARD_SIZE, reindex_seconds=DEFAULT_REINDEX_SECONDS):
+        self.root = os.path.abspath(root)
+        self.shard_size = shard_size
+        self.reindex_seconds = reindex_seconds
+        self.random = random.Random()
+        self._bundles = {}
+        self._lock = threading.Lock()
+        self.search_index = SearchIndex(os.path.join(self.root, DEFAULT_INDEX_FILE))
+        self._index_lock = threading.Lock()
+        self._indexed_at = None
+        super().__init__(address, partial(QuizRequestHandler, directory=self.root))
+
+    def default_exam(self):
+        requirement_file = os.path.join(self.root, "input", "user_requirement.json")
+        with open(requirement_file, "r", encoding="utf-8") as f:
+            return json.load(f).get("exam", "default_exam")
+
+    def bundle(self, exam):
+        """
+        Returns the exam's bundle, rebuilding it first when the results have changed.
+        """
+        folder = output_folder(self.root, exam)
+        json_file = os.path.join(folder, "questions_answer.json")
+        if not os.path.exists(json_file):
+            raise FileNotFoundError(f"No results for exam {exam}")
+        bundle_dir = os.path.join(folder, BUNDLE_FOLDER)
+        signature = source_signature(json_file)
+
+        with self._lock:
+            bundle = self._bundles.get(exam)
+            if bundle is not None and bundle.manifest["signature"] == signature:
+                return bundle
+            manifest = load_manifest(bundle_dir)
+            if manifest is None or manifest["signature"] != signature or manifest["shard_size"] != self.shard_size:
+                manifest = build_bundle(json_file, bundle_dir, self.shard_size)
+                print(f"Built quiz bundle for {exam}: {len(manifest['shards'])} shards.")
+            bundle = self._bundles[exam] = QuizBundle(bundle_dir, manifest)
+            return bundle
+
+    def search(self, text, exam=None, limit=DEFAULT_LIMIT):
+        """
+        Searches the index, first re-indexing the exams whose results changed if the last
+        check is more than `reindex_seconds` old.
+        """
+        with self._index_lock:
+            now = time.monotonic()
+            if self._indexed_at is None or now - self._indexed_at >= self.reindex_seconds:
+                self.search_index.build(self.root)
+                self._indexed_at = time.monotonic()
+        return self.search_index.search(text, exam=exam, limit=limit)
+
+
+class QuizRequestHandler(SimpleHTTPRequestHandler):
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        if parts.path == "/api/quiz":
+            self.handle_quiz(parse_qs(parts.query))
+        elif parts.path == "/api/search":
+            self.handle_search(parse_qs(parts.query))
+        else:
+            super().do_GET()
+
+    def handle_quiz(self, query):
+        try:
+            exam = query.get("exam", [None])[0] or self.server.default_exam()
+            size = int(query.get("n", [DEFAULT_QUIZ_SIZE])[0])
+            image_only = int(query.get("image_only", [DEFAULT_IMAGE_ONLY])[0])
+            if size < 0 or image_only < 0:
+                raise ValueError("n and image_only must not be negative")
+        except (ValueError, OSError) as e:
+            self.send_json(400, {"error": str(e)})
+            return
+        try:
+            questions = self.server.bundle(exam).quiz(size, image_only, self.server.random)
+        except FileNotFoundError as e:
+            self.send_json(404, {"error": str(e)})
+            return
+        self.send_json(200, {"exam": exam, "questions": questions})
+
+    def handle_search(self, query):
+        try:
+            text = query.get("q", [""])[0]
+            exam = query.get("exam", [None])[0] or None
+            limit = int(query.get("n", [DEFAULT_LIMIT])[0])
+            if limit <= 0:
+                raise ValueError("n must be positive")
+        except ValueError as e:
+            self.send_json(400, {"error": str(e)})
+            return
+        started = time.perf_counter()
+        matches = self.server.search(text, exam, limit)
+        self.send_json(200, {
+            "query": text,
+            "matches": matches,
+            "milliseconds": round((time.perf_counter() - started) * 1000, 2),
+        })
+
+    def send_json(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Build quiz bundles and serve the practice quiz.")
+    parser.add_argument("command", choices=["build", "serve"])
+    parser.add_argument("--exam", action="append", help="Exam to build (default: every *_output_questions folder).")
+    parser.add_argument("--root", default=".", help="Project folder (default: current folder).")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--shard-size", type=int, default=DEFAULT_SHARD_SIZE)
+    parser.add_argument(
+        "--reindex-seconds", type=float, default=DEFAULT_REINDEX_SECONDS,
+        help="Shortest time between two checks of the search index against the results."
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    if args.command == "build":
+        exams = args.exam or [
+            os.path.basename(folder)[:-len("_output_questions")]
+            for folder in sorted(glob.glob(os.path.join(args.root, "*_output_questions")))
+        ]
+        for exam in exams:
+            folder = output_folder(args.root, exam)
+            json_file = os.path.join(folder, "questions_answer.json")
+            if not os.path.exists(json_file):
+                print(f"Skipping {exam}: {json_file} not found.")
+                continue
+            manifest = build_bundle(json_file, os.path.join(folder, BUNDLE_FOLDER), args.shard_size)
+            counts = ", ".join(f"{category} {len(ids)}" for category, ids in manifest["categories"].items())
+            print(f"{exam}: {len(manifest['shards'])} shards ({counts}).")
+        return
+
+    server = QuizServer(
+        (args.host, args.port), root=args.root, shard_size=args.shard_size, reindex_seconds=args.reindex_seconds
+    )
+    print(f"Quiz available at http://{args.host}:{server.server_port}/front/home.html")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
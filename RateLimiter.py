@@ -0,0 +1,319 @@
+# Copyright (c) 2025 Diego Martins
+# Licensed under the MIT License. See LICENSE file in the project root for details.
+
+import random
+import re
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+from Metrics import metrics
+
+# Statuses sent by hosts (or the CDN in front of them) that are throttling the client.
+BLOCK_STATUSES = (403, 429, 503)
+# Lower-cased fragments of the titles of CAPTCHA and challenge pages served with a 200.
+CHALLENGE_TITLES = (
+    "just a moment",
+    "attention required",
+    "verify you are human",
+    "are you a robot",
+)
+# Lower-cased fragments only found in the head of challenge pages. Cloudflare's
+# /cdn-cgi/challenge-platform/ script is left out: it is added to ordinary pages too.
+CHALLENGE_HEAD_MARKERS = (
+    "_cf_chl_opt",
+)
+# Lower-cased fragments of the traffic warnings search engines put in the page body;
+# Google's /sorry/ page has the search URL as its title. Only search-engine pages are
+# checked for them, since a discussion comment can quote them.
+TRAFFIC_WARNING_MARKERS = (
+    "detected unusual traffic",
+    "unusual traffic from your computer",
+    "/sorry/index",
+)
+# Path Google redirects throttled searches to.
+SORRY_PATH = "/sorry/"
+HEAD_END_PATTERN = re.compile(r"</head\s*>|<body[\s>]", re.IGNORECASE)
+TITLE_PATTERN = re.compile(r"<title[^>]*>(.*?)</title\s*>", re.IGNORECASE | re.DOTALL)
+# Characters looked at when a document has no head or body tag.
+HEAD_LIMIT = 4096
+
+
+def page_head(text):
+    """
+    Returns the part of an HTML document before its body.
+    """
+    match = HEAD_END_PATTERN.search(text)
+    return text[:match.start()] if match else text[:HEAD_LIMIT]
+
+
+def detect_block(status=None, text=None):
+    """
+    Tells whether a response is the host refusing to serve the client.
+
+    Only the head of the page is looked at, so the user comments of a discussion page
+    can never make it look like a challenge page. Search-engine pages are checked with
+    detect_search_block, which also reads the traffic warnings in their body.
+
+    Args:
+        status (int): HTTP status, or None for browser loads.
+        text (str): Body or page source, or None.
+
+    Returns:
+        bool: True for throttling statuses and CAPTCHA or challenge pages.
+    """
+    if status in BLOCK_STATUSES:
+        return True
+    if not text:
+        return False
+    head = page_head(text).lower()
+    title = TITLE_PATTERN.search(head)
+    if title and any(marker in title.group(1) for marker in CHALLENGE_TITLES):
+        return True
+    return any(marker in head for marker in CHALLENGE_HEAD_MARKERS)
+
+
+def detect_search_block(status=None, text=None, url=None):
+    """
+    Tells whether a search engine answered with a block instead of results: a throttling
+    status, a challenge page (see detect_block) or a traffic warning such as Google's
+    /sorry/ page.
+
+    Args:
+        status (int): HTTP status, or None for browser loads.
+        text (str): Body or page source, or None.
+        url (str): Final URL of the response or of the browser, or None.
+
+    Returns:
+        bool: True if the search was blocked.
+    """
+    if detect_block(status, text):
+        return True
+    if url and SORRY_PATH in urlparse(url).path:
+        return True
+    if not text:
+        return False
+    lowered = text.lower()
+    return any(marker in lowered for marker in TRAFFIC_WARNING_MARKERS)
+
+
+def parse_retry_after(value):
+    """
+    Returns the seconds asked by a Retry-After header (delay or HTTP date), or None.
+    """
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+class HostState:
+    """
+    Pacing state of one host.
+
+    Attributes:
+        budget (float): Configured budget in requests per minute.
+        rate (float): Current budget in requests per minute.
+        ceiling (float): Highest budget the limiter may reach for the host.
+        floor (float): Lowest budget the limiter may fall to for the host.
+        next_slot (float): time.monotonic() of the next free request slot.
+        latency (float): Exponentially weighted response time in seconds, or None.
+        baseline (float): Lowest weighted response time seen, or None.
+        successes (int): Healthy responses since the last budget change.
+        blocks (int): Consecutive blocked responses.
+    """
+    def __init__(self, budget, ceiling, floor):
+        self.budget = budget
+        self.rate = budget
+        self.ceiling = ceiling
+        self.floor = floor
+        self.next_slot = 0.0
+        self.latency = None
+        self.baseline = None
+        self.successes = 0
+        self.blocks = 0
+
+
+class HostRateLimiter:
+    """
+    Shares an adaptive request budget per host between any number of worker threads.
+
+    Each host has a token bucket of `burst` requests refilled at its current budget,
+    kept as the time of its next free slot: every call to `wait` reserves a slot and
+    sleeps until it is reached, so N workers hitting the same host together stay within
+    the budget, while requests to different hosts do not block each other.
+
+    Callers `report` how each request went and the budget adapts (additive increase,
+    multiplicative decrease): it grows by a tenth of the configured budget after every
+    `increase_every` healthy responses, up to `max_speedup` times the configured budget;
+    responses much slower than the host's usual ones trim it by 10%; a 429/403/503 or a
+    CAPTCHA page halves it and pauses the host for Retry-After, or for `block_cooldown`
+    seconds doubled on every consecutive block.
+
+    Attributes:
+        requests_per_minute (float): Default starting budget of every host; 0 disables pacing.
+        host_budgets (dict): Per-host starting budgets (host -> requests per minute).
+        jitter (float): Fraction of the interval added at random to each slot (default: 0.2).
+        adaptive (bool): Adapt the budgets to the reported responses (default: True).
+        max_speedup (float): Ceiling of a host's budget relative to its starting one (default: 3).
+        min_requests_per_minute (float): Floor of every budget (default: 1).
+        burst (int): Requests a host may receive back to back after being idle (default: 1).
+        increase_every (int): Healthy responses needed to raise the budget (default: 5).
+        slow_factor (float): Latency over the host's baseline considered a slowdown (default: 2).
+        block_cooldown (float): Pause after a first block, in seconds (default: 30).
+        max_cooldown (float): Longest pause after repeated blocks, in seconds (default: 600).
+    """
+    def __init__(self, requests_per_minute=12, host_budgets=None, jitter=0.2, adaptive=True, max_speedup=3.0,
+                 min_requests_per_minute=1.0, burst=1, increase_every=5, slow_factor=2.0, block_cooldown=30.0,
+                 max_cooldown=600.0):
+        self.requests_per_minute = requests_per_minute
+        self.host_budgets = dict(host_budgets or {})
+        self.jitter = jitter
+        self.adaptive = adaptive
+        self.max_speedup = max_speedup
+        self.min_requests_per_minute = min_requests_per_minute
+        self.burst = max(1, int(burst))
+        self.increase_every = max(1, int(increase_every))
+        self.slow_factor = slow_factor
+        self.block_cooldown = block_cooldown
+        self.max_cooldown = max_cooldown
+        self._hosts = {}
+        self._lock = threading.Lock()
+
+    def _state(self, host):
+        state = self._hosts.get(host)
+        if state is None:
+            budget = self.host_budgets.get(host, self.requests_per_minute) or 0.0
+            floor = min(self.min_requests_per_minute, budget)
+            state = self._hosts[host] = HostState(budget, max(budget, budget * self.max_speedup), floor)
+        return state
+
+    def interval(self, host):
+        """
+        Returns the current minimum number of seconds between two requests to a host.
+
+        Args:
+            host (str): Host name.
+
+        Returns:
+            float: Seconds between requests, 0 if the host has no budget.
+        """
+        with self._lock:
+            rate = self._state(host).rate
+        if not rate or rate <= 0:
+            return 0.0
+        return 60.0 / rate
+
+    def reserve(self, url):
+        """
+        Reserves the next request slot for the host of a URL without sleeping.
+
+        Args:
+            url (str): URL about to be requested.
+
+        Returns:
+            float: Seconds the caller must wait before sending the request.
+        """
+        host = urlparse(url).netloc
+        with self._lock:
+            state = self._state(host)
+            if state.rate <= 0:
+                return 0.0
+            interval = 60.0 / state.rate
+            now = time.monotonic()
+            # A bucket of `burst` tokens: the slot may run up to burst - 1 intervals ahead.
+            slot = max(now, state.next_slot)
+            state.next_slot = slot + interval * (1 + random.uniform(0, self.jitter))
+            return max(0.0, slot - (self.burst - 1) * interval - now)
+
+    def pending(self, url):
+        """
+        Returns the seconds until the host of a URL has a free slot, without reserving it.
+        """
+        host = urlparse(url).netloc
+        with self._lock:
+            state = self._state(host)
+            if state.rate <= 0:
+                return 0.0
+            return max(0.0, state.next_slot - (self.burst - 1) * 60.0 / state.rate - time.monotonic())
+
+    def wait(self, url):
+        """
+        Blocks until the host of a URL may be requested again.
+
+        Args:
+            url (str): URL about to be requested.
+
+        Returns:
+            float: Seconds actually slept.
+        """
+        delay = self.reserve(url)
+        if delay > 0:
+            time.sleep(delay)
+        metrics.observe("rate_limit_wait", max(delay, 0.0))
+        return delay
+
+    def report(self, url, seconds=None, status=None, blocked=False, retry_after=None, decay=0.3):
+        """
+        Feeds the outcome of a request back into its host's budget.
+
+        Args:
+            url (str): URL requested.
+            seconds (float): Response time, or None if unknown; a report without it and
+                without a block leaves the budget as it is.
+            status (int): HTTP status, or None for browser loads.
+            blocked (bool): Whether the response was a CAPTCHA or traffic warning page.
+            retry_after (float): Pause asked by the host, in seconds (default: None).
+            decay (float): Weight of the new response time in the average (default: 0.3).
+        """
+        if not self.adaptive:
+            return
+        host = urlparse(url).netloc
+        blocked = blocked or status in BLOCK_STATUSES
+        with self._lock:
+            state = self._state(host)
+            if state.rate <= 0:
+                return
+            now = time.monotonic()
+
+            if blocked:
+                state.blocks += 1
+                state.successes = 0
+                state.rate = max(state.floor, state.rate / 2)
+                pause = retry_after
+                if pause is None:
+                    pause = min(self.block_cooldown * 2 ** (state.blocks - 1), self.max_cooldown)
+                state.next_slot = max(state.next_slot, now + pause)
+                rate = state.rate
+            elif seconds is not None:
+                # A load without a response time tells nothing about the host's health.
+                state.blocks = 0
+                latency = seconds if state.latency is None else (1 - decay) * state.latency + decay * seconds
+                state.latency = latency
+                state.baseline = latency if state.baseline is None else min(state.baseline, latency)
+                if state.latency > self.slow_factor * state.baseline:
+                    state.successes = 0
+                    state.rate = max(state.floor, state.rate * 0.9)
+                    # Judge later responses against the slower level instead of trimming forever.
+                    state.baseline = state.latency / self.slow_factor
+                else:
+                    state.successes += 1
+                    if state.successes >= self.increase_every:
+                        state.successes = 0
+                        state.rate = min(state.ceiling, state.rate + state.budget / 10)
+
+        if blocked:
+            metrics.increment("rate_limit_blocks", host=host)
+            print(f"{host} is throttling requests: pausing {pause:.0f}s, budget lowered to {rate:.1f}/min.")
+
+    def summary(self):
+        """
+        Returns the current budget of every host seen, in requests per minute.
+        """
+        with self._lock:
+            return {host: state.rate for host, state in self._hosts.items() if state.rate > 0}
@@ -0,0 +1,176 @@
+# Copyright (c) 2025 Diego Martins
+# Licensed under the MIT License. See LICENSE file in the project root for details.
+
+import glob
+import os
+import re
+from ResultStore import ResultStore, export_json, load_results, results_path
+
+NUMBER_PATTERN = re.compile(r"(\d+)\s*$")
+
+
+def result_key(record):
+    """
+    Returns the normalized (topic, question) key of a result record.
+
+    The number is read from the end of question_number, so "Question #: 12" and
+    "Question #:12 " give the same key. Records written before topics were recorded
+    belong to topic 1, as their ledger rows do.
+
+    Returns:
+        tuple: (topic, question) as integers, or None if the record has no question number.
+    """
+    match = NUMBER_PATTERN.search(str(record.get("question_number") or ""))
+    if match is None:
+        return None
+    return int(record.get("topic") or 1), int(match.group(1))
+
+
+def is_empty(value):
+    return value is None or value == "" or value == [] or value == {}
+
+
+def same_question(old, new):
+    """
+    Tells whether two records with the same key are results of the same question.
+
+    Records written before topics were recorded all count as topic 1, so questions of
+    other topics can share their key. Two records are only taken for the same question
+    when both record their topic or their question texts match.
+    """
+    if old.get("topic") is not None and new.get("topic") is not None:
+        return True
+    return (old.get("question_text") or "") == (new.get("question_text") or "")
+
+
+def merge_records(old, new):
+    """
+    Merges two results of the same question: the newer record wins, except for the
+    fields it left empty, which keep the older value.
+    """
+    merged = dict(old)
+    for field, value in new.items():
+        if not is_empty(value) or field not in merged:
+            merged[field] = value
+    return merged
+
+
+class ResultIndex:
+    """
+    Positions of the result records in the result list, by normalized (topic, question) key.
+
+    Looking a question up or replacing its result is a dict access instead of a scan of
+    every record. Records without a question number are not indexed. A key can point
+    to several records when they are not the same question (see same_question).
+
+    Attributes:
+        duplicates (int): Records that are the same question as an earlier record when
+            the index was built.
+    """
+    def __init__(self, records=()):
+        self._records = records
+        self._positions = {}
+        self.duplicates = 0
+        for position, record in enumerate(records):
+            if self.find(record) is not None:
+                self.duplicates += 1
+            self.add(result_key(record), position)
+
+    def __len__(self):
+        return len(self._positions)
+
+    def __contains__(self, key):
+        return key in self._positions
+
+    def find(self, record):
+        """
+        Returns the position of the result of the same question as a record, or None.
+        """
+        matches = [
+            position for position in self._positions.get(result_key(record), ())
+            if same_question(self._records[position], record)
+        ]
+        same_text = [
+            position for position in matches
+            if self._records[position].get("question_text") == record.get("question_text")
+        ]
+        if same_text:
+            return same_text[-1]
+        return matches[-1] if matches else None
+
+    def get(self, key):
+        """
+        Returns the position of the result of a ledger row's question, or None if it has
+        none or only several records that may belong to other topics.
+        """
+        positions = self._positions.get(key, [])
+        with_topic = [position for position in positions if self._records[position].get("topic") is not None]
+        if with_topic:
+            return with_topic[-1]
+        return positions[0] if len(positions) == 1 else None
+
+    def add(self, key, position):
+        if key is not None:
+            self._positions.setdefault(key, []).append(position)
+
+    def keys(self):
+        return self._positions.keys()
+
+
+def deduplicate(records):
+    """
+    Merges the records of each question into one, kept where the question first appears.
+    Records that share a key without being the same question are kept apart.
+
+    Returns:
+        list: Records without duplicates.
+    """
+    deduplicated = []
+    index = ResultIndex(deduplicated)
+    for record in records:
+        position = index.find(record)
+        if position is None:
+            index.add(result_key(record), len(deduplicated))
+            deduplicated.append(record)
+        else:
+            deduplicated[position] = merge_records(deduplicated[position], record)
+    return deduplicated
+
+
+def compact_output_folder(output_folder):
+    """
+    Rewrites an output folder's results without duplicates.
+
+    The result store is rewritten without its replacement lines and questions_answer.json
+    is exported again. Must not run while a scraper is writing to the same folder.
+
+    Args:
+        output_folder (str): Folder holding questions_answer.json and questions_answer.jsonl.
+
+    Returns:
+        tuple: (records before, records after).
+    """
+    json_file = os.path.join(output_folder, "questions_answer.json")
+    records = load_results(json_file)
+    if not records:
+        return 0, 0
+
+    compacted = deduplicate(records)
+    ResultStore(results_path(json_file)).rewrite(compacted)
+    export_json(compacted, json_file)
+    return len(records), len(compacted)
+
+
+def compact_all(root="."):
+    """
+    Compacts every <exam>_output_questions folder under a project folder.
+
+    Returns:
+        dict: Output folder -> (records before, records after).
+    """
+    results = {}
+    for output_folder in sorted(glob.glob(os.path.join(root, "*_output_questions"))):
+        before, after = compact_output_folder(output_folder)
+        results[output_folder] = (before, after)
+        print(f"{output_folder}: {before} results, {before - after} duplicates merged.")
+    return results
@@ -0,0 +1,237 @@
+# Copyright (c) 2025 Diego Martins
+# Licensed under the MIT License. See LICENSE file in the project root for details.
+
+import json
+import os
+import time
+from Metrics import metrics
+
+
+class ResultStore:
+    """
+    Append-only JSON Lines store for scraped questions.
+
+    Every record is written as one line at the end of the file, so saving a question
+    costs the size of that question instead of the whole output. Writes are flushed
+    and fsynced in batches; a record cut short by a crash is dropped on the next open.
+
+    Replacing a record appends a {"_replace": position, "record": {...}} line that
+    overwrites the record at that position when the store is loaded.
+
+    Attributes:
+        path (str): Path to the .jsonl file.
+        fsync_every (int): Number of appended records that triggers an fsync (default: 20).
+        fsync_interval (float): Maximum seconds between fsyncs while appending (default: 5).
+        on_sync (callable): Called without arguments after each fsync, once the appended
+            records are durable (default: None).
+    """
+    def __init__(self, path, fsync_every=20, fsync_interval=5.0, on_sync=None):
+        self.path = path
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self.on_sync = on_sync
+        self._file = None
+        self._pending = 0
+        self._last_sync = time.monotonic()
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def recover(self):
+        """
+        Truncates a partially written last record left behind by an interrupted run.
+
+        Returns:
+            int: Number of bytes removed from the end of the file.
+        """
+        if not self.exists():
+            return 0
+
+        with open(self.path, "rb+") as f:
+            size = f.seek(0, os.SEEK_END)
+            if size == 0:
+                return 0
+            f.seek(size - 1)
+            if f.read(1) == b"\n":
+                return 0
+
+            # The last line has no newline: find where it starts, reading backwards.
+            position = size
+            tail = b""
+            while position > 0 and b"\n" not in tail:
+                step = min(64 * 1024, position)
+                position -= step
+                f.seek(position)
+                tail = f.read(step) + tail
+            line_start = position + tail.rfind(b"\n") + 1
+
+            f.seek(line_start)
+            try:
+                json.loads(f.read().decode("utf-8"))
+            except ValueError:
+                f.truncate(line_start)
+                print(f"Recovered {self.path}: dropped {size - line_start} bytes of an incomplete record.")
+                return size - line_start
+
+            # The record is complete and only missing its terminator.
+            f.seek(0, os.SEEK_END)
+            f.write(b"\n")
+            return 0
+
+    def load(self, recover=True):
+        """
+        Reads every record in the store, recovering a truncated tail first.
+
+        Args:
+            recover (bool): Truncate an incomplete last record; readers of a store another
+                process may be appending to pass False, which only skips it (default: True).
+
+        Returns:
+            list: Records in the order they were appended, with replacements applied.
+        """
+        if recover:
+            self.recover()
+        if not self.exists():
+            return []
+
+        records = []
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line_number, line in enumerate(f, start=1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    print(f"Skipping corrupt record at {self.path}:{line_number}")
+                    continue
+                if "_replace" in record and record["_replace"] < len(records):
+                    records[record["_replace"]] = record["record"]
+                else:
+                    records.append(record)
+        return records
+
+    def append(self, record):
+        """
+        Appends one record, syncing to disk when the batch thresholds are reached.
+
+        Args:
+            record (dict): JSON-serializable record.
+        """
+        if self._file is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._file = open(self.path, "a", encoding="utf-8")
+
+        self._file.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n")
+        self._pending += 1
+        if self._pending >= self.fsync_every or time.monotonic() - self._last_sync >= self.fsync_interval:
+            self.sync()
+
+    def replace(self, position, record):
+        """
+        Appends a replacement for the record at a given position.
+
+        Args:
+            position (int): Position of the record in the loaded list.
+            record (dict): New JSON-serializable record.
+        """
+        self.append({"_replace": position, "record": record})
+
+    def extend(self, records):
+        """
+        Appends several records and syncs them in one go.
+
+        Args:
+            records (iterable): JSON-serializable records.
+        """
+        for record in records:
+            self.append(record)
+        self.sync()
+
+    def rewrite(self, records):
+        """
+        Atomically replaces the whole store with the given records.
+
+        Args:
+            records (iterable): JSON-serializable records.
+        """
+        self.close()
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.path)
+
+    def sync(self):
+        """
+        Flushes buffered records and fsyncs the file.
+        """
+        if self._file is not None and self._pending:
+            with metrics.timer("fsync"):
+                self._file.flush()
+                os.fsync(self._file.fileno())
+        self._pending = 0
+        self._last_sync = time.monotonic()
+        if self.on_sync:
+            self.on_sync()
+
+    def close(self):
+        """
+        Syncs and closes the underlying file.
+        """
+        if self._file is not None:
+            self.sync()
+            self._file.close()
+            self._file = None
+
+
+def export_json(records, json_file):
+    """
+    Writes records in the pretty-printed questions_answer.json layout used by the front end.
+
+    The file is written next to the target and swapped in atomically, so readers never
+    see a half-written export.
+
+    Args:
+        records (list): Question records.
+        json_file (str): Path of the JSON file to produce.
+
+    Returns:
+        None
+    """
+    directory = os.path.dirname(json_file)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temp_file = f"{json_file}.tmp"
+    with open(temp_file, "w", encoding="utf-8") as f:
+        json.dump(records, f, ensure_ascii=False, indent=4)
+    os.replace(temp_file, json_file)
+
+
+def results_path(json_file):
+    """
+    Returns the result store path of a questions_answer.json file.
+    """
+    return os.path.splitext(json_file)[0] + ".jsonl"
+
+
+def load_results(json_file):
+    """
+    Reads the results behind a questions_answer.json file: from its result store when
+    there is one, since the store is ahead of the export during a run, otherwise from
+    the JSON file itself. The files are never modified, so a scraper may be running.
+
+    Returns:
+        list: Question records, empty if there are none.
+    """
+    store = ResultStore(results_path(json_file))
+    if store.exists():
+        return store.load(recover=False)
+    if os.path.exists(json_file) and os.path.getsize(json_file) > 0:
+        with open(json_file, "r", encoding="utf-8") as f:
+            return json.load(f)
+    return []
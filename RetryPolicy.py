@@ -0,0 +1,79 @@
+# Copyright (c) 2025 Diego Martins
+# Licensed under the MIT License. See LICENSE file in the project root for details.
+
+class PageGoneError(Exception):
+    """
+    Raised when a discussion page answers 404 or 410: retrying it cannot help.
+    """
+
+
+class PageParseError(Exception):
+    """
+    Raised by the parsers on a page whose markup they do not understand. The page loaded,
+    so loading it again rarely helps; it is retried once in case it was a partial load.
+    """
+
+
+class RetryPolicy:
+    """
+    Decides when a page that failed to scrape is tried again, and when it is given up.
+
+    Transient failures (timeouts, blocks, connection errors) are retried with an
+    exponential backoff, from `base_delay` doubling up to `max_delay`, until `max_attempts`
+    attempts have failed. Pages that loaded but could not be parsed get `parse_attempts`
+    attempts, and pages that no longer exist are given up on the first failure. Given-up
+    pages go to the ledger's dead-letter list and are skipped by later runs until revived.
+
+    Attributes:
+        max_attempts (int): Failed attempts before a page is given up (default: 5).
+        parse_attempts (int): Failed attempts before a page that does not parse is given up (default: 2).
+        base_delay (float): Seconds before the first retry (default: 10 minutes).
+        max_delay (float): Longest delay between two attempts, in seconds (default: 1 day).
+    """
+    def __init__(self, max_attempts=5, parse_attempts=2, base_delay=600.0, max_delay=86400.0):
+        self.max_attempts = max(1, int(max_attempts))
+        self.parse_attempts = max(1, int(parse_attempts))
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    @classmethod
+    def from_settings(cls, settings):
+        """
+        Builds the policy from the "max_attempts" and "retry_backoff_minutes" keys of a
+        requirement file.
+        """
+        return cls(
+            max_attempts=int(settings.get("max_attempts", 5)),
+            base_delay=float(settings.get("retry_backoff_minutes", 10)) * 60
+        )
+
+    def attempts_allowed(self, error):
+        if isinstance(error, PageGoneError):
+            return 1
+        if isinstance(error, PageParseError):
+            return min(self.parse_attempts, self.max_attempts)
+        return self.max_attempts
+
+    def schedule(self, attempts, error, now):
+        """
+        Returns when a page that has now failed `attempts` times should be tried again.
+
+        Args:
+            attempts (int): Failed attempts so far, this one included.
+            error (Exception): Error of the last attempt.
+            now (float): Unix time of the last attempt.
+
+        Returns:
+            tuple: (next_attempt_at, dead), where next_attempt_at is None for a dead page.
+        """
+        if attempts >= self.attempts_allowed(error):
+            return None, True
+        return now + min(self.base_delay * 2 ** (attempts - 1), self.max_delay), False
+
+
+def describe_error(error):
+    """
+    Formats an error for the ledger as "<class>: <message>", cut to 500 characters.
+    """
+    message = " ".join(str(error).split())
+    return f"{type(error).__name__}: {message}"[:500]
@@ -0,0 +1,198 @@
+# Copyright (c) 2025 Diego Martins
+# Licensed under the MIT License. See LICENSE file in the project root for details.
+
+import csv
+import json
+import os
+import time
+from urllib.parse import urlparse
+from ProgressStore import ProgressStore, parse_question_key, verify_missing_questions
+
+
+def last_run_rate(output_folder):
+    """
+    Returns the questions per minute of the exam's last run, from run_metrics.json, or None.
+    """
+    metrics_file = os.path.join(output_folder, "run_metrics.json")
+    try:
+        with open(metrics_file, "r", encoding="utf-8") as f:
+            rate = json.load(f).get("questions_per_minute")
+    except (OSError, ValueError):
+        return None
+    return rate if rate and rate > 0 else None
+
+
+def read_csv_ledger(csv_file):
+    """
+    Reads a legacy discussion_url.csv ledger the way the first run imports it into the
+    progress ledger, without pandas.
+
+    Returns:
+        dict: (topic, question) -> whether the question is scraped.
+    """
+    rows = {}
+    with open(csv_file, "r", encoding="utf-8", newline="") as f:
+        for row in csv.DictReader(f):
+            if not row.get("Pregunta"):
+                continue
+            key = parse_question_key(row["Pregunta"])
+            scraping = str(row.get("Scraping", "")).strip().lower() == "true"
+            # A question keeps its status unless its URL changes, as in ProgressStore.upsert.
+            if key not in rows or rows[key][0] != row.get("URL"):
+                rows[key] = (row.get("URL"), scraping)
+    return {key: scraping for key, (_, scraping) in rows.items()}
+
+
+def plan_exam(requirement_file, settings=None, now=None):
+    """
+    Works out what a run of an exam has left to do, from its requirement file and
+    progress ledger only, opened read-only (or its discussion_url.csv when it has no
+    progress ledger yet or one of an older version): no results are loaded, no browser is
+    started, nothing is fetched and nothing is written.
+
+    Args:
+        requirement_file (str): Path to the exam's user_requirement.json.
+        settings (dict): Run settings overriding the requirement file, such as a batch
+            file's requests_per_minute and host_budgets (default: None).
+        now (float): Unix time retries are due at (default: now).
+
+    Returns:
+        dict: Counts of known, scraped, due, waiting and given-up questions, the questions
+        still to discover (None when the question count is not known yet), the scraping and
+        discovery rates used, and the estimated minutes of each stage and of the run.
+    """
+    with open(requirement_file, "r", encoding="utf-8") as f:
+        user_data = json.load(f)
+    settings = {**user_data, **(settings or {})}
+    now = time.time() if now is None else now
+    exam = user_data.get("exam", "default_exam")
+    output_folder = f"./{exam}_output_questions"
+    ledger_file = os.path.join(output_folder, "progress.sqlite3")
+    csv_file = os.path.join(output_folder, "discussion_url.csv")
+
+    known = scraped = due = waiting = dead = 0
+    keys = set()
+    if os.path.exists(ledger_file):
+        # Read-only: planning must not create or migrate the schema of an old ledger.
+        ledger = ProgressStore(ledger_file, exam, read_only=True)
+        try:
+            # A ledger of an older version is planned from its CSV export below.
+            if not ledger.needs_migration():
+                known = ledger.count()
+                scraped = known - ledger.count(pending_only=True)
+                due = ledger.count(pending_only=True, due_at=now)
+                waiting, dead = ledger.retry_counts(now)
+                keys = ledger.keys()
+        finally:
+            ledger.close()
+    if not known and os.path.exists(csv_file):
+        # Not imported into the progress ledger yet (the next run imports the CSV first),
+        # or written by an older version and not migrated yet.
+        rows = read_csv_ledger(csv_file)
+        known = len(rows)
+        scraped = sum(rows.values())
+        due = known - scraped
+        keys = set(rows)
+
+    max_question = int(user_data.get("max_question") or 0)
+    if user_data.get("extract_csv_finished", "False") == "True":
+        missing = 0
+    elif max_question:
+        missing = len(verify_missing_questions(keys, max_question))
+    else:
+        missing = None
+
+    budget = float(settings.get("requests_per_minute", 12))
+    host = urlparse(user_data.get("exam_main_url", "")).netloc
+    host_budget = float((settings.get("host_budgets") or {}).get(host, budget))
+    scrape_rate = last_run_rate(output_folder) or host_budget or None
+    # At most one search per missing question; the listing crawl usually finds them faster.
+    discovery_rate = budget or None
+
+    to_scrape = due + (missing or 0)
+    scrape_minutes = to_scrape / scrape_rate if scrape_rate else None
+    discovery_minutes = (missing or 0) / discovery_rate if discovery_rate else None
+    # Discovery and scraping overlap, so the run takes about as long as the slower stage.
+    stages = [minutes for minutes in (scrape_minutes, discovery_minutes) if minutes is not None]
+    return {
+        "exam": exam,
+        "known": known,
+        "scraped": scraped,
+        "due": due,
+        "waiting": waiting,
+        "dead": dead,
+        "max_question": max_question or None,
+        "missing": missing,
+        "scrape_rate": scrape_rate,
+        "scrape_rate_observed": scrape_rate is not None and scrape_rate != host_budget,
+        "discovery_rate": discovery_rate,
+        "scrape_minutes": scrape_minutes,
+        "discovery_minutes": discovery_minutes,
+        "total_minutes": max(stages) if stages else None,
+    }
+
+
+def has_work(plan):
+    """
+    Tells whether a run of the planned exam has anything to discover or scrape.
+    """
+    return bool(plan["due"]) or plan["missing"] != 0
+
+
+def print_plan(plan):
+    from BatchRunner import format_eta
+
+    def eta(minutes):
+        return format_eta(minutes * 60 if minutes is not None else None)
+
+    name = plan["exam"]
+    print(
+        f"[{name}] ledger: {plan['known']} questions known, {plan['scraped']} scraped, {plan['due']} due now, "
+        f"{plan['waiting']} waiting for a retry, {plan['dead']} given up."
+    )
+    if plan["missing"] is None:
+        print(f"[{name}] discovery: question count unknown, it is read from the exam page on the next run.")
+    elif plan["missing"]:
+        print(f"[{name}] discovery: {plan['missing']} of {plan['max_question']} questions have no URL yet.")
+    else:
+        print(f"[{name}] discovery: complete.")
+
+    if not has_work(plan):
+        print(f"[{name}] nothing to do.")
+        return
+    rate = plan["scrape_rate"]
+    source = "last run" if plan["scrape_rate_observed"] else "request budget"
+    rate_text = f"{rate:.1f}/min ({source})" if rate else "an unknown rate"
+    print(
+        f"[{name}] estimate: scraping {plan['due'] + (plan['missing'] or 0)} pages at {rate_text} "
+        f"~ {eta(plan['scrape_minutes'])}, discovery ~ {eta(plan['discovery_minutes'])} at most, "
+        f"run ~ {eta(plan['total_minutes'])}."
+    )
+
+
+def plan_run(requirement_files, settings=None):
+    """
+    Prints the plan of every exam and the estimated time of the whole run.
+
+    Returns:
+        list: Plans, as returned by plan_exam.
+    """
+    plans = [plan_exam(requirement_file, settings) for requirement_file in requirement_files]
+    for plan in plans:
+        print_plan(plan)
+    if len(plans) > 1:
+        from BatchRunner import format_eta
+        # A batch shares one request budget, so the exams' estimates add up.
+        total = sum(plan["total_minutes"] or 0 for plan in plans)
+        print(f"Batch estimate: ~ {format_eta(total * 60)}.")
+    return plans
+
+
+def plan_batch(batch_file):
+    """
+    Prints the plan of every exam of a batch file, with the batch's shared settings.
+    """
+    with open(batch_file, "r", encoding="utf-8") as f:
+        batch = json.load(f)
+    settings = {key: value for key, value in batch.items() if key != "exams"}
+    return plan_run(batch["exams"], settings)
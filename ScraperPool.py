@@ -0,0 +1,147 @@
+# Copyright (c) 2025 Diego Martins
+# Licensed under the MIT License. See LICENSE file in the project root for details.
+
+import queue
+import threading
+from collections import namedtuple
+
+ScrapeJob = namedtuple("ScrapeJob", ["index", "question_text", "url", "context"])
+ScrapeJob.__new__.__defaults__ = (None,)
+
+_STOP = object()
+_WORKER_DONE = object()
+
+
+class ScraperPool:
+    """
+    Pool of worker threads, each owning its own WebDriver session, that pull jobs
+    from a shared queue and push their results to a single consumer.
+
+    Only the thread iterating over `results()` should touch shared state such as the
+    FileManager; workers only fetch and parse.
+
+    Attributes:
+        task (callable): Function called as task(browser, job) that returns the scraped data.
+        browser_factory (callable): Function returning a new WebDriver instance.
+        workers (int): Number of worker threads (and browser sessions).
+        rate_limiter (HostRateLimiter): Shared per-host budget, or None for no pacing.
+        max_pending (int): Jobs queued ahead of the workers before `submit` blocks, or 0
+            for no limit (default: 0).
+    """
+    def __init__(self, task, browser_factory, workers=2, rate_limiter=None, max_pending=0):
+        self.task = task
+        self.browser_factory = browser_factory
+        self.workers = max(1, int(workers))
+        self.rate_limiter = rate_limiter
+        self.max_pending = max(0, int(max_pending))
+        self._jobs = queue.Queue(self.max_pending)
+        self._results = queue.Queue()
+        self._threads = []
+        self._running = 0
+        self._cancelled = False
+
+    def start(self):
+        """
+        Starts the worker threads. Each worker opens its browser session on startup.
+        """
+        for number in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f"scraper-{number + 1}", daemon=True)
+            self._threads.append(thread)
+        self._running = len(self._threads)
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, job, timeout=None):
+        """
+        Queues a job for the workers, blocking while `max_pending` jobs are waiting.
+
+        Args:
+            job (ScrapeJob): Job to process.
+            timeout (float): Longest wait for room in the queue, or None to wait forever.
+
+        Returns:
+            bool: Whether the job was queued.
+        """
+        try:
+            self._jobs.put(job, timeout=timeout)
+        except queue.Full:
+            return False
+        return True
+
+    def close(self):
+        """
+        Signals the workers that no more jobs will be submitted.
+        """
+        for _ in self._threads:
+            while not self._cancelled:
+                try:
+                    self._jobs.put(_STOP, timeout=0.5)
+                    break
+                except queue.Full:
+                    continue
+
+    def cancel(self):
+        """
+        Drops the jobs not started yet and stops the workers after their current job.
+
+        Producers must have stopped submitting, or their jobs may run after the cancel.
+
+        Returns:
+            list: Jobs dropped.
+        """
+        self._cancelled = True
+        dropped = []
+        while True:
+            try:
+                job = self._jobs.get_nowait()
+            except queue.Empty:
+                break
+            if job is not _STOP:
+                dropped.append(job)
+        return dropped
+
+    def results(self):
+        """
+        Yields the outcome of every job until all workers have finished.
+
+        Can be called again after an interruption, e.g. to collect the jobs in progress
+        after a cancel.
+
+        Yields:
+            tuple: (job, data, error) where exactly one of data and error is None.
+        """
+        while self._running:
+            item = self._results.get()
+            if item is _WORKER_DONE:
+                self._running -= 1
+                continue
+            yield item
+
+    def _worker(self):
+        try:
+            browser = self.browser_factory()
+        except Exception as e:
+            print(f"[{threading.current_thread().name}] Could not start browser: {e}")
+            self._results.put(_WORKER_DONE)
+            return
+
+        try:
+            while not self._cancelled:
+                try:
+                    job = self._jobs.get(timeout=0.5)
+                except queue.Empty:
+                    continue
+                if job is _STOP:
+                    break
+                try:
+                    if self.rate_limiter:
+                        self.rate_limiter.wait(job.url)
+                    self._results.put((job, self.task(browser, job), None))
+                except Exception as e:
+                    self._results.put((job, None, e))
+        finally:
+            try:
+                browser.quit()
+            except Exception:
+                pass
+            self._results.put(_WORKER_DONE)
@@ -0,0 +1,290 @@
+# Copyright (c) 2025 Diego Martins
+# Licensed under the MIT License. See LICENSE file in the project root for details.
+
+import argparse
+import glob
+import os
+import re
+import sqlite3
+import threading
+import time
+from ResultIndex import result_key
+from ResultStore import load_results, results_path
+
+DEFAULT_INDEX_FILE = "search_index.sqlite3"
+DEFAULT_LIMIT = 20
+# bm25 weights of question_text, choices_text and answer_text.
+COLUMN_WEIGHTS = (10.0, 4.0, 2.0)
+TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+# Bumped whenever the schema changes; an index of another version is dropped and rebuilt.
+SCHEMA_VERSION = 2
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS questions (
+    id INTEGER PRIMARY KEY,
+    exam TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    topic INTEGER NOT NULL,
+    question INTEGER NOT NULL,
+    question_text TEXT NOT NULL,
+    choices_text TEXT NOT NULL,
+    answer_text TEXT NOT NULL,
+    UNIQUE (exam, position)
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS questions_fts USING fts5(
+    question_text, choices_text, answer_text,
+    content='questions', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS questions_insert AFTER INSERT ON questions BEGIN
+    INSERT INTO questions_fts (rowid, question_text, choices_text, answer_text)
+    VALUES (new.id, new.question_text, new.choices_text, new.answer_text);
+END;
+CREATE TRIGGER IF NOT EXISTS questions_delete AFTER DELETE ON questions BEGIN
+    INSERT INTO questions_fts (questions_fts, rowid, question_text, choices_text, answer_text)
+    VALUES ('delete', old.id, old.question_text, old.choices_text, old.answer_text);
+END;
+CREATE TRIGGER IF NOT EXISTS questions_update AFTER UPDATE ON questions BEGIN
+    INSERT INTO questions_fts (questions_fts, rowid, question_text, choices_text, answer_text)
+    VALUES ('delete', old.id, old.question_text, old.choices_text, old.answer_text);
+    INSERT INTO questions_fts (rowid, question_text, choices_text, answer_text)
+    VALUES (new.id, new.question_text, new.choices_text, new.answer_text);
+END;
+CREATE TABLE IF NOT EXISTS sources (
+    exam TEXT PRIMARY KEY,
+    signature TEXT NOT NULL
+);
+"""
+DROP_SCHEMA = """
+DROP TRIGGER IF EXISTS questions_insert;
+DROP TRIGGER IF EXISTS questions_delete;
+DROP TRIGGER IF EXISTS questions_update;
+DROP TABLE IF EXISTS questions_fts;
+DROP TABLE IF EXISTS questions;
+DROP TABLE IF EXISTS sources;
+"""
+
+
+def searchable_fields(record):
+    """
+    Returns the (question_text, choices_text, answer_text) indexed for a result record.
+    """
+    # Choice texts already start with their letter ("A. ...").
+    choices = " ".join(choice.get("text") or "" for choice in record.get("choices") or [])
+    return record.get("question_text") or "", choices, record.get("answer_image_text") or ""
+
+
+def match_query(text):
+    """
+    Turns free text into an FTS5 query matching every word, the last one as a prefix,
+    so operators and quotes typed by the user cannot break the query.
+
+    Returns:
+        str: FTS5 query, or "" if the text has no words.
+    """
+    tokens = TOKEN_PATTERN.findall(text)
+    if not tokens:
+        return ""
+    terms = [f'"{token}"' for token in tokens]
+    terms[-1] += "*"
+    return " ".join(terms)
+
+
+def exam_folders(root="."):
+    """
+    Returns exam name -> output folder for every <exam>_output_questions folder under root.
+    """
+    return {
+        os.path.basename(folder)[:-len("_output_questions")]: folder
+        for folder in sorted(glob.glob(os.path.join(root, "*_output_questions")))
+    }
+
+
+def results_signature(output_folder):
+    """
+    Returns a signature of an output folder's results that changes whenever they do.
+    """
+    json_file = os.path.join(output_folder, "questions_answer.json")
+    parts = []
+    for path in (results_path(json_file), json_file):
+        if os.path.exists(path):
+            stat = os.stat(path)
+            parts.append(f"{stat.st_mtime_ns}:{stat.st_size}")
+        else:
+            parts.append("-")
+    return "/".join(parts)
+
+
+class SearchIndex:
+    """
+    SQLite FTS5 index of the question text, choices and answer text of every exam.
+
+    Matches are ranked with bm25, the question text weighing most. Each record is indexed
+    by its position in the exam's result list, so records of different questions that
+    share a (topic, question) key are all kept. Questions are added or replaced one by
+    one as they are scraped (see `upsert`), and `build` re-indexes the exams whose
+    results changed since they were last indexed.
+
+    Attributes:
+        path (str): Path of the SQLite file.
+    """
+    def __init__(self, path=DEFAULT_INDEX_FILE):
+        self.path = path
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        connection = self._connection()
+        if connection.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+            connection.executescript(DROP_SCHEMA)
+            connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        connection.executescript(SCHEMA)
+
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.execute("PRAGMA journal_mode=WAL")
+            # The index can be rebuilt from the results, so commits skip the fsync.
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def _upsert(self, connection, exam, position, record):
+        key = result_key(record)
+        if key is None:
+            return
+        connection.execute(
+            """
+            INSERT INTO questions (exam, position, topic, question, question_text, choices_text, answer_text)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (exam, position) DO UPDATE SET
+                topic = excluded.topic, question = excluded.question,
+                question_text = excluded.question_text, choices_text = excluded.choices_text,
+                answer_text = excluded.answer_text
+            """,
+            (exam, position, *key, *searchable_fields(record))
+        )
+
+    def upsert(self, exam, record, position):
+        """
+        Adds a result record to the index, or replaces the indexed record at its position
+        in the exam's result list.
+        """
+        connection = self._connection()
+        with connection:
+            self._upsert(connection, exam, position, record)
+
+    def replace_exam(self, exam, records, signature=None):
+        """
+        Re-indexes all the questions of an exam in one transaction.
+
+        Returns:
+            int: Questions stored in the index for the exam.
+        """
+        connection = self._connection()
+        with connection:
+            connection.execute("DELETE FROM questions WHERE exam = ?", (exam,))
+            for position, record in enumerate(records):
+                self._upsert(connection, exam, position, record)
+            if signature is not None:
+                connection.execute("INSERT OR REPLACE INTO sources VALUES (?, ?)", (exam, signature))
+            return connection.execute("SELECT COUNT(*) FROM questions WHERE exam = ?", (exam,)).fetchone()[0]
+
+    def build(self, root=".", force=False):
+        """
+        Indexes every exam under a project folder whose results changed since its last
+        indexing, and drops the exams whose output folder is gone.
+
+        Returns:
+            dict: Exam -> questions indexed, for the exams re-indexed.
+        """
+        connection = self._connection()
+        indexed = dict(connection.execute("SELECT exam, signature FROM sources"))
+        folders = exam_folders(root)
+        rebuilt = {}
+        for exam, folder in folders.items():
+            signature = results_signature(folder)
+            if not force and indexed.get(exam) == signature:
+                continue
+            records = load_results(os.path.join(folder, "questions_answer.json"))
+            rebuilt[exam] = self.replace_exam(exam, records, signature)
+        with connection:
+            for exam in set(indexed) - set(folders):
+                connection.execute("DELETE FROM questions WHERE exam = ?", (exam,))
+                connection.execute("DELETE FROM sources WHERE exam = ?", (exam,))
+        return rebuilt
+
+    def search(self, text, exam=None, limit=DEFAULT_LIMIT):
+        """
+        Returns the questions best matching free text.
+
+        Args:
+            text (str): Words to look for.
+            exam (str): Only search this exam (default: all exams).
+            limit (int): Maximum number of matches (default: 20).
+
+        Returns:
+            list: Dicts with exam, topic, question, score (higher is better) and snippet,
+            the best match first.
+        """
+        query = match_query(text)
+        if not query:
+            return []
+        sql = f"""
+            SELECT q.exam, q.topic, q.question, -bm25(questions_fts, {', '.join(map(str, COLUMN_WEIGHTS))}) AS score,
+                   snippet(questions_fts, -1, '[', ']', '...', 16)
+            FROM questions_fts JOIN questions q ON q.id = questions_fts.rowid
+            WHERE questions_fts MATCH ?{" AND q.exam = ?" if exam else ""}
+            ORDER BY score DESC LIMIT ?
+        """
+        parameters = (query, exam, limit) if exam else (query, limit)
+        return [
+            {"exam": row[0], "topic": row[1], "question": row[2], "score": round(row[3], 3), "snippet": row[4]}
+            for row in self._connection().execute(sql, parameters)
+        ]
+
+    def close(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Build and query the full-text index of the scraped questions.")
+    parser.add_argument("command", choices=["build", "query"])
+    parser.add_argument("text", nargs="*", help="Words to look for (query).")
+    parser.add_argument("--exam", help="Only search this exam.")
+    parser.add_argument("--limit", type=int, default=DEFAULT_LIMIT)
+    parser.add_argument("--root", default=".", help="Project folder (default: current folder).")
+    parser.add_argument("--index", help=f"Index file (default: <root>/{DEFAULT_INDEX_FILE}).")
+    parser.add_argument("--force", action="store_true", help="Re-index every exam (build).")
+    # Options may come before or after the words of the query.
+    return parser.parse_intermixed_args()
+
+
+def main():
+    args = parse_args()
+    index = SearchIndex(args.index or os.path.join(args.root, DEFAULT_INDEX_FILE))
+    try:
+        started = time.perf_counter()
+        rebuilt = index.build(args.root, force=args.force)
+        if args.command == "build":
+            for exam, count in rebuilt.items():
+                print(f"{exam}: {count} questions indexed.")
+            print(f"Index up to date in {(time.perf_counter() - started) * 1000:.1f}ms.")
+            return
+
+        started = time.perf_counter()
+        matches = index.search(" ".join(args.text), exam=args.exam, limit=args.limit)
+        elapsed = (time.perf_counter() - started) * 1000
+        for match in matches:
+            print(f"{match['score']:7.2f}  {match['exam']} topic {match['topic']} question {match['question']}: "
+                  f"{match['snippet']}")
+        print(f"{len(matches)} matches in {elapsed:.1f}ms.")
+    finally:
+        index.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,263 @@
+# Copyright (c) 2025 Diego Martins
+# Licensed under the MIT License. See LICENSE file in the project root for details.
+
+import threading
+import time
+from urllib.parse import quote_plus, urljoin
+from lxml import etree
+from Metrics import metrics
+from RateLimiter import detect_search_block
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.common.action_chains import ActionChains
+
+# Collects every link of the rendered page in a single WebDriver round trip.
+LINKS_SCRIPT = "return Array.from(document.querySelectorAll('a[href]'), a => a.href);"
+HTML_LINKS = etree.XPath("//a/@href")
+
+
+def extract_links(html, base_url):
+    """
+    Returns the absolute href of every link in an HTML document.
+    """
+    root = etree.fromstring(html.encode("utf-8"), etree.HTMLParser(encoding="utf-8"))
+    if root is None:
+        return []
+    return [urljoin(base_url, href) for href in HTML_LINKS(root)]
+
+
+def first_matching_link(links, target_domain):
+    for href in links:
+        if href and target_domain in href:
+            return href
+    return None
+
+
+class SearchProvider:
+    """
+    One search engine used to find discussion URLs.
+
+    Queries are opened directly as result URLs, so a search costs one navigation, and the
+    result links are read in one DOM snapshot. Providers with `use_http` are fetched with
+    the HTTP client instead of the browser when one is available. Pacing is left to the
+    SearchEngine's rate limiter.
+
+    Attributes:
+        name (str): Name shown in logs and statistics.
+        search_url (str): Root URL of the engine; queries go to <search_url>/search?q=.
+        popup_xpath (str): Consent button clicked the first time a browser session opens the engine.
+        use_http (bool): Fetch result pages over HTTP when a fetcher is given (default: False).
+    """
+    def __init__(self, name, search_url, popup_xpath=None, use_http=False):
+        self.name = name
+        self.search_url = search_url.rstrip("/")
+        self.popup_xpath = popup_xpath
+        self.use_http = use_http
+        # Session ids of the browsers that went through the consent popup; pooled browsers
+        # change session when they are recycled and have to consent again.
+        self._consented = set()
+
+    def query_url(self, query):
+        return f"{self.search_url}/search?q={quote_plus(query)}"
+
+    def search(self, query, target_domain="examtopics.com", browser=None, fetcher=None):
+        """
+        Runs one query and returns the first result link on the target domain.
+
+        Returns:
+            tuple: (url or None, blocked), where blocked tells whether the engine answered
+            with a throttling status, a CAPTCHA or a traffic warning instead of results.
+        """
+        url = self.query_url(query)
+        if self.use_http and fetcher is not None:
+            response = fetcher.fetch(url)
+            html = response.text or ""
+            blocked = detect_search_block(response.status, html, response.url)
+            links = [] if blocked else extract_links(html, response.url)
+        else:
+            browser.get(url)
+            session = getattr(browser, "session_id", None) or id(browser)
+            if self.popup_xpath and session not in self._consented:
+                handle_popup(browser, self.popup_xpath)
+                self._consented.add(session)
+            blocked = detect_search_block(text=browser.page_source, url=browser.current_url)
+            links = [] if blocked else browser.execute_script(LINKS_SCRIPT) or []
+        return (None if blocked else first_matching_link(links, target_domain)), blocked
+
+
+def handle_popup(browser, popup_xpath):
+    """
+    Handles popup by clicking the specified element if present.
+
+    Args:
+        browser (WebDriver): Selenium WebDriver instance.
+        popup_xpath (str): XPath of the popup element to click.
+
+    Returns:
+        None
+    """
+    try:
+        consent_button = WebDriverWait(browser, 5).until(
+            EC.element_to_be_clickable((By.XPATH, popup_xpath))
+        )
+        ActionChains(browser).move_to_element(consent_button).click().perform()
+        print("Popup handled successfully.")
+    except Exception:
+        print("No popup found or it was already handled.")
+
+
+class ProviderStats:
+    """
+    Success and latency statistics of one provider.
+
+    Attributes:
+        attempts (int): Queries sent.
+        hits (int): Queries that returned a URL.
+        blocked (int): Queries answered with a traffic warning.
+        errors (int): Queries that raised.
+        latency (float): Exponentially weighted average latency in seconds, or None.
+    """
+    def __init__(self):
+        self.attempts = 0
+        self.hits = 0
+        self.blocked = 0
+        self.errors = 0
+        self.latency = None
+
+    def record(self, seconds, hit, blocked=False, error=False, decay=0.3):
+        self.attempts += 1
+        self.hits += int(hit)
+        self.blocked += int(blocked)
+        self.errors += int(error)
+        self.latency = seconds if self.latency is None else (1 - decay) * self.latency + decay * seconds
+
+    def expected_cost(self, latency_prior, block_penalty):
+        """
+        Expected seconds spent per URL found: average latency (plus a penalty for blocks)
+        divided by the smoothed hit rate.
+        """
+        hit_rate = (self.hits + 1) / (self.attempts + 2)
+        latency = latency_prior if self.latency is None else self.latency
+        block_rate = self.blocked / self.attempts if self.attempts else 0.0
+        return (latency + block_rate * block_penalty) / hit_rate
+
+    def as_dict(self):
+        return {
+            "attempts": self.attempts,
+            "hits": self.hits,
+            "blocked": self.blocked,
+            "errors": self.errors,
+            "latency": self.latency,
+        }
+
+
+class SearchEngine:
+    """
+    Picks search providers by expected cost and keeps their statistics.
+
+    Each query tries the providers from the cheapest to the most expensive; a provider
+    that keeps missing, blocking or slowing down sinks in the order on its own. With a
+    QueryCache, queries answered by an earlier run are not sent again. With a rate
+    limiter, every query waits for its engine's slot and reports how it went, and an
+    engine paused for longer than `max_wait` after a block is skipped while another
+    one is available.
+
+    Attributes:
+        providers (list): SearchProvider instances.
+        latency_prior (float): Latency assumed for a provider not used yet (default: 5).
+        block_penalty (float): Seconds added to the cost per blocked query ratio (default: 60).
+        target_domain (str): Domain of the links searched for (default: "examtopics.com").
+        cache (QueryCache): Answers of earlier searches (default: None).
+        rate_limiter (HostRateLimiter): Pacing of the queries per engine (default: None).
+        max_wait (float): Longest wait for an engine's slot before trying the next one (default: 60).
+    """
+    def __init__(self, providers, latency_prior=5.0, block_penalty=60.0, target_domain="examtopics.com",
+                 cache=None, rate_limiter=None, max_wait=60.0):
+        self.providers = list(providers)
+        self.target_domain = target_domain
+        self.cache = cache
+        self.rate_limiter = rate_limiter
+        self.max_wait = max_wait
+        self.cache_hits = 0
+        self.latency_prior = latency_prior
+        self.block_penalty = block_penalty
+        self.stats = {provider.name: ProviderStats() for provider in self.providers}
+        self._lock = threading.Lock()
+
+    def ranked(self):
+        with self._lock:
+            costs = {
+                provider.name: self.stats[provider.name].expected_cost(self.latency_prior, self.block_penalty)
+                for provider in self.providers
+            }
+        # sorted() is stable, so ties keep the configured order.
+        return sorted(self.providers, key=lambda provider: costs[provider.name])
+
+    def search(self, query, target_domain=None, browser=None, fetcher=None):
+        """
+        Searches with the providers in order of expected cost until one returns a URL.
+
+        Only searches every provider answered without blocking or failing are cached as
+        misses, so a transient block does not hide a question for the whole backoff.
+
+        Returns:
+            tuple: (url, provider name), or (None, None) if no provider found one. Cached
+            answers are reported with the provider name "cache".
+        """
+        target_domain = target_domain or self.target_domain
+        if self.cache is not None:
+            status, url = self.cache.lookup(query, target_domain)
+            if status is not None:
+                with self._lock:
+                    self.cache_hits += 1
+                metrics.increment("query_cache_hits")
+                return (url, "cache") if url else (None, None)
+
+        conclusive = True
+        providers = self.ranked()
+        for position, provider in enumerate(providers):
+            if self.rate_limiter is not None:
+                last = position == len(providers) - 1
+                if not last and self.rate_limiter.pending(provider.search_url) > self.max_wait:
+                    conclusive = False
+                    continue
+                self.rate_limiter.wait(provider.search_url)
+            started = time.monotonic()
+            url, blocked, error = None, False, False
+            try:
+                url, blocked = provider.search(query, target_domain, browser=browser, fetcher=fetcher)
+            except Exception as e:
+                error = True
+                print(f"Error during search on {provider.name}: {e}")
+            elapsed = time.monotonic() - started
+            if self.rate_limiter is not None and not error:
+                self.rate_limiter.report(provider.search_url, elapsed, blocked=blocked)
+            with self._lock:
+                self.stats[provider.name].record(elapsed, url is not None, blocked, error)
+            result = "error" if error else "blocked" if blocked else "hit" if url else "miss"
+            metrics.observe("search", elapsed, provider=provider.name)
+            metrics.increment("searches", provider=provider.name, result=result)
+            if blocked:
+                print(f"Unusual traffic detected on {provider.name}.")
+            if url:
+                print(f"Found relevant URL on {provider.name}: {url}")
+                if self.cache is not None:
+                    self.cache.store(query, url, target_domain)
+                return url, provider.name
+            conclusive = conclusive and not (blocked or error)
+
+        if self.cache is not None and conclusive:
+            self.cache.store(query, None, target_domain)
+        return None, None
+
+    def summary(self):
+        with self._lock:
+            return {name: stats.as_dict() for name, stats in self.stats.items()}
+
+
+def default_providers():
+    return [
+        SearchProvider("Google", "https://www.google.com", popup_xpath='//button[@id="L2AGLb"]'),
+        SearchProvider("Bing", "https://www.bing.com"),
+    ]
@@ -1,23 +1,30 @@
 # Copyright (c) 2025 Diego Martins
 # Licensed under the MIT License. See LICENSE file in the project root for details.
 
-import random
-import time
 import pandas as pd
 from FileManager import FileManager
+from bs4 import BeautifulSoup
+from DiscussionCrawler import crawl_discussion_urls
+from SearchProviders import SearchEngine, SearchProvider, default_providers, handle_popup
+from QueryCache import QueryCache
+from ProgressStore import question_label, verify_missing_questions
+from RateLimiter import HostRateLimiter
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.common.action_chains import ActionChains
 
+# Shared by every exam, so a question answered for one run is not searched again by the next.
+DEFAULT_QUERY_CACHE = "./query_cache.sqlite3"
 
-def fetch_max_questions(browser, exam_url):
+
+def fetch_max_questions(browser, exam_url, wait_time=10):
     """
     Fetches the maximum number of questions from the exam webpage.
 
     Args:
         browser (WebDriver): Selenium WebDriver instance.
         exam_url (str): URL of the exam page.
+        wait_time (int): Maximum time to wait for the question count (default: 10 seconds).
 
     Returns:
         int: Maximum number of questions found.
@@ -26,16 +33,75 @@ def fetch_max_questions(browser, exam_url):
         RuntimeError: If the maximum number of questions cannot be fetched.
     """
     browser.get(exam_url)
-    time.sleep(3)
 
     try:
-        element = browser.find_element(By.CLASS_NAME, "exam-stat-wrapper-item")
+        element = WebDriverWait(browser, wait_time).until(
+            EC.presence_of_element_located((By.CLASS_NAME, "exam-stat-wrapper-item"))
+        )
         max_questions = element.find_element(By.TAG_NAME, "span").text.strip()
         return int(max_questions)
     except Exception as e:
         raise RuntimeError(f"Failed to fetch maximum questions: {e}")
 
 
+def parse_max_questions(html):
+    """
+    Reads the number of questions from the HTML of an exam page.
+
+    Args:
+        html (str): Raw HTML of the exam page.
+
+    Returns:
+        int or None: Number of questions, or None if the stat is missing.
+    """
+    soup = BeautifulSoup(html, "html.parser")
+    element = soup.find(class_="exam-stat-wrapper-item")
+    if element is None or element.find("span") is None:
+        return None
+    try:
+        return int(element.find("span").get_text(strip=True))
+    except ValueError:
+        return None
+
+
+def detect_new_questions(browser, file_manager, fetcher=None):
+    """
+    Checks the exam page for questions beyond the stored max_question.
+
+    When the exam has grown, max_question is raised and extract_csv_finished is reset so
+    the next discovery pass looks for the new questions.
+
+    Args:
+        browser (WebDriver): Selenium WebDriver instance, used if HTTP fetching fails.
+        file_manager (FileManager): FileManager instance to handle JSON files.
+        fetcher (HttpFetcher): HTTP client for the exam page (default: None).
+
+    Returns:
+        int: Current number of questions.
+    """
+    user_requirements = file_manager.get_input_json_data()
+    exam_url = user_requirements["exam_main_url"]
+    stored = int(user_requirements.get("max_question") or 0)
+
+    current = None
+    if fetcher is not None:
+        try:
+            response = fetcher.fetch(exam_url)
+            if response.status == 200:
+                current = parse_max_questions(response.text)
+        except Exception as e:
+            print(f"HTTP fetch of {exam_url} failed: {e}")
+    if current is None:
+        current = fetch_max_questions(browser, exam_url)
+
+    if current > stored:
+        print(f"Exam grew from {stored} to {current} questions.")
+        file_manager.update_input_json("max_question", current)
+        file_manager.update_input_json("extract_csv_finished", "False")
+        return current
+    return stored or current
+
+
 def get_max_questions(browser, file_manager):
     """
     Retrieves the maximum number of questions from the JSON configuration or webpage.
@@ -75,56 +141,18 @@ def search_question(browser, query, search_url, target_domain="examtopics.com",
     Returns:
         str or None: Relevant URL if found, otherwise None.
     """
-    browser.get(search_url)
-
-    if popup_xpath:
-        handle_popup(browser, popup_xpath)
-
+    provider = SearchProvider(search_url, search_url, popup_xpath=popup_xpath)
     try:
-        search_box = WebDriverWait(browser, 10).until(
-            EC.presence_of_element_located((By.NAME, "q"))
-        )
-        search_box.clear()
-        search_box.send_keys(query)
-        search_box.submit()
-        time.sleep(random.uniform(2, 7))
-
-        if "detected unusual traffic" in browser.page_source.lower():
-            print(f"Unusual traffic detected on {search_url}. Aborting search.")
-            return None
-
-        links = browser.find_elements(By.XPATH, '//a[@href]')
-        for link in links:
-            href = link.get_attribute("href")
-            if target_domain in href:
-                print(f"Found relevant URL on {search_url}: {href}")
-                return href
-
+        url, blocked = provider.search(query, target_domain, browser=browser)
     except Exception as e:
         print(f"Error during search on {search_url}: {e}")
+        return None
 
-    return None
-
-
-def handle_popup(browser, popup_xpath):
-    """
-    Handles popup by clicking the specified element if present.
-
-    Args:
-        browser (WebDriver): Selenium WebDriver instance.
-        popup_xpath (str): XPath of the popup element to click.
-
-    Returns:
-        None
-    """
-    try:
-        consent_button = WebDriverWait(browser, 5).until(
-            EC.element_to_be_clickable((By.XPATH, popup_xpath))
-        )
-        ActionChains(browser).move_to_element(consent_button).click().perform()
-        print("Popup handled successfully.")
-    except Exception as e:
-        print("No popup found or it was already handled.")
+    if blocked:
+        print(f"Unusual traffic detected on {search_url}. Aborting search.")
+    elif url:
+        print(f"Found relevant URL on {search_url}: {url}")
+    return url
 
 
 def search_question_google(browser, query, target_domain="examtopics.com"):
@@ -168,16 +196,26 @@ def search_question_bing(browser, query, target_domain="examtopics.com"):
     )
 
 
-def extract_urls(browser, file_manager, max_questions, recursion_depth=0, max_recursion=3):
+def extract_urls(browser, file_manager, max_questions, recursion_depth=0, max_recursion=3,
+                 fetcher=None, rate_limiter=None, search_engine=None):
     """
     Extracts URLs for exam questions and saves progress to a CSV file. Uses recursion to handle missing questions.
 
+    The provider's discussion listing is crawled first to fill the ledger in bulk; the
+    search engines are only used for the questions the crawl did not find, cheapest
+    provider first. Set "discovery": "search" in the user requirements to skip the crawl.
+
     Args:
         browser (WebDriver): Selenium WebDriver instance.
         file_manager (FileManager): FileManager instance for handling CSV and JSON files.
         max_questions (int): Total number of questions to extract URLs for.
         recursion_depth (int): Current recursion depth to avoid infinite loops (default: 0).
         max_recursion (int): Maximum allowed recursion depth (default: 3).
+        fetcher (HttpFetcher): HTTP client for the listing crawl (default: None, use the browser).
+        rate_limiter (HostRateLimiter): Per-host request budget for the listing crawl and the
+            search engines (default: None, a new limiter for the searches only).
+        search_engine (SearchEngine): Search providers for the questions the crawl did not find
+            (default: Google and Bing, with the query cache set by "query_cache").
 
     Returns:
         None
@@ -188,54 +226,56 @@ def extract_urls(browser, file_manager, max_questions, recursion_depth=0, max_re
 
     user_requirements = file_manager.get_input_json_data()
     exam = user_requirements["exam"]
-    start_question, progress_data = file_manager.load_csv_progress()
 
     if user_requirements.get("extract_csv_finished", "False") == "True":
         print("URL extraction already completed.")
         return
 
-    search_engines = [
-        {"name": "Google", "function": search_question_google},
-        {"name": "Bing", "function": search_question_bing}
-    ]
+    if search_engine is None:
+        query_cache = user_requirements.get("query_cache", DEFAULT_QUERY_CACHE)
+        search_engine = SearchEngine(
+            default_providers(),
+            cache=QueryCache(query_cache) if query_cache else None,
+            rate_limiter=rate_limiter or HostRateLimiter()
+        )
 
     try:
         print("Starting URL extraction.")
-        for question_number in range(start_question + 1, max_questions + 1):
-            query = f'ExamTopics exam {exam} topic 1 "question {question_number}" discussion'
-            print(f"Searching: {query}")
-
-            found = False
-            original_engines = list(search_engines)
+        if user_requirements.get("discovery", "crawl") == "crawl":
+            crawl_missing_questions(browser, file_manager, max_questions, fetcher, rate_limiter)
 
-            for engine in original_engines:
-                url = engine["function"](browser, query)
-
-                if url:
-                    file_manager.append_csv_row([f"Question #: {question_number}", url, False])
-                    print(f"Question {question_number}: URL found using {engine['name']}.")
-                    found = True
-                    break
-                else:
-                    search_engines.append(search_engines.pop(search_engines.index(engine)))
-                    print(f"{engine['name']} did not find results and has been deprioritized.")
+        for topic, question_number in verify_missing_questions(file_manager.question_keys(), max_questions):
+            query = f'ExamTopics exam {exam} topic {topic} "question {question_number}" discussion'
+            print(f"Searching: {query}")
 
-            if not found:
-                print(f"Question {question_number}: No URL found on any search engine.")
+            url, provider = search_engine.search(query, browser=browser, fetcher=fetcher)
+            if url:
+                file_manager.append_csv_row([question_label(topic, question_number), url, False])
+                print(f"{question_label(topic, question_number)}: URL found using {provider}.")
+            else:
+                print(f"{question_label(topic, question_number)}: No URL found on any search engine.")
 
-        missing_questions = verify_missing_questions(file_manager.csv_data, max_questions)
+        missing_questions = verify_missing_questions(file_manager.question_keys(), max_questions)
         if missing_questions:
-            print(f"Retrying missing questions: {missing_questions}.")
-            for question_number in missing_questions:
-                query = f"exam {exam} topic 1 question {question_number} discussion"
-                for engine in search_engines:
-                    url = engine["function"](browser, query)
-                    if url:
-                        file_manager.append_csv_row([f"Question #: {question_number}", url, False])
-                        print(f"Retry Question {question_number}: URL found using {engine['name']}.")
-                        break
+            print(f"Retrying missing questions: {[question_label(*key) for key in missing_questions]}.")
+            for topic, question_number in missing_questions:
+                query = f"exam {exam} topic {topic} question {question_number} discussion"
+                url, provider = search_engine.search(query, browser=browser, fetcher=fetcher)
+                if url:
+                    file_manager.append_csv_row([question_label(topic, question_number), url, False])
+                    print(f"Retry {question_label(topic, question_number)}: URL found using {provider}.")
                 else:
-                    print(f"Retry Question {question_number}: No URL found on any search engine.")
+                    print(f"Retry {question_label(topic, question_number)}: No URL found on any search engine.")
+
+        report_topic_coverage(file_manager, max_questions)
+        if search_engine.cache_hits:
+            print(f"{search_engine.cache_hits} searches answered from the query cache.")
+        for name, stats in search_engine.summary().items():
+            if stats["attempts"]:
+                print(
+                    f"{name}: {stats['hits']}/{stats['attempts']} found, {stats['blocked']} blocked, "
+                    f"{stats['latency']:.1f}s average latency."
+                )
 
         file_manager.update_input_json("extract_csv_finished", "True")
         print("URL extraction completed and status updated in JSON.")
@@ -244,18 +284,68 @@ def extract_urls(browser, file_manager, max_questions, recursion_depth=0, max_re
         print(f"General error during URL extraction: {e}")
 
 
-def verify_missing_questions(progress_data, max_questions):
+def crawl_missing_questions(browser, file_manager, max_questions, fetcher=None, rate_limiter=None):
     """
-    Verifies which questions are missing from the progress data.
+    Fills the ledger with the discussion URLs found by crawling the provider's listing pages.
+
+    Every topic is collected in the same pass. The crawl stops early only once all the
+    questions known to be missing are found, so topics the ledger does not know yet are
+    picked up whenever the known ones leave a gap. URLs are added page by page, so they
+    can be scraped while the crawl goes on.
 
     Args:
-        progress_data (DataFrame): Progress data containing scraped questions.
+        browser (WebDriver): Selenium WebDriver instance, used if HTTP fetching fails.
+        file_manager (FileManager): FileManager instance for handling CSV and JSON files.
         max_questions (int): Total number of questions.
+        fetcher (HttpFetcher): HTTP client for the listing pages (default: None).
+        rate_limiter (HostRateLimiter): Per-host request budget (default: None).
 
     Returns:
-        list: List of missing question numbers.
+        int: Number of URLs added to the ledger.
+    """
+    user_requirements = file_manager.get_input_json_data()
+    known = file_manager.question_keys()
+    missing_questions = verify_missing_questions(known, max_questions)
+    if not missing_questions:
+        return 0
+
+    added = []
+
+    def add_page(page_found):
+        with file_manager.batch():
+            for topic, question_number in sorted(set(page_found) - known):
+                url = page_found[(topic, question_number)]
+                file_manager.append_csv_row([question_label(topic, question_number), url, False])
+                added.append((topic, question_number))
+
+    try:
+        crawl_discussion_urls(
+            user_requirements["exam_main_url"],
+            fetcher=fetcher,
+            browser=browser,
+            rate_limiter=rate_limiter,
+            wanted=set(missing_questions),
+            topics=None,
+            max_pages=user_requirements.get("crawl_max_pages"),
+            on_page=add_page
+        )
+    except Exception as e:
+        print(f"Discussion crawl failed, falling back to search engines: {e}")
+
+    print(f"Discussion crawl added {len(added)} questions ({len(missing_questions)} were known to be missing).")
+    return len(added)
+
+
+def report_topic_coverage(file_manager, max_questions):
     """
-    found_questions = progress_data["Pregunta"].apply(lambda x: int(x.split("#: ")[1])).tolist()
-    all_questions = set(range(1, max_questions + 1))
-    missing_questions = list(all_questions - set(found_questions))
-    return missing_questions
\ No newline at end of file
+    Prints how many discussion URLs are known per topic and how they add up to the exam total.
+    """
+    coverage = file_manager.topic_coverage()
+    total = 0
+    for topic, (count, highest, scraped) in coverage.items():
+        total += count
+        gaps = highest - count
+        print(
+            f"Topic {topic}: {count} URLs (questions 1-{highest}, {gaps} gaps), {scraped or 0} scraped."
+        )
+    print(f"Discovery coverage: {total} of {max_questions} questions across {len(coverage)} topics.")
@@ -3,71 +3,83 @@ document.addEventListener('DOMContentLoaded', () => {
     const questionContainer = document.getElementById('quiz-form-modulo1');
     const resultContainer = document.getElementById('result-modulo1');
 
-    fetch('../input/user_requirement.json')
-        .then(response => {
-            if (!response.ok) {
-                throw new Error(`HTTP error! status: ${response.status}`);
+    loadQuiz()
+        .then(({ examName, questions }) => {
+            const examParagraph = document.querySelector('p');
+            if (examParagraph) {
+                examParagraph.textContent = `Exam: ${examName}`;
+            } else {
+                console.error('Paragraph for exam info not found.');
             }
-            return response.json();
-        })
-        .then(userRequirement => {
-            const examName = userRequirement.exam;
-            const jsonFilePath = `../${examName}_output_questions/questions_answer.json`;
-
-            fetch(jsonFilePath)
-                .then(response => {
-                    if (!response.ok) {
-                        throw new Error(`HTTP error! status: ${response.status}`);
-                    }
-                    return response.json();
-                })
-                .then(data => {
-                    console.log('Loaded questions data:', data);
-
-                    const examParagraph = document.querySelector('p');
-                    if (examParagraph) {
-                        examParagraph.textContent = `Exam: ${examName}`;
-                    } else {
-                        console.error('Paragraph for exam info not found.');
-                    }
 
-                    const allQuestions = data;
-                    const selectedQuestions = selectRandomQuestions(allQuestions, totalQuestions);
-                    console.log('Randomly selected questions:', selectedQuestions);
+            const selectedQuestions = questions;
+            console.log('Randomly selected questions:', selectedQuestions);
 
-                    displayQuestions(selectedQuestions);
+            displayQuestions(selectedQuestions);
 
-                    document.querySelector('.btn-primary').addEventListener('click', () => {
-                        evaluateQuiz(selectedQuestions);
-                    });
-                })
-                .catch(error => console.error('Error loading questions JSON:', error));
+            document.querySelector('.btn-primary').addEventListener('click', () => {
+                evaluateQuiz(selectedQuestions);
+            });
         })
-        .catch(error => console.error('Error loading user requirement JSON:', error));
+        .catch(error => console.error('Error loading questions:', error));
 
-        
-    function selectRandomQuestions(allQuestions, num) {
-        const evaluableQuestions = allQuestions.filter(q => q.choices && q.choices.length > 0);
-        const imageOnlyQuestions = allQuestions.filter(q => q.question_image_src && q.question_image_src.length > 0 && (!q.choices || q.choices.length === 0));
-        const otherQuestions = allQuestions.filter(q => !q.choices && (!q.question_image_src || q.question_image_src.length === 0));
+    function fetchJson(path) {
+        return fetch(path).then(response => {
+            if (!response.ok) {
+                throw new Error(`HTTP error! status: ${response.status}`);
+            }
+            return response.json();
+        });
+    }
+
+    // The quiz server (python QuizServer.py serve) draws the quiz from precomputed
+    // bundles; when the page is opened any other way, fall back to the full JSON file.
+    function loadQuiz() {
+        return fetchJson(`/api/quiz?n=${totalQuestions}`)
+            .then(quiz => ({ examName: quiz.exam, questions: quiz.questions }))
+            .catch(() => fetchJson('../input/user_requirement.json')
+                .then(userRequirement => {
+                    const examName = userRequirement.exam;
+                    const jsonFilePath = `../${examName}_output_questions/questions_answer.json`;
+                    return fetchJson(jsonFilePath)
+                        .then(data => ({ examName, questions: selectRandomQuestions(data, totalQuestions) }));
+                }));
+    }
 
-        const shuffledEvaluable = shuffleArray(evaluableQuestions);
-        const shuffledImageOnly = shuffleArray(imageOnlyQuestions);
-        const shuffledOther = shuffleArray(otherQuestions);
+    function selectRandomQuestions(allQuestions, num) {
+        const evaluableQuestions = [];
+        const imageOnlyQuestions = [];
+        const otherQuestions = [];
+        allQuestions.forEach(q => {
+            if (q.choices && q.choices.length > 0) {
+                evaluableQuestions.push(q);
+            } else if (q.question_image_src && q.question_image_src.length > 0) {
+                imageOnlyQuestions.push(q);
+            } else {
+                otherQuestions.push(q);
+            }
+        });
 
-        const selectedImageOnly = shuffledImageOnly.slice(0, Math.min(10, imageOnlyQuestions.length));
+        const selectedImageOnly = sampleArray(imageOnlyQuestions, Math.min(10, num));
         const remaining = num - selectedImageOnly.length;
 
-        const selectedEvaluable = shuffledEvaluable.slice(0, Math.min(remaining, evaluableQuestions.length));
+        const selectedEvaluable = sampleArray(evaluableQuestions, remaining);
         const finalRemaining = remaining - selectedEvaluable.length;
 
-        const selectedOther = shuffledOther.slice(0, finalRemaining);
+        const selectedOther = sampleArray(otherQuestions, finalRemaining);
 
         return [...selectedImageOnly, ...selectedEvaluable, ...selectedOther];
     }
 
-    function shuffleArray(array) {
-        return array.sort(() => Math.random() - 0.5);
+    // Partial Fisher-Yates shuffle: an unbiased sample of `count` items.
+    function sampleArray(array, count) {
+        const items = array.slice();
+        const size = Math.min(count, items.length);
+        for (let i = 0; i < size; i++) {
+            const j = i + Math.floor(Math.random() * (items.length - i));
+            [items[i], items[j]] = [items[j], items[i]];
+        }
+        return items.slice(0, size);
     }
 
     function displayQuestions(questions) {
@@ -1,43 +1,198 @@
 # Copyright (c) 2025 Diego Martins
 # Licensed under the MIT License. See LICENSE file in the project root for details.
 
+import argparse
 import os
-import json
-from FileManager import FileManager
-from BrowserSetup import setup_browser
-from URLExtractor import get_max_questions, extract_urls
-from QuestionScraper import scrape_question_info
+from BrowserSetup import browser_pool
+from RateLimiter import HostRateLimiter
+from HttpFetcher import HttpFetcher
+from BatchRunner import ExamRun, ScrapePipeline, run_batch
+from ResultIndex import compact_all
+from Metrics import metrics, MetricsServer
+from RunPlan import has_work, plan_batch, plan_exam, plan_run
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Scrape exam questions and discussions.")
+    parser.add_argument(
+        "--reparse-from-cache",
+        action="store_true",
+        help="Rebuild questions_answer.json from the cached discussion pages, without a browser."
+    )
+    parser.add_argument(
+        "--refresh",
+        action="store_true",
+        help="Pick up new questions and re-scrape only the discussion pages that changed."
+    )
+    parser.add_argument(
+        "--mirror-images",
+        action="store_true",
+        help="Download the question and answer images and point questions_answer.json to the local copies."
+    )
+    parser.add_argument(
+        "--extract-discussions",
+        action="store_true",
+        help="Extract the comments and community votes of the cached discussion pages, without a browser."
+    )
+    parser.add_argument(
+        "--retry-failed",
+        action="store_true",
+        help="Retry now the questions waiting for a retry or given up after repeated failures."
+    )
+    parser.add_argument(
+        "--compact",
+        action="store_true",
+        help="Merge duplicate results in every *_output_questions folder and exit."
+    )
+    parser.add_argument(
+        "--export-columnar",
+        action="store_true",
+        help="Export every *_output_questions folder as typed columnar tables and exit."
+    )
+    parser.add_argument(
+        "--plan",
+        action="store_true",
+        help="Report the discovery and scraping work left and its estimated time, from the ledger only, and exit."
+    )
+    parser.add_argument(
+        "--batch",
+        metavar="BATCH_FILE",
+        help="Refresh every exam listed in a batch JSON file with one shared worker pool."
+    )
+    return parser.parse_args()
+
 
 def main():
+    args = parse_args()
+
     user_input_folder = "./input"
     user_requirement_file = os.path.join(user_input_folder, "user_requirement.json")
 
-    # Load user requirements
-    with open(user_requirement_file, 'r') as file:
-        user_data = json.load(file)
-        exam_name = user_data.get("exam", "default_exam")
+    if args.plan:
+        if args.batch:
+            plan_batch(args.batch)
+        else:
+            plan_run([user_requirement_file])
+        return
+
+    if args.compact:
+        compact_all(".")
+        return
+
+    if args.export_columnar:
+        from ColumnarExport import export_all
+        export_all(".")
+        return
+
+    if args.batch:
+        run_batch(args.batch)
+        return
+
+    # Load user requirements, output files and page cache
+    needs_cache = args.reparse_from_cache or args.extract_discussions
+    exam = ExamRun(user_requirement_file, use_page_cache=True if needs_cache else None)
+    user_data = exam.user_data
+    workers = int(user_data.get("workers", 1))
+    requests_per_minute = float(user_data.get("requests_per_minute", 12))
+    fetch_mode = user_data.get("fetch_mode", "http")
+    parser = exam.parser
 
-    # Define output paths
-    output_folder = f"./{exam_name}_output_questions"
-    json_output_file = os.path.join(output_folder, "questions_answer.json")
-    csv_file = os.path.join(output_folder, "discussion_url.csv")
+    file_manager = exam.file_manager
+    page_cache = exam.page_cache
+    json_output_file = exam.json_output_file
+    metrics_file = os.path.join(exam.output_folder, "run_metrics.json")
 
-    # Initialize FileManager
-    file_manager = FileManager(csv_file=csv_file, json_file=json_output_file, input_json_file=user_requirement_file)
-    file_manager.validate_files()
+    if args.retry_failed:
+        print(f"{file_manager.revive_failed()} failed questions queued again.")
 
-    browser = setup_browser()
+    def run_image_mirror(fetcher=None, rate_limiter=None):
+        from ImageMirror import mirror_images
+        mirror_images(
+            file_manager,
+            os.path.join(exam.output_folder, "images"),
+            fetcher=fetcher,
+            concurrency=int(user_data.get("image_concurrency", 8)),
+            rate_limiter=rate_limiter,
+            max_width=user_data.get("image_max_width"),
+            recompress=bool(user_data.get("image_recompress", False))
+        )
+
+    if args.mirror_images:
+        try:
+            run_image_mirror()
+        finally:
+            exam.close()
+            print(f"Process completed. Data saved in {json_output_file}")
+        return
+
+    if args.extract_discussions:
+        try:
+            exam.extract_discussions()
+        finally:
+            exam.close()
+        return
+
+    if args.reparse_from_cache:
+        from QuestionScraper import reparse_from_cache
+        try:
+            reparse_from_cache(file_manager, page_cache, parser=parser)
+        finally:
+            file_manager.close()
+            print(f"Process completed. Data saved in {json_output_file}")
+        return
+
+    metrics_server = MetricsServer(int(user_data["metrics_port"])).start() if user_data.get("metrics_port") else None
+    browsers = browser_pool(user_data)
+    if fetch_mode == "browser" and (args.refresh or has_work(plan_exam(user_requirement_file))):
+        # Every page needs Chrome: start the spare sessions while discovery runs.
+        browsers.start()
+    browser = browsers.session()
 
     try:
 
-        max_questions = get_max_questions(browser, file_manager)
+        rate_limiter = HostRateLimiter(
+            requests_per_minute=requests_per_minute,
+            host_budgets=user_data.get("host_budgets"),
+            adaptive=bool(user_data.get("adaptive_rate", True)),
+            max_speedup=float(user_data.get("max_speedup", 3))
+        )
+        fetcher = HttpFetcher() if fetch_mode == "http" or args.refresh else None
+
+        # Discussion pages are scraped as soon as discovery finds their URL.
+        ScrapePipeline(
+            [exam],
+            fetcher,
+            rate_limiter,
+            browsers,
+            workers=workers,
+            max_pending=user_data.get("queue_size"),
+            progress_every=int(user_data.get("progress_every", 10)),
+            checkpoint_every=float(user_data.get("checkpoint_seconds", 60)),
+            refresh=args.refresh
+        ).run()
+
+        if args.refresh:
+            from QuestionScraper import refresh_questions
+            refresh_questions(
+                browser, file_manager, fetcher, rate_limiter=rate_limiter, page_cache=page_cache, parser=parser
+            )
+
+        if user_data.get("mirror_images", False):
+            run_image_mirror(fetcher)
 
-        extract_urls(browser, file_manager, max_questions)
+        if user_data.get("extract_discussions", False):
+            exam.extract_discussions()
 
-        scrape_question_info(browser, file_manager)
+        for host, budget in sorted(rate_limiter.summary().items()):
+            print(f"Request budget for {host} at the end of the run: {budget:.1f}/min.")
 
     finally:
         browser.quit()
+        browsers.close()
+        exam.close()
+        metrics.write_summary(metrics_file)
+        metrics.print_summary()
+        if metrics_server is not None:
+            metrics_server.stop()
         print(f"Process completed. Data saved in {json_output_file}")
 
 if __name__ == "__main__":
@@ -0,0 +1,48 @@
+from RateLimiter import detect_block, detect_search_block
+
+SORRY_URL = "https://www.google.com/sorry/index?continue=https://www.google.com/search%3Fq%3Dexam"
+
+SORRY_PAGE = """<html>
+<head><title>https://www.google.com/search?q=exam</title></head>
+<body>
+<div>Our systems have detected unusual traffic from your computer network. This page
+checks to see if it's really you sending the requests, and not a robot.</div>
+<form action="/sorry/index" method="post"></form>
+</body>
+</html>"""
+
+CHALLENGE_PAGE = """<html>
+<head><title>Just a moment...</title><script>window._cf_chl_opt = {};</script></head>
+<body></body>
+</html>"""
+
+DISCUSSION_PAGE = """<html>
+<head><title>Exam Question 12 discussion</title></head>
+<body>
+<div class="discussion-container">
+<div class="comment-content">Google said it detected unusual traffic from your computer
+while I was studying, so I came here instead. Answer is B.</div>
+</div>
+</body>
+</html>"""
+
+
+def test_sorry_page_is_a_search_block():
+    assert detect_search_block(text=SORRY_PAGE)
+    assert detect_search_block(text="", url=SORRY_URL)
+    assert detect_search_block(200, SORRY_PAGE, SORRY_URL)
+
+
+def test_challenge_page_is_a_block():
+    assert detect_block(text=CHALLENGE_PAGE)
+    assert detect_search_block(text=CHALLENGE_PAGE)
+
+
+def test_discussion_quoting_a_traffic_warning_is_not_a_block():
+    assert not detect_block(200, DISCUSSION_PAGE)
+    assert not detect_block(text=DISCUSSION_PAGE)
+
+
+def test_throttling_status_is_a_block():
+    assert detect_block(429)
+    assert detect_search_block(503, "")
@@ -0,0 +1,23 @@
+import glob
+import os
+import pytest
+from QuestionScraper import check_parser_parity
+
+HERE = os.path.dirname(__file__)
+# Recorded pages, plus edge cases kept out of the benchmark (e.g. a header wrapped in another element).
+FIXTURES = sorted(
+    glob.glob(os.path.join(HERE, "..", "benchmarks", "fixtures", "*.html"))
+    + glob.glob(os.path.join(HERE, "fixtures", "*.html"))
+)
+
+
+def test_fixtures_exist():
+    assert FIXTURES
+
+
+@pytest.mark.parametrize("path", FIXTURES, ids=os.path.basename)
+def test_lxml_parser_matches_bs4(path):
+    with open(path, "r", encoding="utf-8") as f:
+        html = f.read()
+    equal, expected, actual = check_parser_parity(html)
+    assert equal, f"bs4: {expected}\nlxml: {actual}"